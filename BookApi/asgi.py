@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BookApi.settings")
 
 application = get_asgi_application()
+
+# Build this worker's autocomplete index before it serves requests
+from books.autocomplete import index  # noqa: E402
+
+index.preload()
@@ -91,8 +91,9 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
-        "anon": "100/day",
-        "user": "1000/day",
+        # Raise these to load test a server (see manage.py loadtest)
+        "anon": os.getenv("BOOKS_ANON_THROTTLE_RATE", "100/day"),
+        "user": os.getenv("BOOKS_USER_THROTTLE_RATE", "1000/day"),
     },
     # Content negotiation
     "DEFAULT_CONTENT_NEGOTIATION_CLASS": "rest_framework."
@@ -112,7 +113,81 @@ REST_FRAMEWORK = {
     "NON_FIELD_ERRORS_KEY": "error",
 }
 
+# Pagination counts
+# Result sets estimated to hold at least this many rows report an estimated
+# count instead of running an exact COUNT(*)
+BOOKS_EXACT_COUNT_THRESHOLD = int(os.getenv("BOOKS_EXACT_COUNT_THRESHOLD", "10000"))
+# Seconds to cache counts on databases without planner estimates (SQLite)
+BOOKS_COUNT_CACHE_TIMEOUT = int(os.getenv("BOOKS_COUNT_CACHE_TIMEOUT", "60"))
+
+# Render list endpoints from .values() rows instead of per-field DRF dispatch
+BOOKS_FAST_LIST_SERIALIZER = os.getenv(
+    "BOOKS_FAST_LIST_SERIALIZER", "True"
+).lower() in ("true", "1", "t")
+
+# Rows fetched per server-side cursor round trip by the NDJSON export
+BOOKS_EXPORT_CHUNK_SIZE = int(os.getenv("BOOKS_EXPORT_CHUNK_SIZE", "2000"))
+
+# Bulk writes: maximum items per request and rows per INSERT statement
+BOOKS_BULK_MAX_ITEMS = int(os.getenv("BOOKS_BULK_MAX_ITEMS", "5000"))
+BOOKS_BULK_BATCH_SIZE = int(os.getenv("BOOKS_BULK_BATCH_SIZE", "500"))
+# Maximum rows a filter-scoped bulk update or delete may touch
+BOOKS_BULK_MAX_ROWS = int(os.getenv("BOOKS_BULK_MAX_ROWS", "10000"))
+
+# ?search_mode=fuzzy: minimum trigram word similarity (0-1) of a match and
+# maximum number of matches returned
+BOOKS_FUZZY_SEARCH_THRESHOLD = float(os.getenv("BOOKS_FUZZY_SEARCH_THRESHOLD", "0.5"))
+BOOKS_FUZZY_SEARCH_LIMIT = int(os.getenv("BOOKS_FUZZY_SEARCH_LIMIT", "100"))
+
+# Maximum number of suggestions returned by /books/autocomplete/
+BOOKS_AUTOCOMPLETE_LIMIT = int(os.getenv("BOOKS_AUTOCOMPLETE_LIMIT", "10"))
+
+# The response cache and hot lists are invalidated through the cache, so
+# they are off by default unless it is shared by every process (REDIS_URL):
+# with per-process memory, other processes would keep serving stale data
+SHARED_CACHE = bool(os.getenv("REDIS_URL"))
+
+# Seconds to cache rendered list, featured, by_genre and detail responses
+# (0 disables); any book write invalidates them
+BOOKS_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv("BOOKS_RESPONSE_CACHE_TIMEOUT", "300" if SHARED_CACHE else "0")
+)
+
+# Books kept in the cached featured and per-genre hot lists that serve the
+# first page of those endpoints (0 disables)
+BOOKS_HOT_LIST_SIZE = int(
+    os.getenv("BOOKS_HOT_LIST_SIZE", "100" if SHARED_CACHE else "0")
+)
+
+# Seconds a hot list is cached before it is rebuilt from the database
+BOOKS_HOT_LIST_TIMEOUT = int(os.getenv("BOOKS_HOT_LIST_TIMEOUT", "3600"))
+
+# Fraction of requests (0 to 1) timed and logged as a "books.timing" line
+BOOKS_SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv("BOOKS_SERVER_TIMING_SAMPLE_RATE", "0.01")
+)
+
+# Send the Server-Timing header of timed requests to every client; by
+# default only staff users get it, as it reveals query counts and timings
+BOOKS_SERVER_TIMING_PUBLIC = os.getenv(
+    "BOOKS_SERVER_TIMING_PUBLIC", "False"
+).lower() in ("true", "1", "t")
+
+# Client addresses allowed to read /metrics (comma-separated), and a bearer
+# token that lets other clients, such as a Prometheus server, read it too
+BOOKS_METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.getenv("BOOKS_METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if address.strip()
+]
+BOOKS_METRICS_TOKEN = os.getenv("BOOKS_METRICS_TOKEN", "")
+
+# MetricsMiddleware comes first so the latency histograms cover every request
+# end to end, including the sampled timing below; ServerTimingMiddleware
+# comes next so its breakdown covers all the Django middleware.
 MIDDLEWARE = [
+    "books.middleware.MetricsMiddleware",
+    "books.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -163,6 +238,23 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Redis when REDIS_URL is set (as in docker-compose), per-process memory otherwise
+if SHARED_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -204,3 +296,22 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per timed request, see books.middleware
+        "books.timing": {
+            "handlers": ["console"],
+            "level": os.getenv("BOOKS_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
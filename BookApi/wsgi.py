@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BookApi.settings")
 
 application = get_wsgi_application()
+
+# Build this worker's autocomplete index before it serves requests
+from books.autocomplete import index  # noqa: E402
+
+index.preload()
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BooksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "books"
+
+    def ready(self):
+        from books import signals  # noqa: F401
+        from books.search import ensure_sqlite_fts
+
+        post_migrate.connect(ensure_sqlite_fts, sender=self)
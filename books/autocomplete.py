@@ -0,0 +1,322 @@
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from books.models import Book
+
+logger = logging.getLogger("books.autocomplete")
+
+# Indexed keys are cut to this many characters; longer queries are matched on
+# their first KEY_LENGTH characters.
+KEY_LENGTH = 48
+
+# Results for prefixes up to this long match a large share of the catalog, so
+# they are memoized until a book under the prefix changes.
+MEMO_PREFIX_LENGTH = 2
+
+# Columns loaded for every indexed book
+COLUMNS = ("id", "slug", "title", "author", "rating")
+
+# Cache key of the autocomplete version, moved by every write to the books
+# once applied to the writing process's index; a process that did not apply
+# a move reloads its index.
+VERSION_KEY = "books:autocomplete:version"
+
+
+def normalize(text):
+    """
+    Return ``text`` lowercased, without accents and with single spaces.
+
+    Args:
+        text: The string to normalise (None is treated as empty)
+
+    Returns:
+        str: The normalised string
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def get_version():
+    """
+    Return the current autocomplete version, starting one if there is none.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, as books.caching does for the generation, so
+        # that a version lost to eviction never reuses an old number.
+        cache.add(VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """
+    Move the autocomplete version, making other processes reload their index.
+
+    Returns:
+        int: The new version, or None if the version had to be started over
+    """
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+        return None
+
+
+def row_to_book(row):
+    """
+    Return the indexed dict for a ``values_list(*COLUMNS)`` row; the rating
+    is stored as a float, as the API renders it.
+    """
+    book = dict(zip(COLUMNS, row))
+    if book["rating"] is not None:
+        book["rating"] = float(book["rating"])
+    return book
+
+
+def index_keys(*texts):
+    """
+    Return the keys a book is indexed under: every word-initial suffix of
+    its normalised title and author, so "hob" finds "The Hobbit".
+
+    Returns:
+        set: The keys, each at most KEY_LENGTH characters long
+    """
+    keys = set()
+    for text in texts:
+        text = normalize(text)
+        for i, char in enumerate(text):
+            if char != " " and (i == 0 or text[i - 1] == " "):
+                keys.add(text[i : i + KEY_LENGTH])
+    return keys
+
+
+class PrefixIndex:
+    """
+    Per-process prefix index over book titles and authors.
+
+    Keys are kept in a sorted list of ``(key, book_id)`` pairs, so the books
+    under a prefix are one contiguous slice found by binary search; the best
+    rated of them are picked with a heap. Book details are kept alongside so
+    lookups never touch the database.
+
+    The index is built when the server starts (see ``preload``), or else
+    on first use, and then kept current by the signal handlers in
+    ``books.signals``, which apply each write in place. Every write also
+    moves the autocomplete version in the shared cache. A process that
+    applied the write itself moves its own version along; one that did not
+    sees a version it has not reached, and reloads the index.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Held by the thread reloading a stale index
+        self.reload_lock = threading.Lock()
+        # Number of loads so far; writes applied to an index that a load
+        # then replaced must not move the version along
+        self.loads = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Drop the index; it is reloaded from the database on next use.
+        """
+        with self.lock:
+            self.loaded = False
+            self.version = None
+            self.entries = []
+            self.books = {}
+            self.memo = {}
+
+    def load(self):
+        """
+        Build the index from every book in the database.
+        """
+        # Read first, so that a write during the load triggers another one
+        version = get_version()
+        books = {}
+        entries = []
+        for row in Book.objects.values_list(*COLUMNS).iterator(chunk_size=2000):
+            book = row_to_book(row)
+            books[book["id"]] = book
+            entries.extend(
+                (key, book["id"]) for key in index_keys(book["title"], book["author"])
+            )
+        entries.sort()
+        with self.lock:
+            self.books = books
+            self.entries = entries
+            self.memo = {}
+            self.version = version
+            self.loads += 1
+            self.loaded = True
+
+    def preload(self):
+        """
+        Build the index ahead of the first request; if the database cannot
+        be read yet, it is built on first use instead.
+        """
+        try:
+            self.ensure_loaded()
+        except DatabaseError as error:
+            logger.warning("Autocomplete index not built at startup: %s", error)
+
+    def ensure_loaded(self):
+        """
+        Load the index unless it already is, and reload it if another
+        process moved the autocomplete version since.
+
+        A reload is built aside from the current index; meanwhile other
+        threads keep searching the current one rather than wait.
+        """
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.load()
+            return
+        if get_version() == self.version:
+            return
+        if self.reload_lock.acquire(blocking=False):
+            try:
+                self.load()
+            finally:
+                self.reload_lock.release()
+
+    def forget(self, keys):
+        """
+        Drop memoized results for the short prefixes of ``keys``.
+        """
+        for key in keys:
+            for length in range(1, MEMO_PREFIX_LENGTH + 1):
+                self.memo.pop(key[:length], None)
+
+    def remove(self, *pks):
+        """
+        Remove books from the index.
+        """
+        with self.lock:
+            for pk in pks:
+                book = self.books.pop(pk, None)
+                if book is None:
+                    continue
+                keys = index_keys(book["title"], book["author"])
+                for key in keys:
+                    i = bisect_left(self.entries, (key, pk))
+                    if i < len(self.entries) and self.entries[i] == (key, pk):
+                        del self.entries[i]
+                self.forget(keys)
+
+    def add(self, book):
+        """
+        Add or replace a book in the index.
+
+        Args:
+            book: A dict with the keys in COLUMNS
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            self.remove(book["id"])
+            self.books[book["id"]] = book
+            keys = index_keys(book["title"], book["author"])
+            for key in keys:
+                insort(self.entries, (key, book["id"]))
+            self.forget(keys)
+
+    def refresh(self, pks):
+        """
+        Re-read written books from the database into the index, once their
+        write is committed; books that no longer exist are removed.
+        """
+        loads = self.loads
+        if self.loaded:
+            pks = set(pks)
+            for row in Book.objects.filter(pk__in=pks).values_list(*COLUMNS):
+                book = row_to_book(row)
+                pks.discard(book["id"])
+                self.add(book)
+            self.remove(*pks)
+        self.applied(loads)
+
+    def delete(self, *pks):
+        """
+        Remove deleted books from the index, once their delete is committed.
+        """
+        loads = self.loads
+        self.remove(*pks)
+        self.applied(loads)
+
+    def applied(self, loads):
+        """
+        Move the autocomplete version for a write applied to the index.
+
+        This index follows the version only if no other process moved it
+        since, and no load replaced the index the write was applied to.
+        """
+        version = bump_version()
+        with self.lock:
+            if (
+                self.loaded
+                and loads == self.loads
+                and version is not None
+                and version == self.version + 1
+            ):
+                self.version = version
+
+    def search(self, query, limit):
+        """
+        Return the best rated books with a title or author word starting with
+        ``query``.
+
+        Args:
+            query: The typed prefix
+            limit: Maximum number of books returned
+
+        Returns:
+            list: Book dicts, highest rating first
+        """
+        prefix = normalize(query)[:KEY_LENGTH]
+        if not prefix:
+            return []
+        self.ensure_loaded()
+        with self.lock:
+            memoize = len(prefix) <= MEMO_PREFIX_LENGTH
+            if memoize and self.memo.get(prefix, (None, 0))[1] >= limit:
+                return self.memo[prefix][0][:limit]
+            lo = bisect_left(self.entries, (prefix,))
+            hi = bisect_left(self.entries, (prefix + "\uffff",), lo)
+            pks = {pk for _, pk in self.entries[lo:hi]}
+            results = heapq.nsmallest(
+                limit, (self.books[pk] for pk in pks), key=self.rank
+            )
+            if memoize:
+                self.memo[prefix] = (results, limit)
+            return results
+
+    @staticmethod
+    def rank(book):
+        """
+        Sort key putting the best rated books first; unrated books last.
+        """
+        rating = book["rating"]
+        return (rating is None, -(rating or 0), book["title"], book["id"])
+
+
+# The index of this worker process
+index = PrefixIndex()
+
+
+def get_limit():
+    """
+    Return the maximum number of suggestions per request.
+    """
+    return getattr(settings, "BOOKS_AUTOCOMPLETE_LIMIT", 10)
@@ -0,0 +1,411 @@
+import io
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from books import facets
+from books.models import Book
+from books.serializers import BookBulkSerializer
+from books.signals import books_bulk_changed, deleting_in_bulk
+from books.slugs import assign_slugs
+
+
+class BulkLimitExceeded(Exception):
+    """
+    Raised when a filter-scoped bulk write matches more rows than allowed.
+    """
+
+
+def get_batch_size():
+    """
+    Return the number of rows written per INSERT statement.
+    """
+    return getattr(settings, "BOOKS_BULK_BATCH_SIZE", 500)
+
+
+def validate_books(items, context, serializer_class=BookBulkSerializer):
+    """
+    Validate a list of book payloads in one pass, without touching the
+    database.
+
+    Args:
+        items: The list of book payloads
+        context: Serializer context
+        serializer_class: Serializer used to validate each item
+
+    Returns:
+        tuple: ``(valid, errors)`` where ``valid`` is a list of
+         ``(index, validated_data)`` and ``errors`` a list of
+         ``{"index": ..., "errors": ...}`` dicts
+    """
+    valid = []
+    errors = []
+    seen_isbns = set()
+    # One serializer validates every item, as a ListSerializer's child does;
+    # building its fields takes longer than validating an item.
+    serializer = serializer_class(context=context)
+    for index, item in enumerate(items):
+        try:
+            validated_data = serializer.run_validation(item)
+        except ValidationError as exc:
+            errors.append({"index": index, "errors": as_serializer_error(exc)})
+            continue
+        isbn = validated_data["isbn"]
+        if isbn in seen_isbns:
+            errors.append(
+                {"index": index, "errors": {"isbn": ["Duplicate ISBN in this batch."]}}
+            )
+            continue
+        seen_isbns.add(isbn)
+        valid.append((index, validated_data))
+    return valid, errors
+
+
+def exclude_existing_isbns(valid, errors):
+    """
+    Move items whose ISBN already exists to ``errors``, using a single
+    ``isbn IN (...)`` query against the unique index.
+
+    Returns:
+        list: The remaining ``(index, validated_data)`` items
+    """
+    isbns = [data["isbn"] for _, data in valid]
+    existing = set(Book.objects.filter(isbn__in=isbns).values_list("isbn", flat=True))
+    if not existing:
+        return valid
+    remaining = []
+    for index, data in valid:
+        if data["isbn"] in existing:
+            errors.append(
+                {
+                    "index": index,
+                    "errors": {"isbn": ["book with this isbn already exists."]},
+                }
+            )
+        else:
+            remaining.append((index, data))
+    return remaining
+
+
+def create_books(items, context):
+    """
+    Validate and insert a batch of books with ``bulk_create``.
+
+    Invalid items are reported instead of aborting the batch. Slugs are
+    generated in bulk, and rows are inserted ``BOOKS_BULK_BATCH_SIZE`` at a
+    time in a single transaction. The facet counters are incremented from
+    the new books, and ``books_bulk_changed`` is sent in place of the
+    per-row ``post_save`` signals.
+
+    Args:
+        items: The list of book payloads
+        context: Serializer context
+
+    Returns:
+        tuple: ``(created, errors)`` where ``created`` is a list of
+         ``(index, Book)`` and ``errors`` a list of per-item errors
+    """
+    valid, errors = validate_books(items, context)
+    # A concurrent writer can insert one of our ISBNs or take one of our
+    # slugs between the check and the insert; re-check once and retry
+    # without the conflicting items and with fresh slugs.
+    for attempt in range(2):
+        valid = exclude_existing_isbns(valid, errors)
+        books = [Book(**data) for _, data in valid]
+        assign_slugs(books, Book.objects)
+        try:
+            with transaction.atomic():
+                Book.objects.bulk_create(books, batch_size=get_batch_size())
+                facets.apply_deltas(facets.book_counts(books))
+                books_bulk_changed.send(sender=Book, pks=[book.pk for book in books])
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        break
+    errors.sort(key=lambda error: error["index"])
+    return [(index, book) for (index, _), book in zip(valid, books)], errors
+
+
+# Columns an upsert overwrites on conflict; the ISBN is the conflict key and
+# the slug and creation time of an existing book never change.
+UPSERT_FIELDS = [
+    "title",
+    "author",
+    "published_date",
+    "pages",
+    "cover_image",
+    "language",
+    "genre",
+    "description",
+    "price",
+    "rating",
+]
+
+# Temporary table copy_upserts() loads a batch into before merging it
+STAGING_TABLE = "books_upsert_staging"
+
+
+def upsert_books(items, context):
+    """
+    Insert or update a batch of books keyed by ISBN.
+
+    Existing rows are read with a single ``isbn IN (...)`` query to tell
+    inserts, updates and unchanged rows apart; everything that changed is
+    then written with one ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` per
+    batch, and the facet counters adjusted from one ``GROUP BY`` of the
+    rows it replaces. As with ``PUT`` on a single book, optional fields missing from an
+    item keep their current value.
+
+    A book inserted concurrently between the read and the write is still
+    upserted correctly, but is counted as an insert.
+
+    Args:
+        items: The list of book payloads
+        context: Serializer context
+
+    Returns:
+        tuple: ``(counts, errors)`` where ``counts`` has ``inserted``,
+         ``updated`` and ``unchanged`` totals
+    """
+    valid, errors = validate_books(items, context)
+    books, counts = prepare_upserts(valid)
+    with transaction.atomic():
+        # The written rows end up with the facet values of the books
+        existing = Book.objects.filter(isbn__in=[book.isbn for book in books])
+        before = facets.group_counts(existing)
+        write_upserts(books)
+        facets.apply_changes(before, facets.book_counts(books))
+        books_bulk_changed.send(sender=Book, pks=[book.pk for book in books])
+    return counts, errors
+
+
+def prepare_upserts(valid):
+    """
+    Return the books an upsert of validated items writes.
+
+    Existing rows are read with a single ``isbn IN (...)`` query; items
+    matching their row are skipped, the others are merged over it, and new
+    books get slugs.
+
+    Args:
+        valid: A list of ``(index, validated_data)`` items
+
+    Returns:
+        tuple: ``(books, counts)`` where ``books`` are the unsaved Book
+         instances to write and ``counts`` has ``inserted``, ``updated`` and
+         ``unchanged`` totals
+    """
+    fields = {name: Book._meta.get_field(name) for name in UPSERT_FIELDS}
+    existing = {
+        row["isbn"]: row
+        for row in Book.objects.filter(
+            isbn__in=[data["isbn"] for _, data in valid]
+        ).values("isbn", "slug", *UPSERT_FIELDS)
+    }
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    books = []
+    for _, data in valid:
+        current = existing.get(data["isbn"])
+        if current is None:
+            book = Book(**data)
+            counts["inserted"] += 1
+        else:
+            values = {**current, **data}
+            if all(
+                field.to_python(values[name]) == field.to_python(current[name])
+                for name, field in fields.items()
+            ):
+                counts["unchanged"] += 1
+                continue
+            book = Book(**values)
+            counts["updated"] += 1
+        books.append(book)
+    # Updated rows carry their current slug, so only inserts get new ones.
+    assign_slugs(books, Book.objects)
+    return books, counts
+
+
+def write_upserts(books):
+    """
+    Write books from ``prepare_upserts`` with one
+    ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` per batch.
+    """
+    Book.objects.bulk_create(
+        books,
+        batch_size=get_batch_size(),
+        update_conflicts=True,
+        unique_fields=["isbn"],
+        update_fields=UPSERT_FIELDS + ["updated_at"],
+    )
+
+
+# Escapes of COPY's text format; \N is NULL
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Load rows into a table with PostgreSQL's ``COPY ... FROM STDIN``.
+
+    Args:
+        cursor: A Django cursor on a PostgreSQL connection
+        table: The quoted table name
+        columns: The column names, in row order
+        rows: Tuples of database values, None for NULL
+    """
+    lines = []
+    for row in rows:
+        values = [
+            "\\N" if value is None else str(value).translate(COPY_ESCAPES)
+            for value in row
+        ]
+        lines.append("\t".join(values))
+    data = "\n".join(lines) + "\n" if lines else ""
+    names = ", ".join(cursor.db.ops.quote_name(column) for column in columns)
+    sql = f"COPY {table} ({names}) FROM STDIN"
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):
+        # psycopg2
+        raw.copy_expert(sql, io.StringIO(data))
+    else:
+        # psycopg 3
+        with raw.copy(sql) as copy:
+            copy.write(data)
+
+
+def copy_upserts(books):
+    """
+    Write books from ``prepare_upserts`` on PostgreSQL by loading them with
+    ``COPY`` into a temporary staging table, then merging it on ISBN with a
+    single ``INSERT ... SELECT ... ON CONFLICT (isbn) DO UPDATE``.
+
+    Faster than ``write_upserts`` for large batches, which it sends as one
+    stream instead of ``BOOKS_BULK_BATCH_SIZE`` rows of query parameters at
+    a time. Must be called inside a transaction.
+    """
+    now = timezone.now()
+    for book in books:
+        if book.created_at is None:
+            book.created_at = now
+        book.updated_at = now
+    fields = [field for field in Book._meta.concrete_fields if not field.primary_key]
+    columns = [field.column for field in fields]
+    quote_name = connection.ops.quote_name
+    table = quote_name(Book._meta.db_table)
+    names = ", ".join(quote_name(column) for column in columns)
+    updates = ", ".join(
+        f"{quote_name(column)} = EXCLUDED.{quote_name(column)}"
+        for column in columns
+        if column in UPSERT_FIELDS or column == "updated_at"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} AS "
+            f"SELECT {names} FROM {table} WITH NO DATA"
+        )
+        # Validated values (str, int, date, Decimal, float, datetime) are
+        # sent in their text form, which PostgreSQL casts to the column types
+        # as it would literals; get_db_prep_save() would take longer than
+        # the COPY itself.
+        values = attrgetter(*(field.attname for field in fields))
+        copy_rows(cursor, STAGING_TABLE, columns, map(values, books))
+        cursor.execute(
+            f"INSERT INTO {table} ({names}) SELECT {names} FROM {STAGING_TABLE} "
+            f"ON CONFLICT (isbn) DO UPDATE SET {updates}"
+        )
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+
+# Columns a filter-scoped bulk update may set. Titles, ISBNs and slugs
+# identify a single book and are left to per-book updates.
+BULK_UPDATE_FIELDS = [
+    "author",
+    "published_date",
+    "pages",
+    "cover_image",
+    "language",
+    "genre",
+    "description",
+    "price",
+    "rating",
+]
+
+
+def get_max_rows():
+    """
+    Return the maximum number of rows a filter-scoped bulk write may touch.
+    """
+    return getattr(settings, "BOOKS_BULK_MAX_ROWS", 10000)
+
+
+def lock_matching_pks(queryset, max_rows):
+    """
+    Lock the rows matched by ``queryset`` and return their primary keys.
+
+    Must be called inside a transaction.
+
+    Raises:
+        BulkLimitExceeded: If more than ``max_rows`` rows match
+    """
+    pks = list(
+        queryset.order_by()
+        .select_for_update()
+        .values_list("pk", flat=True)[: max_rows + 1]
+    )
+    if len(pks) > max_rows:
+        raise BulkLimitExceeded(
+            f"The filters match more than {max_rows} books; narrow them down."
+        )
+    return pks
+
+
+def update_matching_books(queryset, values, max_rows):
+    """
+    Set ``values`` on every book matched by ``queryset`` with one ``UPDATE``.
+
+    If the update sets a facet field, the facet counters are adjusted from
+    one ``GROUP BY`` of the books before it.
+
+    Returns:
+        int: The number of updated books
+    """
+    with transaction.atomic():
+        pks = lock_matching_pks(queryset, max_rows)
+        matching = Book.objects.filter(pk__in=pks)
+        before = None
+        if any(facet in values for facet in facets.FACETS):
+            before = facets.group_counts(matching)
+        updated = matching.update(**values, updated_at=timezone.now())
+        if before is not None:
+            facets.apply_changes(before, facets.updated_counts(before, values, updated))
+        books_bulk_changed.send(sender=Book, pks=pks)
+        return updated
+
+
+def delete_matching_books(queryset, max_rows):
+    """
+    Delete every book matched by ``queryset``.
+
+    The books are deleted with ``QuerySet.delete()``, so anything that
+    references them is cascaded to as Django does for any delete. The facet
+    counters are decremented from one ``GROUP BY`` of the books, and
+    ``books_bulk_changed`` is sent, while the per-row ``post_delete``
+    receivers are silenced (see ``books.signals.deleting_in_bulk``).
+
+    Returns:
+        int: The number of deleted books
+    """
+    with transaction.atomic():
+        pks = lock_matching_pks(queryset, max_rows)
+        matching = Book.objects.filter(pk__in=pks)
+        facets.apply_changes(facets.group_counts(matching), {})
+        with deleting_in_bulk():
+            _, deleted = matching.delete()
+        books_bulk_changed.send(sender=Book, pks=pks, deleted=True)
+        return deleted.get(Book._meta.label, 0)
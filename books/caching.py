@@ -0,0 +1,154 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from books import metrics, timing
+from books.conditional import not_modified_response, set_validators
+
+# Cache key of the catalog generation; every cached response is keyed by the
+# generation it was rendered in, so bumping it invalidates them all at once.
+GENERATION_KEY = "books:generation"
+
+
+def get_timeout():
+    """
+    Return how long, in seconds, read responses are cached (0 disables).
+    """
+    return getattr(settings, "BOOKS_RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def get_generation():
+    """
+    Return the current catalog generation, starting one if there is none.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the clock rather than 1 so that a generation lost to
+        # eviction or a cache restart never reuses an old number.
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """
+    Move to a new catalog generation, invalidating every cached response.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def process_local_warning():
+    """
+    Return a warning for commands that write books if the cache lives in
+    their own process's memory, or None if it is shared.
+
+    Such a command's generation bumps and hot list invalidations never reach
+    the servers, which keep serving what they cached before the write.
+    """
+    if not isinstance(caches["default"], LocMemCache):
+        return None
+    return (
+        "The cache is local to this process (REDIS_URL is not set): servers "
+        "with the response cache or hot lists enabled will not see these "
+        "writes until their cache expires or they restart. Run the command "
+        "with the servers' REDIS_URL."
+    )
+
+
+def response_cache_key(request, generation):
+    """
+    Return the cache key of a read request.
+
+    The key covers the current generation, the scheme and host (responses
+    hold absolute links), the path (which includes the API version), the
+    query parameters sorted by name and value, the negotiated media type and
+    whether the client is authenticated.
+
+    Args:
+        request: The DRF request
+        generation: The catalog generation
+
+    Returns:
+        str: The cache key
+    """
+    params = sorted(
+        (name, sorted(values)) for name, values in request.query_params.lists()
+    )
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        request.version,
+        params,
+        request.accepted_media_type,
+        request.user.is_authenticated,
+    ]
+    digest = hashlib.md5(json.dumps(parts).encode()).hexdigest()
+    return f"books:response:{generation}:{digest}"
+
+
+def cache_response(method):
+    """
+    Cache the rendered JSON responses of a read action.
+
+    Successful responses are stored for ``BOOKS_RESPONSE_CACHE_TIMEOUT``
+    seconds under response_cache_key(). A cached response is served without
+    touching the database, after authentication and throttling have run.
+    Other renderers, such as the browsable API, are never cached. The ETag
+    and Last-Modified validators are cached along with the content, so a
+    conditional request answered from the cache gets its 304 without a
+    query either.
+    """
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        timeout = get_timeout()
+        if not timeout or request.accepted_renderer.format != "json":
+            return method(view, request, *args, **kwargs)
+
+        key = response_cache_key(request, get_generation())
+        cached = cache.get(key)
+        metrics.record_cache_lookup(request, cached is not None)
+        if cached is not None:
+            status_code, content_type, content, etag, last_modified = cached
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            response = HttpResponse(
+                content, status=status_code, content_type=content_type
+            )
+            return set_validators(response, etag, last_modified)
+
+        response = method(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = view.get_renderer_context()
+            with timing.span("render"):
+                response.render()
+            last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+            cache.set(
+                key,
+                (
+                    response.status_code,
+                    response["Content-Type"],
+                    response.content,
+                    response.get("ETag"),
+                    last_modified,
+                ),
+                timeout,
+            )
+        return response
+
+    return wrapper
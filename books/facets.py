@@ -0,0 +1,172 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from books.models import GENRE_CHOICES, LANGUAGE_CHOICES, Book, BookFacetCount
+
+# Book fields with facet counts, and the values always listed for each
+FACETS = {
+    "genre": [value for value, _ in GENRE_CHOICES],
+    "language": [value for value, _ in LANGUAGE_CHOICES],
+}
+
+
+def facet_values(book):
+    """
+    Return the ``(facet, value)`` pairs a book is counted under.
+
+    Args:
+        book: A Book instance, or a dict of its field values
+
+    Returns:
+        list: One pair per facet
+    """
+    if isinstance(book, dict):
+        return [(facet, book[facet]) for facet in FACETS]
+    return [(facet, getattr(book, facet)) for facet in FACETS]
+
+
+def apply_deltas(deltas, using=None):
+    """
+    Add ``deltas`` to the counter rows with ``UPDATE ... SET count = count + n``,
+    creating missing rows first.
+
+    Must run in the transaction of the book writes it accounts for.
+
+    Args:
+        deltas: A mapping of ``(facet, value)`` to the change in count
+        using: The database alias
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    counters = BookFacetCount.objects.db_manager(using)
+    counters.bulk_create(
+        [BookFacetCount(facet=facet, value=value) for facet, value in deltas],
+        ignore_conflicts=True,
+    )
+    for (facet, value), delta in deltas.items():
+        counters.filter(facet=facet, value=value).update(count=F("count") + delta)
+
+
+def group_counts(queryset):
+    """
+    Count the books in ``queryset`` per facet value with one ``GROUP BY``
+    over every facet field.
+
+    Returns:
+        Counter: Counts keyed by ``(facet, value)``
+    """
+    counts = Counter()
+    for row in queryset.order_by().values(*FACETS).annotate(count=Count("pk")):
+        for key in facet_values(row):
+            counts[key] += row["count"]
+    return counts
+
+
+def book_counts(books):
+    """
+    Return the facet counts of Book instances, without a query.
+    """
+    return Counter(key for book in books for key in facet_values(book))
+
+
+def updated_counts(before, values, total):
+    """
+    Return the facet counts of books after an ``UPDATE`` setting ``values``
+    on all of them.
+
+    Args:
+        before: The facet counts of the books before the update
+        values: The field values the update sets
+        total: The number of books updated
+    """
+    after = Counter({key: n for key, n in before.items() if key[0] not in values})
+    for facet in FACETS:
+        if facet in values:
+            after[(facet, values[facet])] = total
+    return after
+
+
+def apply_changes(before, after, using=None):
+    """
+    Apply the difference between two facet counts of the same books, such
+    as their counts before and after a bulk write.
+
+    Must run in the transaction of the write.
+    """
+    deltas = Counter(after)
+    deltas.subtract(before)
+    apply_deltas(deltas, using=using)
+
+
+def resync(using=None):
+    """
+    Recount every facet from the books table.
+
+    Used after loads that bypass the bulk write functions, such as the
+    populate_books and import_books commands.
+    """
+    with transaction.atomic(using=using):
+        counts = group_counts(Book.objects.db_manager(using).all())
+        counters = BookFacetCount.objects.db_manager(using)
+        counters.update(count=0)
+        counters.bulk_create(
+            [
+                BookFacetCount(facet=facet, value=value, count=count)
+                for (facet, value), count in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["facet", "value"],
+            update_fields=["count"],
+        )
+
+
+def format_counts(counts):
+    """
+    Return facet counts as ``{facet: {value: count}}``, listing every choice
+    (with zero if no book has it) followed by any other stored values.
+
+    Args:
+        counts: A mapping of ``(facet, value)`` to count
+    """
+    result = {facet: dict.fromkeys(values, 0) for facet, values in FACETS.items()}
+    for (facet, value), count in counts.items():
+        if facet in result and count:
+            result[facet][value] = count
+    return result
+
+
+def catalog_counts():
+    """
+    Return the facet counts of the whole catalog from the counter table.
+    """
+    return format_counts(
+        {
+            (facet, value): count
+            for facet, value, count in BookFacetCount.objects.values_list(
+                "facet", "value", "count"
+            )
+        }
+    )
+
+
+def catalog_size():
+    """
+    Return the number of books in the catalog from the counter table.
+
+    Every book is counted under exactly one genre, so this is the sum of the
+    genre counters, read without touching the books table.
+    """
+    total = BookFacetCount.objects.filter(facet="genre").aggregate(total=Sum("count"))[
+        "total"
+    ]
+    return total or 0
+
+
+def queryset_counts(queryset):
+    """
+    Return the facet counts of the books in ``queryset``.
+    """
+    return format_counts(group_counts(queryset))
@@ -0,0 +1,268 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+
+from books import facets
+from books.models import GENRE_CHOICES
+
+# Minimum rating of a featured book
+FEATURED_MIN_RATING = 4.0
+
+# Name of the featured hot list; per-genre lists are named "genre:<genre>"
+FEATURED = "featured"
+
+# Genres with a hot list: only the choices, so that arbitrary genre names in
+# URLs cannot fill the cache with lists
+GENRES = frozenset(genre for genre, _ in GENRE_CHOICES)
+
+# How long, in seconds, a hot list may be locked by a writer updating it
+LOCK_TIMEOUT = 5
+
+# Sort keys of the lists: the model ordering columns, best first. The primary
+# key breaks ties in the same direction, as keyset pagination does.
+FEATURED_ORDERING = ["-rating", "-id"]
+GENRE_ORDERING = ["-published_date", "-id"]
+
+
+def get_size():
+    """
+    Return how many books each hot list holds (0 disables hot lists).
+
+    A list always holds at least one book more than a page, so it can tell
+    whether there is a second page.
+    """
+    size = getattr(settings, "BOOKS_HOT_LIST_SIZE", 100)
+    return max(size, api_settings.PAGE_SIZE + 1) if size else 0
+
+
+def get_timeout():
+    """
+    Return how long, in seconds, hot lists and their versions are cached.
+
+    Lists are rebuilt once they expire; a version restarts from the clock,
+    so it never matches a list stored under an expired one.
+    """
+    return getattr(settings, "BOOKS_HOT_LIST_TIMEOUT", 3600)
+
+
+def genre_list(genre):
+    """
+    Return the name of the hot list of a genre, or None if the genre is not
+    one of GENRE_CHOICES.
+    """
+    return f"genre:{genre}" if genre in GENRES else None
+
+
+def featured_books(queryset):
+    """
+    Return the featured books of ``queryset``, best rated first.
+    """
+    return queryset.filter(rating__gte=FEATURED_MIN_RATING).order_by(*FEATURED_ORDERING)
+
+
+def genre_books(queryset, genre):
+    """
+    Return the books of ``queryset`` in ``genre``, newest first.
+    """
+    return queryset.filter(genre=genre).order_by(*GENRE_ORDERING)
+
+
+def read(row, name):
+    """
+    Return a field of a book, given as a model instance or a ``.values()`` row.
+    """
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def sort_key(name, row):
+    """
+    Return the position of a book in hot list ``name``, smallest first, or
+    None if the book does not belong in the list.
+
+    Args:
+        name: The hot list name
+        row: A Book instance or a ``.values()`` row of one
+    """
+    if name == FEATURED:
+        rating = read(row, "rating")
+        if rating is None or rating < FEATURED_MIN_RATING:
+            return None
+    elif read(row, "genre") != name.removeprefix("genre:"):
+        return None
+    return position(name, row)
+
+
+def position(name, row):
+    """
+    Return the sort key of a book known to be in hot list ``name``.
+
+    Unlike sort_key(), only reads the ordering columns and primary key.
+    """
+    pk = read(row, "id")
+    if name == FEATURED:
+        return (-float(read(row, "rating")), -pk)
+    return (-read(row, "published_date").toordinal(), -pk)
+
+
+def exact_count(name):
+    """
+    Return the number of books in hot list ``name`` if it is known without
+    counting them, or None.
+
+    Genres are counted by the facet counters.
+    """
+    if name == FEATURED:
+        return None
+    genre = name.removeprefix("genre:")
+    return facets.catalog_counts()["genre"].get(genre, 0)
+
+
+def list_key(name):
+    return f"books:hotlist:{name}"
+
+
+def version_key(name):
+    return f"books:hotlist:{name}:version"
+
+
+def get_version(name):
+    """
+    Return the version of a hot list, starting one if there is none.
+    """
+    version = cache.get(version_key(name))
+    if version is None:
+        # Start from the clock so a version lost to eviction is never reused.
+        cache.add(version_key(name), time.time_ns() // 1000, timeout=get_timeout())
+        version = cache.get(version_key(name))
+    return version
+
+
+def bump_version(name):
+    """
+    Move a hot list to a new version, invalidating the stored list.
+
+    Returns:
+        int: The new version
+    """
+    try:
+        return cache.incr(version_key(name))
+    except ValueError:
+        return get_version(name)
+
+
+def get_ids(name, queryset):
+    """
+    Return the primary keys of the first books of a hot list.
+
+    The stored list is used if it is as recent as the list version;
+    otherwise it is rebuilt from ``queryset`` with one query reading only
+    the sort columns of the first ``get_size()`` books. A write that lands
+    during the rebuild bumps the version, so the rebuilt list is not used.
+
+    Args:
+        name: The hot list name
+        queryset: The books of the list, in list order
+
+    Returns:
+        list: Primary keys, best first
+    """
+    keys = cache.get_many([list_key(name), version_key(name)])
+    stored = keys.get(list_key(name))
+    version = keys.get(version_key(name))
+    if version is None:
+        version = get_version(name)
+    if stored is None or stored["version"] != version:
+        size = get_size()
+        columns = ["id", "rating"] if name == FEATURED else ["id", "published_date"]
+        rows = list(queryset.values(*columns, "genre")[: size + 1])
+        stored = {
+            "version": version,
+            "entries": [(sort_key(name, row), row["id"]) for row in rows[:size]],
+            "complete": len(rows) <= size,
+        }
+        cache.set(list_key(name), stored, timeout=get_timeout())
+    return [pk for _, pk in stored["entries"]]
+
+
+def update(name, pk, key):
+    """
+    Move a book within a stored hot list, or remove it.
+
+    The book is inserted at ``key`` if that is within the list. A list that
+    has fallen short of a page and one more book, because books left it, is
+    dropped and rebuilt on the next read. If another writer is updating the
+    list at the same time, the list is dropped instead.
+
+    Args:
+        name: The hot list name
+        pk: The primary key of the book
+        key: The new sort key of the book, or None to remove it
+    """
+    if not cache.add(f"{list_key(name)}:lock", True, timeout=LOCK_TIMEOUT):
+        bump_version(name)
+        return
+    try:
+        version = get_version(name)
+        stored = cache.get(list_key(name))
+        new_version = bump_version(name)
+        # Another writer bumped the version meanwhile; leave the list stale.
+        if new_version != version + 1:
+            return
+        if stored is None or stored["version"] != version:
+            return
+        entries = [entry for entry in stored["entries"] if entry[1] != pk]
+        complete = stored["complete"]
+        size = get_size()
+        # Past the end of a partial list the book's position is unknown.
+        if key is not None and (complete or (entries and key < entries[-1][0])):
+            entries.append((key, pk))
+            entries.sort()
+            if len(entries) > size:
+                entries, complete = entries[:size], False
+        if not complete and len(entries) <= api_settings.PAGE_SIZE:
+            cache.delete(list_key(name))
+            return
+        cache.set(
+            list_key(name),
+            {"version": new_version, "entries": entries, "complete": complete},
+            timeout=get_timeout(),
+        )
+    finally:
+        cache.delete(f"{list_key(name)}:lock")
+
+
+def refresh_book(book, old_genre=None):
+    """
+    Update the hot lists a saved book is, or was, in.
+
+    Args:
+        book: The saved Book
+        old_genre: The genre the book had before the save, if it changed
+    """
+    if not get_size():
+        return
+    names = [FEATURED, genre_list(book.genre)]
+    if old_genre and old_genre != book.genre:
+        names.append(genre_list(old_genre))
+    for name in filter(None, names):
+        update(name, book.pk, sort_key(name, book))
+
+
+def remove_book(pk, genre):
+    """
+    Remove a deleted book from the hot lists.
+    """
+    if not get_size():
+        return
+    for name in filter(None, [FEATURED, genre_list(genre)]):
+        update(name, pk, None)
+
+
+def invalidate():
+    """
+    Drop every hot list, for writes too large to apply one book at a time.
+    """
+    for name in [FEATURED, *(genre_list(genre) for genre in GENRES)]:
+        bump_version(name)
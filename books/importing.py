@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+
+# Input formats, by file extension
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def detect_format(path):
+    """
+    Return the format of a file from its extension, or None if unknown.
+    """
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+class LineReader:
+    """
+    Iterator over the decoded lines of a file opened in binary mode.
+
+    It keeps the byte offset and the number of the last line read, so an
+    import can record where it stopped and later seek back there. Bytes that
+    are not valid UTF-8 are replaced, and left for validation to reject.
+    """
+
+    def __init__(self, file, line=0):
+        self.file = file
+        self.offset = file.tell()
+        self.line = line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self.file.readline()
+        if not data:
+            raise StopIteration
+        self.offset += len(data)
+        self.line += 1
+        text = data.decode("utf-8", errors="replace")
+        if self.line == 1:
+            # Byte order mark, as written by spreadsheet exports
+            text = text.removeprefix("\ufeff")
+        return text
+
+
+def read_jsonl(lines):
+    """
+    Yield a ``(line, item, error)`` record for every non-blank line.
+
+    Args:
+        lines: A LineReader
+
+    Yields:
+        tuple: The line number, the parsed object (or the raw line if it is
+        not valid JSON), and an error message, None if the line parsed into
+        a JSON object
+    """
+    for text in lines:
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text)
+        except ValueError as error:
+            yield lines.line, text.rstrip("\r\n"), f"Invalid JSON: {error}"
+            continue
+        if isinstance(item, dict):
+            yield lines.line, item, None
+        else:
+            yield lines.line, item, "Expected a JSON object."
+
+
+def read_csv_header(lines):
+    """
+    Return the column names of a CSV file, or None if it is empty.
+    """
+    header = next(csv.reader(lines), None)
+    return [name.strip() for name in header] if header else None
+
+
+def read_csv(lines, header):
+    """
+    Yield a ``(line, item, error)`` record for every non-blank CSV row.
+
+    Items map column names to values. Empty values are left out, so that
+    optional fields fall back to their default, or to their current value
+    for books that already exist.
+
+    Args:
+        lines: A LineReader positioned after the header
+        header: The column names
+
+    Yields:
+        tuple: The number of the row's first line, the item, and an error
+        message, None if the row has one value per column
+    """
+    reader = csv.reader(lines)
+    while True:
+        # The reader reads no further than the end of each row
+        start = lines.line + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield start, None, f"Invalid CSV: {error}"
+            continue
+        if not row:
+            continue
+        if len(row) != len(header):
+            yield start, row, f"Expected {len(header)} values, got {len(row)}."
+            continue
+        yield start, {name: value for name, value in zip(header, row) if value}, None
+
+
+def load_checkpoint(path):
+    """
+    Return the state saved by ``save_checkpoint``, or None if there is none.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    """
+    Save the state of an import, replacing the previous checkpoint
+    atomically so a crash never leaves a partial one.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
@@ -0,0 +1,82 @@
+import re
+
+# Characters allowed between the digits of a pasted ISBN
+ISBN_SEPARATORS = re.compile(r"[\s-]")
+
+ISBN10_PATTERN = re.compile(r"^\d{9}[\dX]$")
+ISBN13_PATTERN = re.compile(r"^97[89]\d{10}$")
+
+
+def isbn13_check_digit(digits):
+    """
+    Return the ISBN-13 check digit for the first twelve digits.
+
+    Args:
+        digits: A string of twelve digits
+
+    Returns:
+        str: The check digit
+    """
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return str(-total % 10)
+
+
+def isbn10_check_digit(digits):
+    """
+    Return the ISBN-10 check digit ('0'-'9' or 'X') for the first nine digits.
+
+    Args:
+        digits: A string of nine digits
+
+    Returns:
+        str: The check digit
+    """
+    total = sum(int(d) * (10 - i) for i, d in enumerate(digits[:9]))
+    check = -total % 11
+    return "X" if check == 10 else str(check)
+
+
+def normalize_isbn(value):
+    """
+    Return ``value`` as an ISBN-13, or None if it is not a valid ISBN.
+
+    Hyphens and spaces are ignored, ISBN-10s are converted to their
+    978-prefixed ISBN-13, and the check digit is verified either way.
+
+    Args:
+        value: The string to normalise
+
+    Returns:
+        str: The thirteen-digit ISBN, or None
+    """
+    value = ISBN_SEPARATORS.sub("", str(value)).upper()
+    if ISBN13_PATTERN.match(value):
+        return value if isbn13_check_digit(value) == value[12] else None
+    if ISBN10_PATTERN.match(value):
+        if isbn10_check_digit(value) != value[9]:
+            return None
+        body = "978" + value[:9]
+        return body + isbn13_check_digit(body)
+    return None
+
+
+def split_isbns(values):
+    """
+    Separate ISBNs from other strings.
+
+    Args:
+        values: An iterable of strings, such as search terms
+
+    Returns:
+        tuple: The distinct normalised ISBN-13s in input order, and the list
+        of values that are not ISBNs
+    """
+    isbns = {}
+    others = []
+    for value in values:
+        isbn = normalize_isbn(value)
+        if isbn is None:
+            others.append(value)
+        else:
+            isbns[isbn] = None
+    return list(isbns), others
@@ -0,0 +1,458 @@
+import asyncio
+import json
+import math
+import random
+import ssl
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from books.isbn import isbn13_check_digit
+from books.models import GENRE_CHOICES
+
+# Requests replayed by default, with their relative weights
+DEFAULT_MIX = {
+    "list": 30,
+    "search": 10,
+    "filter_order": 15,
+    "retrieve": 25,
+    "featured": 10,
+    "by_genre": 10,
+}
+ACTIONS = [*DEFAULT_MIX, "create", "update"]
+
+# Actions that need an API token
+WRITE_ACTIONS = {"create", "update"}
+
+GENRES = [value for value, _ in GENRE_CHOICES]
+
+# List pages read before the run to learn slugs and title words
+DISCOVERY_PAGES = 5
+
+# ISBN prefix of books created by the create action
+CREATE_ISBN_PREFIX = "9793"
+
+
+def percentile(timings, percent):
+    """
+    Return the nearest-rank percentile of sorted timings.
+
+    Args:
+        timings: A sorted, non-empty list
+        percent: The percentile, from 0 to 100
+
+    Returns:
+        The timing at that percentile
+    """
+    rank = max(1, math.ceil(percent / 100 * len(timings)))
+    return timings[rank - 1]
+
+
+def parse_mix(value):
+    """
+    Parse a request mix such as ``list=30,retrieve=20``.
+
+    Args:
+        value: Comma-separated ``action=weight`` pairs
+
+    Returns:
+        dict: Weights keyed by action
+
+    Raises:
+        ValueError: If an action is unknown or a weight is not a number
+    """
+    mix = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise ValueError(f"Unknown action {name!r}")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(mix.values()):
+        raise ValueError("The mix has no requests")
+    return mix
+
+
+class HTTPConnection:
+    """
+    A minimal keep-alive HTTP/1.1 client connection.
+
+    Connections are opened lazily and reopened when the server closes them,
+    as gunicorn's sync workers do after every response.
+    """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.secure = parts.scheme == "https"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.secure else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context),
+            self.timeout,
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, target, body=None, headers=None):
+        """
+        Send a request and read its response.
+
+        A request on a reused connection that the server closed in the
+        meantime is retried once on a new connection.
+
+        Returns:
+            tuple: The status code and the response body
+        """
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                await self.connect()
+            try:
+                self.writer.write(self.encode(method, target, body, headers or {}))
+                await self.writer.drain()
+                status, response_headers, content = await asyncio.wait_for(
+                    self.read_response(), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt or not reused:
+                    raise
+                continue
+            except BaseException:
+                self.close()
+                raise
+            if response_headers.get("connection", "").lower() == "close":
+                self.close()
+            return status, content
+
+    def encode(self, method, target, body, headers):
+        lines = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "Accept: application/json",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        parts = status_line.split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ValueError(f"Malformed status line {status_line!r}")
+        status = int(parts[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await self.reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304) or 100 <= status < 200:
+            content = b""
+        else:
+            content = await self.reader.read()
+            headers["connection"] = "close"
+        return status, headers, content
+
+
+class RequestMix:
+    """
+    Draws weighted random requests against the books API.
+
+    Args:
+        mix: Weights keyed by action
+        prefix: The path of the books endpoint, such as ``/api/v1/books/``
+        pages: The number of list pages that exist
+        slugs: Slugs of existing books, read by retrieve and update
+        words: Title words searched for
+        token: API token sent with every request, required by writes
+        rng: The random.Random instance drawing requests
+    """
+
+    def __init__(self, mix, prefix, pages, slugs, words, token, rng):
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.prefix = prefix
+        self.pages = pages
+        self.slugs = slugs
+        self.words = words
+        self.rng = rng
+        self.headers = {"Authorization": f"Token {token}"} if token else {}
+
+    def draw(self):
+        """
+        Return the next request as ``(action, method, target, body, headers)``.
+        """
+        rng = self.rng
+        action = rng.choices(self.actions, self.weights)[0]
+        method, body, params = "GET", None, {}
+        path = self.prefix
+        if action == "list":
+            params = {"page": rng.randint(1, self.pages)}
+        elif action == "search":
+            params = {"search": rng.choice(self.words)}
+        elif action == "filter_order":
+            params = {
+                "genre": rng.choice(GENRES),
+                "ordering": rng.choice(["title", "-published_date", "-rating"]),
+            }
+        elif action == "retrieve":
+            path = f"{self.prefix}{rng.choice(self.slugs)}/"
+        elif action == "featured":
+            path = f"{self.prefix}featured/"
+        elif action == "by_genre":
+            path = f"{self.prefix}genre/{rng.choice(GENRES)}/"
+        elif action == "create":
+            method = "POST"
+            isbn = f"{CREATE_ISBN_PREFIX}{rng.randrange(10**8):08d}"
+            body = {
+                "title": " ".join(rng.sample(self.words, min(3, len(self.words)))),
+                "author": f"Load Test {rng.randint(1, 1000)}",
+                "published_date": "2020-01-01",
+                "isbn": isbn + isbn13_check_digit(isbn),
+                "pages": rng.randint(50, 1000),
+                "genre": rng.choice(GENRES),
+            }
+        elif action == "update":
+            method = "PATCH"
+            path = f"{self.prefix}{rng.choice(self.slugs)}/"
+            body = {"rating": f"{rng.randint(0, 50) / 10:.1f}"}
+
+        headers = dict(self.headers)
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        target = f"{path}?{urlencode(params)}" if params else path
+        return action, method, target, body, headers
+
+
+class Recorder:
+    """
+    Collects the latency and outcome of every request of a run.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.statuses = Counter()
+        self.dropped = 0
+
+    def record(self, action, latency, status=None, error=None):
+        self.latencies.setdefault(action, []).append(latency)
+        if error is not None:
+            self.statuses[error] += 1
+            self.errors[action] += 1
+        else:
+            self.statuses[str(status)] += 1
+            if status >= 400:
+                self.errors[action] += 1
+
+    def summary(self, elapsed):
+        """
+        Return the throughput, error rate and latency percentiles of the run,
+        overall and per action.
+        """
+        all_latencies = sorted(
+            latency for values in self.latencies.values() for latency in values
+        )
+        total_errors = sum(self.errors.values())
+        summary = {
+            "requests": len(all_latencies),
+            "errors": total_errors,
+            "dropped": self.dropped,
+            "elapsed_s": round(elapsed, 3),
+            "throughput": round(len(all_latencies) / elapsed, 2) if elapsed else 0,
+            **self.stats(all_latencies, total_errors),
+            "status_codes": dict(sorted(self.statuses.items())),
+            "actions": {},
+        }
+        for action, latencies in sorted(self.latencies.items()):
+            summary["actions"][action] = {
+                "requests": len(latencies),
+                "errors": self.errors[action],
+                **self.stats(sorted(latencies), self.errors[action]),
+            }
+        return summary
+
+    def stats(self, latencies, errors):
+        if not latencies:
+            return {"error_rate": 0.0, "latency_ms": {}}
+        return {
+            "error_rate": round(errors / len(latencies), 4),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p90": round(percentile(latencies, 90) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3),
+            },
+        }
+
+
+async def timed_request(connection, recorder, request, start):
+    """
+    Send a drawn request and record its latency, measured from ``start``.
+    """
+    action, method, target, body, headers = request
+    try:
+        status, _ = await connection.request(method, target, body, headers)
+    except (TimeoutError, OSError, asyncio.IncompleteReadError, ValueError) as e:
+        latency = time.perf_counter() - start
+        recorder.record(action, latency, error=type(e).__name__)
+    else:
+        recorder.record(action, time.perf_counter() - start, status=status)
+
+
+async def closed_loop(connection, mix, recorder, deadline):
+    """
+    Send requests back to back until the deadline.
+    """
+    while time.perf_counter() < deadline:
+        await timed_request(connection, recorder, mix.draw(), time.perf_counter())
+
+
+async def open_loop(connections, mix, recorder, rate, deadline, timeout, rng):
+    """
+    Send requests arriving as a Poisson process of ``rate`` per second.
+
+    Latency is measured from each request's scheduled arrival, so time
+    spent waiting for a free connection counts: a server that falls behind
+    shows it in the percentiles rather than by slowing the arrivals down.
+    Requests still waiting ``timeout`` seconds after the deadline are
+    counted as dropped.
+    """
+    queue = asyncio.Queue()
+
+    async def client(connection):
+        while True:
+            arrival, request = await queue.get()
+            if request is None:
+                return
+            if time.perf_counter() > deadline + timeout:
+                recorder.dropped += 1
+                continue
+            await timed_request(connection, recorder, request, arrival)
+
+    clients = [asyncio.create_task(client(connection)) for connection in connections]
+    arrival = time.perf_counter()
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival >= deadline:
+            break
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        queue.put_nowait((arrival, mix.draw()))
+    for _ in clients:
+        queue.put_nowait((None, None))
+    await asyncio.gather(*clients)
+
+
+async def discover(connection, prefix, token):
+    """
+    Read the first list pages to learn the slugs and title words of
+    existing books.
+
+    Returns:
+        tuple: The number of pages read, the list of slugs and the list of
+        distinct title words
+    """
+    headers = {"Authorization": f"Token {token}"} if token else {}
+    slugs, words = [], {}
+    pages = 0
+    for page in range(1, DISCOVERY_PAGES + 1):
+        target = f"{prefix}?{urlencode({'page': page, 'count': 'none'})}"
+        status, content = await connection.request("GET", target, None, headers)
+        if status != 200:
+            if page == 1:
+                raise ValueError(f"GET {target} returned {status}")
+            break
+        data = json.loads(content)
+        pages = page
+        for book in data.get("results", []):
+            slugs.append(book["slug"])
+            for word in book["title"].split():
+                if len(word) > 3 and word.isalpha():
+                    words[word.lower()] = None
+        if not data.get("next"):
+            break
+    return pages, slugs, list(words)
+
+
+async def run(
+    url, prefix, mix, clients, duration, rate=None, token=None, timeout=10, seed=0
+):
+    """
+    Replay the request mix against a running server.
+
+    Args:
+        url: The server's base URL, such as ``http://localhost:8000``
+        prefix: The path of the books endpoint
+        mix: Weights keyed by action
+        clients: The number of concurrent keep-alive connections
+        duration: How long to send requests for, in seconds
+        rate: Open-loop arrival rate in requests/second, or None to have
+            every client send requests back to back
+        token: API token, required by the create and update actions
+        timeout: Per-request timeout in seconds
+        seed: Seed of the requests drawn
+
+    Returns:
+        dict: The run's summary; see Recorder.summary()
+
+    Raises:
+        ValueError: If the server has no books to replay requests against
+    """
+    rng = random.Random(seed)
+    connections = [HTTPConnection(url, timeout) for _ in range(clients)]
+    pages, slugs, words = await discover(connections[0], prefix, token)
+    if not slugs:
+        raise ValueError(f"No books found at {url}{prefix}")
+    request_mix = RequestMix(mix, prefix, pages, slugs, words or ["book"], token, rng)
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+    try:
+        if rate:
+            await open_loop(
+                connections, request_mix, recorder, rate, deadline, timeout, rng
+            )
+        else:
+            await asyncio.gather(
+                *(
+                    closed_loop(connection, request_mix, recorder, deadline)
+                    for connection in connections
+                )
+            )
+    finally:
+        for connection in connections:
+            connection.close()
+    return recorder.summary(time.perf_counter() - start)
@@ -0,0 +1,483 @@
+import json
+import math
+import platform
+import random
+import time
+from contextlib import contextmanager
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+
+import django
+import rest_framework
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from books import facets, hotlists
+from books.caching import bump_generation, get_timeout
+from books.isbn import isbn13_check_digit
+from books.loadtest import percentile
+from books.models import GENRE_CHOICES, LANGUAGE_CHOICES, Book
+from books.slugs import base_slug
+
+SIZES = [10_000, 100_000, 1_000_000]
+SCENARIOS = [
+    "list",
+    "search",
+    "filter_order",
+    "retrieve",
+    "featured",
+    "by_genre",
+    "create",
+    "update",
+]
+
+# Rows inserted per bulk_create() while seeding
+SEED_BATCH_SIZE = 5000
+
+# ISBN prefixes of seeded books and of books created by the create scenario;
+# the remaining eight digits are the row number
+SEED_ISBN_PREFIX = "9791"
+CREATE_ISBN_PREFIX = "9792"
+
+# Cover image URLs of seeded and created books, followed by the row number.
+# These are what tell benchmark books apart: the .invalid top-level domain is
+# reserved (RFC 2606), so no real cover is ever under it.
+BENCHMARK_URL = "https://benchmark.invalid/"
+SEED_URL = f"{BENCHMARK_URL}seed/"
+CREATE_URL = f"{BENCHMARK_URL}create/"
+
+# Deepest page requested by the list scenario
+MAX_LIST_PAGE = 100
+
+# Words seeded titles are made of, and searched for
+WORDS = [
+    "silent",
+    "river",
+    "empire",
+    "shadow",
+    "garden",
+    "winter",
+    "crimson",
+    "machine",
+    "ocean",
+    "secret",
+    "forgotten",
+    "kingdom",
+    "glass",
+    "storm",
+    "letters",
+    "midnight",
+    "harvest",
+    "iron",
+    "paper",
+    "island",
+]
+
+GENRES = [value for value, _ in GENRE_CHOICES]
+LANGUAGES = [value for value, _ in LANGUAGE_CHOICES]
+
+
+def seed_isbn(prefix, number):
+    """
+    Return the valid ISBN-13 of row ``number`` under a four-digit prefix.
+    """
+    body = f"{prefix}{number:08d}"
+    return body + isbn13_check_digit(body)
+
+
+def seed_book(seed, number):
+    """
+    Return seeded row ``number`` as an unsaved Book.
+
+    Every row depends only on ``seed`` and ``number``, so a catalog grown
+    from 10k to 100k rows holds the same first 10k rows as a fresh one.
+    """
+    rng = random.Random(seed * 2**32 + number)
+    title = " ".join(rng.sample(WORDS, 3)).title()
+    slug_length = Book._meta.get_field("slug").max_length
+    rating = Decimal(rng.randint(0, 50)) / 10 if rng.random() < 0.8 else None
+    return Book(
+        title=title,
+        slug=f"{base_slug(title, slug_length)}-{number + 1}",
+        author=f"Author {rng.randint(1, 5000)}",
+        published_date=date(1950, 1, 1) + timedelta(days=rng.randint(0, 27000)),
+        isbn=seed_isbn(SEED_ISBN_PREFIX, number),
+        pages=rng.randint(50, 1000),
+        cover_image=f"{SEED_URL}{number}",
+        genre=rng.choice(GENRES),
+        language=rng.choice(LANGUAGES),
+        rating=rating,
+        price=Decimal(rng.randint(500, 5000)) / 100,
+    )
+
+
+@contextmanager
+def unthrottled():
+    """
+    Turn API throttling off for the duration of the block.
+
+    The rate throttles copy ``DEFAULT_THROTTLE_RATES`` into a class
+    attribute when DRF is imported, so overriding ``REST_FRAMEWORK`` alone
+    leaves the configured rates in force; the attribute is swapped too.
+    """
+    rates = {"anon": None, "user": None}
+    rest_framework_settings = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": rates,
+    }
+    previous = SimpleRateThrottle.THROTTLE_RATES
+    SimpleRateThrottle.THROTTLE_RATES = rates
+    try:
+        with override_settings(REST_FRAMEWORK=rest_framework_settings):
+            yield
+    finally:
+        SimpleRateThrottle.THROTTLE_RATES = previous
+
+
+def last_page(rows, limit):
+    """
+    Return the last page of ``rows`` results, at most ``limit``.
+    """
+    return max(1, min(limit, math.ceil(rows / api_settings.PAGE_SIZE)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the books API against seeded catalogs of 10k, 100k and 1M "
+        "books, reporting throughput and p50/p99 latency per endpoint as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default=",".join(str(size) for size in SIZES),
+            help="Comma-separated catalog sizes (default: 10000,100000,1000000)",
+        )
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(SCENARIOS),
+            help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Timed requests per scenario and size (default: 200)",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Untimed requests run before each scenario (default: 20)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the catalog and of the requests (default: 0)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON results to this file instead of stdout",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="JSON results of an earlier run to compare against",
+        )
+        parser.add_argument(
+            "--response-cache",
+            action="store_true",
+            help="Turn the response cache on, for BOOKS_RESPONSE_CACHE_TIMEOUT "
+            "or else 300 seconds (default: off, so every request reaches the "
+            "database)",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database, and the books seeded in it, for the "
+            "next run",
+        )
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help="Seed and benchmark the configured database instead of a test "
+            "database; it must hold no books but those of earlier benchmark "
+            "runs, and seeded books are never removed",
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(self.parse_list(options["sizes"], int))
+        scenarios = self.parse_list(options["scenarios"], str)
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        old_name = None
+        if options["in_place"]:
+            others = Book.objects.exclude(cover_image__startswith=BENCHMARK_URL)
+            if others.exists():
+                raise CommandError(
+                    "--in-place needs a database holding only benchmark books; "
+                    f"{others.count():,} other books were found"
+                )
+        else:
+            old_name = connection.creation.create_test_db(
+                verbosity=0,
+                autoclobber=True,
+                serialize=False,
+                keepdb=options["keepdb"],
+            )
+        try:
+            # Per-request timing log lines would flood the console and the
+            # measurements
+            overrides = {"BOOKS_SERVER_TIMING_SAMPLE_RATE": 0}
+            if not options["response_cache"]:
+                overrides["BOOKS_RESPONSE_CACHE_TIMEOUT"] = 0
+            elif not get_timeout():
+                # Off by default without a shared cache; this process is the
+                # only one using it
+                overrides["BOOKS_RESPONSE_CACHE_TIMEOUT"] = 300
+            # Thousands of requests from one user would exceed the daily
+            # throttle rates
+            with override_settings(**overrides), unthrottled():
+                results = self.run(sizes, scenarios, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options["keepdb"]
+                )
+
+        report = {
+            "environment": self.environment(options),
+            "results": results,
+        }
+        if baseline is not None:
+            report["comparison"] = self.compare(results, baseline.get("results", {}))
+
+        content = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(content + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}")
+            )
+            self.write_comparison(report.get("comparison", {}))
+        else:
+            self.stdout.write(content)
+
+    def parse_list(self, value, kind):
+        try:
+            return [kind(item.strip()) for item in value.split(",") if item.strip()]
+        except ValueError as error:
+            raise CommandError(f"Invalid list {value!r}: {error}")
+
+    def run(self, sizes, scenarios, options):
+        """
+        Seed each catalog size in turn and time every scenario against it.
+
+        Returns:
+            dict: ``{size: {scenario: stats}}``
+        """
+        user, _ = User.objects.get_or_create(username="benchmark")
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user=user)
+        results = {}
+        for size in sizes:
+            self.seed(size, options["seed"])
+            results[str(size)] = {}
+            for scenario in scenarios:
+                stats = self.measure(client, scenario, size, options)
+                results[str(size)][scenario] = stats
+                self.stderr.write(self.format_stats(size, scenario, stats))
+        return results
+
+    def seed(self, size, seed):
+        """
+        Add seeded books until the catalog holds ``size`` of them.
+        """
+        seeded = Book.objects.filter(cover_image__startswith=SEED_URL).count()
+        if seeded >= size:
+            return
+        self.stderr.write(f"Seeding {size - seeded:,} books...")
+        for start in range(seeded, size, SEED_BATCH_SIZE):
+            stop = min(start + SEED_BATCH_SIZE, size)
+            Book.objects.bulk_create(
+                seed_book(seed, number) for number in range(start, stop)
+            )
+            self.stderr.write(f"\r  {stop:,}/{size:,}", ending="")
+        self.stderr.write("")
+        # bulk_create() sends no signals: recount the facets and drop cached
+        # pages and hot lists, as the bulk endpoints do.
+        facets.resync()
+        bump_generation()
+        hotlists.invalidate()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Book._meta.db_table}")
+
+    def requests(self, scenario, size, seed, rng, numbers):
+        """
+        Yield ``(method, url, data, expected status)`` of the requests
+        numbered ``numbers``.
+        """
+        list_url = reverse("book-list")
+        # Only request pages that exist; counted before the first request
+        genre_counts = dict(
+            Book.objects.order_by().values_list("genre").annotate(Count("pk"))
+        )
+        featured_count = Book.objects.filter(
+            rating__gte=hotlists.FEATURED_MIN_RATING
+        ).count()
+        for number in numbers:
+            if scenario == "list":
+                page = rng.randint(1, last_page(size, MAX_LIST_PAGE))
+                yield "get", list_url, {"page": page}, 200
+            elif scenario == "search":
+                yield "get", list_url, {"search": rng.choice(WORDS)}, 200
+            elif scenario == "filter_order":
+                genre = rng.choice(GENRES)
+                params = {
+                    "genre": genre,
+                    "ordering": rng.choice(["title", "-published_date", "-rating"]),
+                    "page": rng.randint(1, last_page(genre_counts.get(genre, 0), 5)),
+                }
+                yield "get", list_url, params, 200
+            elif scenario == "retrieve":
+                slug = seed_book(seed, rng.randrange(size)).slug
+                yield "get", reverse("book-detail", args=[slug]), None, 200
+            elif scenario == "featured":
+                params = {"page": rng.randint(1, last_page(featured_count, 3))}
+                yield "get", reverse("book-featured"), params, 200
+            elif scenario == "by_genre":
+                genre = rng.choice(GENRES)
+                url = reverse("book-by-genre", kwargs={"genre_name": genre})
+                page = rng.randint(1, last_page(genre_counts.get(genre, 0), 3))
+                yield "get", url, {"page": page}, 200
+            elif scenario == "create":
+                book = seed_book(seed, size + number)
+                data = {
+                    "title": book.title,
+                    "author": book.author,
+                    "published_date": book.published_date.isoformat(),
+                    "isbn": seed_isbn(CREATE_ISBN_PREFIX, number),
+                    "pages": book.pages,
+                    "genre": book.genre,
+                    "language": book.language,
+                    "cover_image": f"{CREATE_URL}{number}",
+                }
+                yield "post", list_url, data, 201
+            elif scenario == "update":
+                slug = seed_book(seed, rng.randrange(size)).slug
+                data = {"rating": str(Decimal(rng.randint(0, 50)) / 10)}
+                yield "patch", reverse("book-detail", args=[slug]), data, 200
+
+    def measure(self, client, scenario, size, options):
+        """
+        Time one scenario against the current catalog.
+
+        Returns:
+            dict: The number of requests, throughput in requests/second and
+            latency percentiles in milliseconds
+        """
+        seed = options["seed"]
+        warmup = options["warmup"]
+        rng = random.Random(f"{seed}:{scenario}:{size}")
+        for request in self.requests(scenario, size, seed, rng, range(warmup)):
+            self.send(client, *request)
+
+        timings = []
+        numbers = range(warmup, warmup + options["requests"])
+        for request in self.requests(scenario, size, seed, rng, numbers):
+            start = time.perf_counter()
+            self.send(client, *request)
+            timings.append(time.perf_counter() - start)
+
+        if scenario == "create":
+            # Keep the catalog at its seeded size for the next scenarios
+            Book.objects.filter(cover_image__startswith=CREATE_URL).delete()
+
+        timings.sort()
+        total = sum(timings)
+        return {
+            "requests": len(timings),
+            "throughput": round(len(timings) / total, 2) if total else None,
+            "mean_ms": round(total / len(timings) * 1000, 3) if timings else None,
+            "p50_ms": round(percentile(timings, 50) * 1000, 3) if timings else None,
+            "p99_ms": round(percentile(timings, 99) * 1000, 3) if timings else None,
+        }
+
+    def send(self, client, method, url, data, expected):
+        response = getattr(client, method)(
+            url, data, format=None if method == "get" else "json"
+        )
+        if response.status_code != expected:
+            raise CommandError(
+                f"{method.upper()} {url} returned {response.status_code}, "
+                f"expected {expected}: {response.content[:200]!r}"
+            )
+
+    def environment(self, options):
+        """
+        Describe what was benchmarked, so runs can be compared.
+        """
+        return {
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "djangorestframework": rest_framework.__version__,
+            "database": connection.vendor,
+            "platform": platform.platform(),
+            "seed": options["seed"],
+            "requests": options["requests"],
+            "warmup": options["warmup"],
+            "response_cache": options["response_cache"],
+        }
+
+    def compare(self, results, baseline):
+        """
+        Return the relative change of each statistic against a baseline run.
+
+        Returns:
+            dict: ``{size: {scenario: {statistic: change}}}``, where a change
+            of 0.1 means 10% higher than the baseline
+        """
+        comparison = {}
+        for size, scenarios in results.items():
+            for scenario, stats in scenarios.items():
+                previous = baseline.get(size, {}).get(scenario)
+                if not previous:
+                    continue
+                changes = {}
+                for name in ["throughput", "p50_ms", "p99_ms"]:
+                    if stats.get(name) and previous.get(name):
+                        changes[name] = round(stats[name] / previous[name] - 1, 4)
+                comparison.setdefault(size, {})[scenario] = changes
+        return comparison
+
+    def format_stats(self, size, scenario, stats):
+        return (
+            f"{size:>9,} {scenario:<13} {stats['throughput'] or 0:>9.1f} req/s"
+            f"  p50 {stats['p50_ms'] or 0:>8.2f} ms"
+            f"  p99 {stats['p99_ms'] or 0:>8.2f} ms"
+        )
+
+    def write_comparison(self, comparison):
+        for size, scenarios in comparison.items():
+            for scenario, changes in scenarios.items():
+                summary = ", ".join(
+                    f"{name} {change:+.1%}" for name, change in changes.items()
+                )
+                self.stdout.write(
+                    f"{int(size):>9,} {scenario:<13} vs baseline: {summary}"
+                )
@@ -0,0 +1,103 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.models import GENRE_CHOICES, Book
+from books.serializers import BookListSerializer, FastListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the fast-path list serializer against BookListSerializer "
+        "(rows/second, no database access)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Number of rows to serialize per run (default: 10000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed runs; the best one is reported (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        books, values = self.make_rows(rows)
+        request = Request(
+            APIRequestFactory().get(reverse("book-list"), SERVER_NAME="localhost")
+        )
+        context = {"request": request}
+
+        def drf():
+            return BookListSerializer(books, many=True, context=context).data
+
+        def fast():
+            serializer = FastListSerializer(BookListSerializer(context=context))
+            return serializer.serialize(values)
+
+        if [dict(row) for row in drf()] != fast():
+            self.stderr.write(self.style.ERROR("Serializer outputs differ!"))
+            return
+
+        drf_rate = rows / self.best_time(drf, repeat)
+        fast_rate = rows / self.best_time(fast, repeat)
+        self.stdout.write(f"BookListSerializer:  {drf_rate:>12,.0f} rows/s")
+        self.stdout.write(f"FastListSerializer:  {fast_rate:>12,.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {fast_rate / drf_rate:.1f}x"))
+
+    def best_time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def make_rows(self, count):
+        """
+        Build matching unsaved Book instances and ``.values()`` rows.
+        """
+        rng = random.Random(0)
+        genres = [g[0] for g in GENRE_CHOICES]
+        books = []
+        values = []
+        for i in range(count):
+            rating = Decimal(rng.randint(0, 50)) / 10 if i % 2 else None
+            book = Book(
+                id=i + 1,
+                title=f"Benchmark Book {i}",
+                slug=f"benchmark-book-{i}",
+                author=f"Author {i % 997}",
+                published_date=date(2000, 1, 1) + timedelta(days=i % 9000),
+                isbn=f"{9780000000000 + i}",
+                pages=100 + i % 900,
+                genre=rng.choice(genres),
+                rating=rating,
+            )
+            books.append(book)
+            values.append(
+                {
+                    "id": book.id,
+                    "title": book.title,
+                    "slug": book.slug,
+                    "author": book.author,
+                    "published_date": book.published_date,
+                    "isbn": book.isbn,
+                    "genre": book.genre,
+                    "rating": book.rating,
+                }
+            )
+        return books, values
@@ -0,0 +1,227 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.settings import api_settings
+
+from books import bulk, facets, importing
+from books.caching import process_local_warning
+from books.models import Book
+from books.signals import books_bulk_changed
+
+# Width of the progress bar, in characters
+PROGRESS_BAR_WIDTH = 30
+
+# Totals reported, and saved in the checkpoint
+COUNTS = ("inserted", "updated", "unchanged", "rejected")
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports books from a CSV or JSONL file, inserting new ISBNs and "
+        "updating existing ones, validated as the API validates them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file to import")
+        parser.add_argument(
+            "--format",
+            choices=sorted(set(importing.FORMATS.values())),
+            help="Format of the file (default: from its extension)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Rows validated and written per transaction (default: 10000)",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="File rejected rows are written to, as JSON lines with their "
+            "line number and errors (default: <path>.rejects.jsonl)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File the position of the import is saved to after each "
+            "chunk, to resume from after a failure (default: <path>.checkpoint)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and import the file from the start",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or importing.detect_format(path)
+        if input_format is None:
+            raise CommandError(
+                f"Cannot tell the format of {path} from its extension; pass --format"
+            )
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        try:
+            stat = os.stat(path)
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error.strerror}")
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        rejects_path = options["rejects"] or f"{path}.rejects.jsonl"
+
+        source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        state = None
+        if not options["restart"]:
+            state = importing.load_checkpoint(checkpoint_path)
+        if state is None:
+            state = {
+                "source": source,
+                "offset": 0,
+                "line": 0,
+                "header": None,
+                "rejects_offset": 0,
+                "counts": dict.fromkeys(COUNTS, 0),
+            }
+            self.stdout.write(f"Importing {path}...")
+        elif state["source"] != source:
+            raise CommandError(
+                f"{path} has changed since {checkpoint_path} was saved; "
+                "pass --restart to import it from the start"
+            )
+        else:
+            self.stdout.write(
+                f"Resuming the import of {path} after line {state['line']}..."
+            )
+
+        self.written = False
+        start = time.perf_counter()
+        processed = 0
+        try:
+            with open(path, "rb") as file, open(rejects_path, "ab") as rejects:
+                # Drop rejects of a chunk that failed after they were written
+                rejects.truncate(state["rejects_offset"])
+                file.seek(state["offset"])
+                lines = importing.LineReader(file, state["line"])
+                if input_format == "csv":
+                    if state["header"] is None:
+                        state["header"] = importing.read_csv_header(lines) or []
+                    records = importing.read_csv(lines, state["header"])
+                else:
+                    records = importing.read_jsonl(lines)
+
+                chunk = []
+                for record in records:
+                    chunk.append(record)
+                    if len(chunk) < options["chunk_size"]:
+                        continue
+                    self.import_chunk(chunk, state, rejects)
+                    self.save_checkpoint(checkpoint_path, state, lines, rejects)
+                    processed += len(chunk)
+                    chunk = []
+                    self.show_progress(lines.offset, stat.st_size, processed, start)
+                if chunk:
+                    self.import_chunk(chunk, state, rejects)
+                    self.save_checkpoint(checkpoint_path, state, lines, rejects)
+                    processed += len(chunk)
+                    self.show_progress(lines.offset, stat.st_size, processed, start)
+                if self.stderr.isatty() and processed:
+                    self.stderr.write("")
+        finally:
+            if self.written:
+                # Rows were written without post_save signals, and chunks
+                # did not resync the facets; recount them once.
+                facets.resync()
+
+        # The file was imported in full: the next run starts over
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        if not state["counts"]["rejected"]:
+            os.remove(rejects_path)
+
+        counts = state["counts"]
+        rate = processed / (time.perf_counter() - start) if processed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {path}: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['unchanged']} unchanged, "
+                f"{counts['rejected']} rejected ({rate:,.0f} rows/s)"
+            )
+        )
+        if counts["rejected"]:
+            self.stdout.write(
+                self.style.WARNING(f"Rejected rows were written to {rejects_path}")
+            )
+        warning = process_local_warning()
+        if warning and self.written:
+            self.stderr.write(self.style.WARNING(warning))
+
+    def import_chunk(self, chunk, state, rejects):
+        """
+        Validate a chunk of ``(line, item, error)`` records, upsert the valid
+        ones in one transaction, and append the others to the rejects file.
+
+        Items are validated by ``bulk.validate_books`` as the API's bulk
+        writes are, so an ISBN repeated within a chunk is rejected; an ISBN
+        repeated in a later chunk updates the book again. On PostgreSQL the
+        books are loaded with ``COPY`` into a staging table and merged on
+        ISBN, elsewhere written with ``INSERT ... ON CONFLICT``, and
+        ``books_bulk_changed`` is sent with the primary keys written.
+        """
+        parsed = [(line, item) for line, item, error in chunk if error is None]
+        rejected = [
+            (line, item, {api_settings.NON_FIELD_ERRORS_KEY: [error]})
+            for line, item, error in chunk
+            if error is not None
+        ]
+        valid, errors = bulk.validate_books([item for _, item in parsed], context={})
+        for error in errors:
+            line, item = parsed[error["index"]]
+            rejected.append((line, item, error["errors"]))
+
+        with transaction.atomic():
+            books, counts = bulk.prepare_upserts(valid)
+            if connection.vendor == "postgresql":
+                bulk.copy_upserts(books)
+            else:
+                bulk.write_upserts(books)
+            if books:
+                self.written = True
+                # COPY sets no primary keys; read them back by ISBN
+                pks = Book.objects.filter(
+                    isbn__in=[book.isbn for book in books]
+                ).values_list("pk", flat=True)
+                # Invalidates cached pages and hot lists, and refreshes
+                # the autocomplete index, as the API's bulk writes do
+                books_bulk_changed.send(sender=Book, pks=list(pks))
+
+        for line, item, errors in sorted(rejected, key=lambda reject: reject[0]):
+            reject = {"line": line, "record": item, "errors": errors}
+            rejects.write(json.dumps(reject).encode() + b"\n")
+        for name, count in counts.items():
+            state["counts"][name] += count
+        state["counts"]["rejected"] += len(rejected)
+
+    def save_checkpoint(self, path, state, lines, rejects):
+        """
+        Record that the file was imported up to the reader's position.
+        """
+        rejects.flush()
+        state["offset"] = lines.offset
+        state["line"] = lines.line
+        state["rejects_offset"] = rejects.tell()
+        importing.save_checkpoint(path, state)
+
+    def show_progress(self, done, total, rows, start):
+        """
+        Redraw the progress bar, when writing to a terminal.
+        """
+        if not self.stderr.isatty() or not total:
+            return
+        filled = PROGRESS_BAR_WIDTH * done // total
+        rate = rows / max(time.perf_counter() - start, 1e-9)
+        bar = "#" * filled + "." * (PROGRESS_BAR_WIDTH - filled)
+        self.stderr.write(
+            f"\r[{bar}] {done / 2**20:,.1f}/{total / 2**20:,.1f} MB "
+            f"({rate:,.0f} rows/s)",
+            ending="",
+        )
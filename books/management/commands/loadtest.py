@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a weighted mix of book API requests against a running server "
+        "from concurrent keep-alive clients, and reports throughput, latency "
+        "percentiles and error rates"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://localhost:8000",
+            help="Base URL of the server (default: http://localhost:8000)",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="/api/v1/books/",
+            help="Path of the books endpoint (default: /api/v1/books/)",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=10,
+            help="Number of concurrent keep-alive connections (default: 10)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30,
+            help="Seconds to send requests for (default: 30)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help="Open-loop arrival rate in requests/second; by default every "
+            "client sends its next request as soon as the last one is answered",
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={w}" for name, w in loadtest.DEFAULT_MIX.items()),
+            help="Comma-separated action=weight pairs; actions are "
+            f"{', '.join(loadtest.ACTIONS)} (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--token",
+            help="API token to authenticate with, required by create and update",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10,
+            help="Per-request timeout in seconds (default: 10)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the requests drawn (default: 0)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Also write the JSON report to this file",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as error:
+            raise CommandError(f"Invalid --mix: {error}")
+        writes = sorted(loadtest.WRITE_ACTIONS & {a for a, w in mix.items() if w})
+        if writes and not options["token"]:
+            raise CommandError(f"--token is required by {', '.join(writes)}")
+        if options["clients"] < 1:
+            raise CommandError("--clients must be at least 1")
+        if options["rate"] is not None and options["rate"] <= 0:
+            raise CommandError("--rate must be positive")
+
+        mode = (
+            f"{options['rate']:g} req/s open loop" if options["rate"] else "closed loop"
+        )
+        self.stdout.write(
+            f"Load testing {options['url']}{options['prefix']} with "
+            f"{options['clients']} clients for {options['duration']:g}s ({mode})..."
+        )
+        try:
+            summary = asyncio.run(
+                loadtest.run(
+                    options["url"],
+                    options["prefix"],
+                    mix,
+                    options["clients"],
+                    options["duration"],
+                    rate=options["rate"],
+                    token=options["token"],
+                    timeout=options["timeout"],
+                    seed=options["seed"],
+                )
+            )
+        except (TimeoutError, OSError, ValueError) as error:
+            raise CommandError(f"Could not load test {options['url']}: {error}")
+
+        report = {
+            "url": options["url"],
+            "clients": options["clients"],
+            "duration_s": options["duration"],
+            "rate": options["rate"],
+            "mix": mix,
+            **summary,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+        self.write_summary(summary)
+
+    def write_summary(self, summary):
+        latency = summary["latency_ms"]
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s: "
+            f"{summary['throughput']:.1f} req/s, "
+            f"{summary['error_rate']:.2%} errors, {summary['dropped']} dropped"
+        )
+        if latency:
+            self.stdout.write(
+                f"Latency: p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, "
+                f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms"
+            )
+        for action, stats in summary["actions"].items():
+            latency = stats["latency_ms"]
+            self.stdout.write(
+                f"  {action:<13} {stats['requests']:>7}"
+                f"  errors {stats['error_rate']:>7.2%}"
+                f"  p50 {latency['p50']:>8.2f} ms  p99 {latency['p99']:>8.2f} ms"
+            )
+        self.stdout.write(
+            "Status codes: "
+            + ", ".join(f"{code}={n}" for code, n in summary["status_codes"].items())
+        )
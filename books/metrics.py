@@ -0,0 +1,210 @@
+import atexit
+import hmac
+import os
+import threading
+import time
+
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Each gunicorn worker writes its samples to memory-mapped files in this
+# directory, which /metrics aggregates; see gunicorn.conf.py
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def ensure_multiproc_dir():
+    """
+    Create the multiprocess directory if ``PROMETHEUS_MULTIPROC_DIR`` is
+    set, since prometheus_client then fails to record any sample until it
+    exists (gunicorn.conf.py also empties it when gunicorn starts).
+    """
+    path = os.environ.get(MULTIPROC_DIR_ENV)
+    if path:
+        os.makedirs(path, exist_ok=True)
+
+
+ensure_multiproc_dir()
+
+# Label of requests not routed to a BookViewSet action
+OTHER_ACTION = "other"
+
+REQUEST_DURATION = Histogram(
+    "books_request_duration_seconds",
+    "Time to answer a request, by view action, method and status code",
+    ["action", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "books_request_db_queries",
+    "Number of SQL queries run by a request, by view action",
+    ["action"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+RESPONSE_SIZE = Histogram(
+    "books_response_size_bytes",
+    "Size of response bodies, by view action and status code",
+    ["action", "status"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+RESPONSE_CACHE = Counter(
+    "books_response_cache_requests",
+    "Lookups in the response cache, by view action and result (hit or miss)",
+    ["action", "result"],
+)
+
+# Observations are kept in process memory and written to the metrics at
+# most this many seconds later, by a background thread (and before /metrics
+# is rendered). Each write to an mmap-backed value takes a lock and packs a
+# float; deferring them keeps them out of the request path.
+FLUSH_INTERVAL = 1.0
+
+# Labelled children by label values, which labels() looks up under a lock
+_children = {}
+
+# Pending observations by metric and label values: the observed values for
+# histograms, the total increment for counters
+_pending = {}
+_lock = threading.Lock()
+
+# Process id of the flushing thread, which a forked worker does not inherit
+_flusher_pid = None
+
+
+def child(metric, *labels):
+    """
+    Return the child of ``metric`` with the given label values.
+    """
+    key = (metric, labels)
+    try:
+        return _children[key]
+    except KeyError:
+        return _children.setdefault(key, metric.labels(*labels))
+
+
+def observe(metric, labels, value):
+    """
+    Record an observation of a labelled histogram, to be written by the
+    next flush().
+
+    Args:
+        metric: The Histogram
+        labels: The tuple of label values
+        value: The observed value
+    """
+    key = (metric, labels)
+    with _lock:
+        pending = _pending.get(key)
+        if pending is None:
+            ensure_flusher()
+            pending = _pending[key] = []
+        pending.append(value)
+
+
+def increment(metric, labels, amount=1):
+    """
+    Record an increment of a labelled counter, to be written by the next
+    flush().
+    """
+    key = (metric, labels)
+    with _lock:
+        if key not in _pending:
+            ensure_flusher()
+            _pending[key] = 0
+        _pending[key] += amount
+
+
+def flush():
+    """
+    Write the pending observations of this process to the metrics, with
+    the public ``observe()`` and ``inc()`` of prometheus_client.
+    """
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    for (metric, labels), value in pending.items():
+        labelled = child(metric, *labels)
+        if isinstance(value, list):
+            for observed in value:
+                labelled.observe(observed)
+        else:
+            labelled.inc(value)
+
+
+def ensure_flusher():
+    """
+    Start the thread flushing observations every FLUSH_INTERVAL seconds,
+    unless this process runs one already.
+    """
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_forever, name="metrics-flush", daemon=True).start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def get_action(request):
+    """
+    Return the view action label of a request, set by MetricsMiddleware.
+    """
+    return getattr(request, "metrics_action", OTHER_ACTION)
+
+
+def record_cache_lookup(request, hit):
+    """
+    Count a response cache lookup of a request.
+    """
+    increment(RESPONSE_CACHE, (get_action(request), "hit" if hit else "miss"))
+
+
+def get_registry():
+    """
+    Return the registry to expose: one aggregating every worker's files in
+    multiprocess mode, the process's own registry otherwise.
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def is_scrape_allowed(request):
+    """
+    Return whether a request may read /metrics: it comes from one of
+    ``BOOKS_METRICS_ALLOWED_IPS``, or carries ``BOOKS_METRICS_TOKEN`` as a
+    bearer token.
+    """
+    allowed_ips = getattr(settings, "BOOKS_METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+    if request.META.get("REMOTE_ADDR") in allowed_ips:
+        return True
+    token = getattr(settings, "BOOKS_METRICS_TOKEN", "")
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(token) and hmac.compare_digest(
+        authorization.encode(), f"Bearer {token}".encode()
+    )
+
+
+def render_metrics():
+    """
+    Return ``(body, content type)`` of the Prometheus text exposition.
+    """
+    flush()
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+# Gunicorn workers exit normally on restarts and shutdowns
+atexit.register(flush)
@@ -0,0 +1,224 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from books import metrics, timing
+
+logger = logging.getLogger("books.timing")
+
+
+def get_sample_rate():
+    """
+    Return the fraction of requests timed by ServerTimingMiddleware.
+    """
+    return getattr(settings, "BOOKS_SERVER_TIMING_SAMPLE_RATE", 0.01)
+
+
+def shows_server_timing(request):
+    """
+    Return whether the client of a timed request gets the Server-Timing
+    header: every client with ``BOOKS_SERVER_TIMING_PUBLIC``, staff users
+    otherwise.
+    """
+    if getattr(settings, "BOOKS_SERVER_TIMING_PUBLIC", False):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_staff)
+
+
+class ServerTimingMiddleware:
+    """
+    Report where a request spent its time in a JSON log line on the
+    ``books.timing`` logger and, for staff users (or everyone with
+    ``BOOKS_SERVER_TIMING_PUBLIC``), a ``Server-Timing`` header.
+
+    For a sample of ``BOOKS_SERVER_TIMING_SAMPLE_RATE`` of the requests,
+    records the number of SQL queries and the time spent running them
+    (through ``connection.execute_wrapper()``), in serializers and in the
+    renderer, and the total time. Requests outside the sample only pay for
+    one random number.
+
+    Goes right after MetricsMiddleware in ``MIDDLEWARE`` (see the settings),
+    so the timings cover the other middleware and the rendering of template
+    responses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = get_sample_rate()
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timings = timing.RequestTimings()
+        token = timing.current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        total = time.perf_counter() - timings.start
+
+        if shows_server_timing(request):
+            response.headers["Server-Timing"] = self.server_timing(timings, total)
+        logger.info(self.log_line(request, response, timings, total))
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Time the rendering of template responses, such as DRF's Response,
+        which Django renders right after this hook.
+        """
+        timings = timing.current.get()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.add("render", time.perf_counter() - start)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def server_timing(self, timings, total):
+        """
+        Return the ``Server-Timing`` header value of a request.
+        """
+        metrics = [f'db;dur={timings.sql * 1000:.2f};desc="{timings.queries} queries"']
+        for name, duration in timings.phases.items():
+            metrics.append(f"{name};dur={duration * 1000:.2f}")
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def log_line(self, request, response, timings, total):
+        """
+        Return the JSON log line of a request.
+        """
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": timings.queries,
+            "db_ms": round(timings.sql * 1000, 2),
+            **{
+                f"{name}_ms": round(duration * 1000, 2)
+                for name, duration in timings.phases.items()
+            },
+            "total_ms": round(total * 1000, 2),
+        }
+        return json.dumps(record)
+
+
+class QueryCounter:
+    """
+    Number of database queries of a request; see ``count_queries``.
+    """
+
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+# QueryCounter of the request MetricsMiddleware is handling
+current_queries = ContextVar("current_queries", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper counting a query against the current request, if any.
+    """
+    counter = current_queries.get()
+    if counter is not None:
+        counter.queries += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender=None, connection=None, **kwargs):
+    """
+    Add ``count_queries`` to the execute wrappers of a connection, once.
+
+    It goes first in the list, because ``connection.execute_wrapper()``
+    removes the last wrapper when it exits.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+class MetricsMiddleware:
+    """
+    Record Prometheus metrics of every request: its latency, number of SQL
+    queries and response size, labelled by ``BookViewSet`` action (or URL
+    name for other views) and status code.
+
+    Observations are kept in process memory and written to the metrics
+    once a second (see ``books.metrics.flush``). Queries are counted
+    by a wrapper installed on every connection when it connects, rather
+    than per request, so a request only pays for a context variable and a
+    few in-memory increments. Goes first in ``MIDDLEWARE`` (see the
+    settings), so the latency covers all the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(
+            install_query_counter, dispatch_uid="books.middleware.count_queries"
+        )
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection=connection)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        counter = QueryCounter()
+        token = current_queries.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        duration = time.perf_counter() - start
+
+        action = metrics.get_action(request)
+        status = str(response.status_code)
+        metrics.observe(
+            metrics.REQUEST_DURATION, (action, request.method, status), duration
+        )
+        metrics.observe(metrics.REQUEST_QUERIES, (action,), counter.queries)
+        size = self.response_size(response)
+        if size is not None:
+            metrics.observe(metrics.RESPONSE_SIZE, (action, status), size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Label the request with the viewset action or URL name it routes to.
+        """
+        actions = getattr(view_func, "actions", None)
+        if actions is not None:
+            action = actions.get(request.method.lower(), metrics.OTHER_ACTION)
+        else:
+            action = request.resolver_match.url_name or metrics.OTHER_ACTION
+        request.metrics_action = action
+        return None
+
+    def response_size(self, response):
+        """
+        Return the size of a response body in bytes, or None if it is
+        streamed without a Content-Length.
+        """
+        if not response.streaming:
+            return len(response.content)
+        length = response.get("Content-Length")
+        return int(length) if length else None
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_alter_book_pages"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["published_date", "id"], name="books_book_publish_b067b7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["title", "id"], name="books_book_title_eba785_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["rating", "id"], name="books_book_rating_b8594c_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["genre", "published_date", "id"],
+                name="books_book_genre_287051_idx",
+            ),
+        ),
+    ]
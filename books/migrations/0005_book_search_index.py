@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Must match books.search.book_search_vector() exactly, or PostgreSQL will not
+# use the index for ?search= queries.
+SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A')"
+    " || setweight(to_tsvector('english'::regconfig, COALESCE(author, '')), 'B'))"
+    " || setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS books_book_search_idx ON books_book "
+        f"USING gin (({SEARCH_VECTOR_SQL}))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS books_book_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
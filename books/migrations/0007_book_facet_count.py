@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_books(apps, schema_editor):
+    Book = apps.get_model("books", "Book")
+    BookFacetCount = apps.get_model("books", "BookFacetCount")
+    db = schema_editor.connection.alias
+    BookFacetCount.objects.using(db).bulk_create(
+        BookFacetCount(facet=facet, value=row[facet], count=row["count"])
+        for facet in ("genre", "language")
+        for row in Book.objects.using(db)
+        .values(facet)
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0006_book_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookFacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "facet",
+                    models.CharField(
+                        help_text="The counted Book field (genre or language)",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(help_text="The value of the field", max_length=30),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of books with this value"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("facet", "value"), name="unique_book_facet_value"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(count_existing_books, migrations.RunPython.noop),
+    ]
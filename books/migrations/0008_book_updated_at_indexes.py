@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0007_book_facet_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["updated_at"], name="books_book_updated_f9663f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["genre", "updated_at"], name="books_book_genre_b07c9d_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations, models, transaction
+from django.db.models import Count, Min
+
+from books.slugs import assign_slugs
+
+# Books re-slugged per transaction
+BATCH_SIZE = 1000
+
+
+def backfill_slugs(apps, schema_editor):
+    """
+    Give every book a unique slug before the unique index is built.
+
+    Books without a slug, and all but the oldest book of each duplicated
+    slug, get a new slug from assign_slugs(). Books are read and written in
+    batches of BATCH_SIZE, each in its own transaction, so large tables are
+    neither loaded at once nor locked for the whole backfill.
+    """
+    alias = schema_editor.connection.alias
+    books = apps.get_model("books", "Book")._default_manager.db_manager(alias)
+
+    pks = list(books.filter(slug="").values_list("pk", flat=True))
+    duplicates = (
+        books.exclude(slug="")
+        .order_by()
+        .values("slug")
+        .annotate(count=Count("pk"), oldest=Min("pk"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        pks.extend(
+            books.filter(slug=duplicate["slug"])
+            .exclude(pk=duplicate["oldest"])
+            .values_list("pk", flat=True)
+        )
+    pks.sort()
+
+    for start in range(0, len(pks), BATCH_SIZE):
+        with transaction.atomic(using=alias):
+            batch = list(
+                books.filter(pk__in=pks[start : start + BATCH_SIZE])
+                .only("pk", "title", "slug")
+                .order_by("pk")
+            )
+            for book in batch:
+                book.slug = ""
+            assign_slugs(batch, books)
+            books.bulk_update(batch, ["slug"])
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("books", "0008_book_updated_at_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="book",
+            name="slug",
+            field=models.SlugField(
+                blank=True,
+                help_text="URL-friendly version of the title (auto-generated)",
+                max_length=250,
+                unique=True,
+            ),
+        ),
+    ]
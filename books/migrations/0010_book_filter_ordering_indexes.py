@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0009_book_unique_slug"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_title_d3218d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_isbn_54becd_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_publish_649cd8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_genre_4a7cdf_idx",
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["genre", "title", "id"], name="books_book_genre_ca2953_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["genre", "rating", "id"], name="books_book_genre_ad0811_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["language", "published_date", "id"],
+                name="books_book_languag_f63f10_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["language", "title", "id"], name="books_book_languag_33db4b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["language", "rating", "id"],
+                name="books_book_languag_1a2973_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["language", "updated_at"], name="books_book_languag_45f9e3_idx"
+            ),
+        ),
+    ]
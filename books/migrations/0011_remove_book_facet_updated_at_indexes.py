@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0010_book_filter_ordering_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_genre_b07c9d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="book",
+            name="books_book_languag_45f9e3_idx",
+        ),
+    ]
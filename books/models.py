@@ -1,6 +1,7 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.utils.text import slugify
+from django.db import IntegrityError, models, transaction
+
+from books.slugs import assign_slugs
 
 # Available language choices for books
 LANGUAGE_CHOICES = (
@@ -30,6 +31,9 @@ GENRE_CHOICES = (
     ("other", "Other"),
 )
 
+# How many generated slugs Book.save() tries before giving up on a race
+SLUG_ATTEMPTS = 3
+
 
 # Author and Publisher models will be added in a later migration
 
@@ -46,6 +50,7 @@ class Book(models.Model):
     slug = models.SlugField(
         max_length=250,
         blank=True,
+        unique=True,
         help_text="URL-friendly version of the title (auto-generated)",
     )
     author = models.CharField(max_length=100, help_text="The author's name")
@@ -102,21 +107,85 @@ class Book(models.Model):
 
     class Meta:
         ordering = ["-published_date"]
+        # One index per list filter (none, genre, language) and ordering
+        # (title, published_date, rating), with the primary key as the
+        # tiebreaker keyset pagination sorts by. Each serves both sort
+        # directions, and its leading columns serve the filter alone.
+        # books/tests/test_query_plans.py checks the plans.
         indexes = [
-            models.Index(fields=["title"]),
-            models.Index(fields=["isbn"]),
-            models.Index(fields=["published_date"]),
-            models.Index(fields=["genre"]),
+            models.Index(fields=["published_date", "id"]),
+            models.Index(fields=["title", "id"]),
+            models.Index(fields=["rating", "id"]),
+            models.Index(fields=["genre", "published_date", "id"]),
+            models.Index(fields=["genre", "title", "id"]),
+            models.Index(fields=["genre", "rating", "id"]),
+            models.Index(fields=["language", "published_date", "id"]),
+            models.Index(fields=["language", "title", "id"]),
+            models.Index(fields=["language", "rating", "id"]),
+            # MAX(updated_at) of the list validators, see books.conditional
+            models.Index(fields=["updated_at"]),
         ]
 
     def save(self, *args, **kwargs):
         """
         Override the save method to automatically generate a slug from the title
         if one is not provided.
+
+        Generated slugs get a numeric suffix (``-2``, ``-3``, ...) when the
+        title's slug is taken; see ``books.slugs.assign_slugs``. If a
+        concurrent save takes the same slug first, a new one is generated.
         """
-        if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+        using = kwargs.get("using")
+        generated = not self.slug
+        for attempt in range(SLUG_ATTEMPTS):
+            if generated:
+                self.slug = ""
+                assign_slugs([self], type(self)._default_manager.db_manager(using))
+            try:
+                # post_save receivers (such as the facet counters) write
+                # related rows; run them in the same transaction as the book.
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = (
+                    type(self)
+                    ._default_manager.db_manager(using)
+                    .filter(slug=self.slug)
+                    .exclude(pk=self.pk)
+                    .exists()
+                )
+                if not generated or not slug_taken or attempt == SLUG_ATTEMPTS - 1:
+                    raise
+            else:
+                return
 
     def __str__(self):
         return self.title
+
+
+class BookFacetCount(models.Model):
+    """
+    Model holding the number of books with a given genre or language.
+
+    Rows are kept up to date by the signal handlers in ``books.signals`` in
+    the same transaction as the book writes, so facet counts for the whole
+    catalog are read without scanning the books table.
+    """
+
+    facet = models.CharField(
+        max_length=30, help_text="The counted Book field (genre or language)"
+    )
+    value = models.CharField(max_length=30, help_text="The value of the field")
+    count = models.PositiveIntegerField(
+        default=0, help_text="Number of books with this value"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["facet", "value"], name="unique_book_facet_value"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
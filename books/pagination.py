@@ -0,0 +1,451 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the ordering of the queryset.
+
+    Instead of skipping rows with ``OFFSET``, each page continues from the
+    sort key of the last row the client has seen, so a page costs the same
+    no matter how deep the client has paged, and no ``COUNT(*)`` is run.
+
+    The primary key is appended to the ordering as a tiebreaker, which makes
+    the sort key unique. The position is handed to the client as an opaque
+    cursor in the ``next`` and ``previous`` links.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keys = self.get_keys(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["reverse"])
+        if cursor is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(queryset, cursor["position"], reverse)
+            )
+        queryset = queryset.order_by(*self.get_order_by(reverse))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Coming back from a later page there is always a next page, and
+        # moving forward from a cursor there is always a previous one.
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_keys(self, queryset):
+        """
+        Return the sort key of the queryset as ``(name, descending, field)``
+        tuples, with the primary key appended as a tiebreaker.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        pk_name = queryset.model._meta.pk.name
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == "?":
+                raise ImproperlyConfigured(
+                    "KeysetPagination only supports ordering by field names."
+                )
+            descending = item.startswith("-")
+            name = item.lstrip("-")
+            if name == "pk":
+                name = pk_name
+            keys.append((name, descending, self.get_key_field(queryset, name)))
+            if name == pk_name:
+                return keys
+
+        descending = keys[0][1] if keys else False
+        keys.append((pk_name, descending, queryset.model._meta.pk))
+        return keys
+
+    def get_key_field(self, queryset, name):
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if name in queryset.query.annotations:
+                return queryset.query.annotations[name].output_field
+            raise ImproperlyConfigured(
+                f"Cannot paginate by '{name}': not a field or annotation."
+            )
+
+    def get_order_by(self, reverse=False):
+        return [
+            ("-" if descending != reverse else "") + name
+            for name, descending, _ in self.keys
+        ]
+
+    def get_position_filter(self, queryset, position, reverse=False):
+        """
+        Build the ``WHERE`` clause selecting the rows that sort strictly
+        after ``position`` (or before it, when ``reverse`` is set).
+
+        NULLs are kept where the database naturally sorts them, so the
+        composite indexes on the sort key can serve the query directly.
+        """
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+        condition = None
+        for index in reversed(range(len(self.keys))):
+            name, descending, field = self.keys[index]
+            descending = descending != reverse
+            nulls_last = descending != nulls_largest
+            value = position[index]
+            if value is None:
+                equal = Q(**{f"{name}__isnull": True})
+                beyond = None if nulls_last else Q(**{f"{name}__isnull": False})
+                bound = None
+            else:
+                equal = Q(**{name: value})
+                beyond = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                bound = Q(**{f"{name}__{'lte' if descending else 'gte'}": value})
+                if field.null and nulls_last:
+                    beyond |= Q(**{f"{name}__isnull": True})
+                    bound |= Q(**{f"{name}__isnull": True})
+
+            if condition is None:
+                condition = beyond
+            elif beyond is None:
+                condition = equal & condition
+            else:
+                condition = beyond | (equal & condition)
+
+            # A redundant range bound on the leading key lets the database
+            # turn the OR-ed condition into a single index range scan.
+            if index == 0 and bound is not None:
+                condition = bound & condition
+        return condition
+
+    def get_position(self, row):
+        position = []
+        for name, _, field in self.keys:
+            if isinstance(row, dict):
+                position.append(row[name])
+            else:
+                position.append(getattr(row, getattr(field, "attname", None) or name))
+        return position
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = {
+            "o": self.get_order_by(),
+            "p": position,
+            "r": int(reverse),
+        }
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Return the position encoded in the request's cursor, or ``None`` for
+        the first page.
+
+        A cursor is only valid for the ordering it was issued for.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if payload["o"] != self.get_order_by():
+                raise ValueError("Cursor ordering does not match")
+            if len(payload["p"]) != len(self.keys):
+                raise ValueError("Cursor position does not match")
+            position = [
+                None if value is None else field.to_python(value)
+                for (_, _, field), value in zip(self.keys, payload["p"])
+            ]
+            return {"position": position, "reverse": bool(payload["r"])}
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def estimate_count(queryset):
+    """
+    Return a cheap estimate of ``queryset.count()``, or None if there is none.
+
+    On PostgreSQL this is ``pg_class.reltuples`` for an unfiltered queryset
+    and the planner's row estimate from ``EXPLAIN`` otherwise. Other
+    databases have no usable estimate, so a recently cached exact count
+    (see ``remember_count``) stands in for one.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return cache.get(_count_cache_key(queryset))
+
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed or analyzed
+        if row is not None and row[0] >= 0:
+            return int(row[0])
+        return None
+
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def remember_count(queryset, count):
+    """
+    Cache an exact count so that ``estimate_count`` can reuse it on
+    databases without planner estimates.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != "postgresql":
+        cache.set(
+            _count_cache_key(queryset),
+            count,
+            getattr(settings, "BOOKS_COUNT_CACHE_TIMEOUT", 60),
+        )
+
+
+def _count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(repr((sql, params)).encode("utf-8")).hexdigest()
+    return f"books:count:{queryset.db}:{digest}"
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page-number pagination that does not pay for an exact ``COUNT(*)`` on
+    large result sets.
+
+    Each page fetches one extra row to find out whether there is a next
+    page, so paging itself never needs the total. The ``count`` is exact
+    while the result set is estimated to hold fewer than
+    ``BOOKS_EXACT_COUNT_THRESHOLD`` rows; above that it is an estimate (see
+    ``estimate_count``), and ``count_is_exact`` tells the client which one
+    it got. Clients that do not need a total can skip it with
+    ``?count=none``.
+    """
+
+    count_query_param = "count"
+    skip_count_values = ("none",)
+
+    @property
+    def exact_count_threshold(self):
+        return getattr(settings, "BOOKS_EXACT_COUNT_THRESHOLD", 10000)
+
+    def skips_count(self, request):
+        """
+        Return True if the request asks for no ``count`` (``?count=none``).
+        """
+        value = request.query_params.get(self.count_query_param)
+        return value in self.skip_count_values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        skip_count = self.skips_count(request)
+        self.count = None
+        self.count_is_exact = False
+        self.page_number = self.get_page_number(request, queryset, page_size)
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset : offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        if not self.page and self.page_number > 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=self.page_number,
+                    message="That page contains no results",
+                )
+            )
+
+        if not skip_count and self.count is None:
+            if not self.has_next:
+                # The last page tells us the exact total for free.
+                self.count, self.count_is_exact = offset + len(self.page), True
+            else:
+                self.count, self.count_is_exact = self.get_count(queryset)
+
+        if (self.has_next or self.page_number > 1) and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+
+        return self.page
+
+    def is_first_page(self, request):
+        """
+        Return True if the request asks for the first page.
+        """
+        return request.query_params.get(self.page_query_param, "1") == "1"
+
+    def paginate_first_page(self, queryset, rows, request, count=None):
+        """
+        Paginate the first page from rows the caller has already fetched,
+        such as those of a precomputed list.
+
+        Args:
+            queryset: The books being paginated, used for the count
+            rows: The first ``page_size + 1`` rows of ``queryset``, or all
+             of them if there are fewer
+            request: The request
+            count: The exact number of books in ``queryset``, if known
+
+        Returns:
+            list: The rows of the first page
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.page_number = 1
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        self.count = None
+        self.count_is_exact = False
+        skip_count = self.skips_count(request)
+        if not skip_count:
+            if not self.has_next:
+                self.count, self.count_is_exact = len(self.page), True
+            elif count is not None:
+                self.count, self.count_is_exact = count, True
+            else:
+                self.count, self.count_is_exact = self.get_count(queryset)
+        if self.has_next and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_count(self, queryset):
+        """
+        Return ``(count, is_exact)`` for the queryset, running an exact
+        ``COUNT(*)`` only below the configured threshold.
+        """
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= self.exact_count_threshold:
+            return estimate, False
+        count = queryset.count()
+        remember_count(queryset, count)
+        return count, True
+
+    def get_page_number(self, request, queryset, page_size):
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            self.count, self.count_is_exact = self.get_count(queryset)
+            if not self.count_is_exact:
+                raise NotFound(
+                    self.invalid_page_message.format(
+                        page_number=page_number,
+                        message="The last page is not available for "
+                        "estimated counts",
+                    )
+                )
+            return max(1, -(-self.count // page_size))
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number,
+                    message="That page number is not a positive integer",
+                )
+            )
+        return page_number
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "count_is_exact": self.count_is_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"]["nullable"] = True
+        response_schema["properties"]["count_is_exact"] = {
+            "type": "boolean",
+            "example": True,
+        }
+        return response_schema
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_html_context(self):
+        return {
+            "previous_url": self.get_previous_link(),
+            "next_url": self.get_next_link(),
+            "page_links": [],
+        }
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline-delimited JSON (one JSON document per line).
+
+    Streaming views write their rows themselves; this renderer only handles
+    responses DRF renders on their behalf, such as errors, which become a
+    single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps_line(data)
+
+
+def dumps_line(obj):
+    """
+    Encode an object as one compact NDJSON line, the way JSONRenderer would.
+    """
+    line = json.dumps(
+        obj, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    )
+    return (line + "\n").encode("utf-8")
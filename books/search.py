@@ -0,0 +1,431 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections, transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Greatest
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from books.caching import bump_generation
+from books.isbn import ISBN_SEPARATORS, split_isbns
+
+# Text search configuration of the PostgreSQL GIN index; queries must use the
+# same one for the index to apply.
+SEARCH_CONFIG = "english"
+
+# Name of the SQLite FTS5 table that mirrors books_book.
+FTS_TABLE = "books_book_fts"
+
+# Annotation holding the relevance of each match (higher is better).
+RANK_ANNOTATION = "search_rank"
+
+# Values accepted by the ?search_mode= parameter; the first is the default.
+SEARCH_MODES = ("fulltext", "fuzzy")
+
+# Fields matched by ?search_mode=fuzzy.
+FUZZY_SEARCH_FIELDS = ("title", "author")
+
+
+def book_search_vector():
+    """
+    Return the weighted ``tsvector`` expression over title, author and
+    description.
+
+    The GIN index created in migration 0005 is built on this exact
+    expression; keep the two in sync.
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("author", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+# Results of sqlite_fts_available() and trigram_available() by check, database
+# alias and database name; cleared by ensure_sqlite_fts() after migrations
+_features = {}
+
+
+def _cached_check(check, connection):
+    """
+    Return the result of a catalog ``check`` on a connection, looked up once
+    per database.
+    """
+    key = (check, connection.alias, connection.settings_dict["NAME"])
+    try:
+        return _features[key]
+    except KeyError:
+        return _features.setdefault(key, check(connection))
+
+
+def _sqlite_fts_exists(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def _pg_trgm_installed(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def sqlite_fts_available(connection):
+    """
+    Return True if the SQLite FTS5 table for books exists.
+    """
+    return _cached_check(_sqlite_fts_exists, connection)
+
+
+def trigram_available(connection):
+    """
+    Return True if the pg_trgm extension is installed on a PostgreSQL
+    connection.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    return _cached_check(_pg_trgm_installed, connection)
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams of a string, the way pg_trgm extracts them.
+
+    The text is lowercased and split into alphanumeric words; each word is
+    padded with two spaces in front and one behind before being cut into
+    three-character pieces.
+
+    Args:
+        text: The string to split (None is treated as empty)
+
+    Returns:
+        set: The trigrams of the string
+    """
+    result = set()
+    for word in re.findall(r"[^\W_]+", (text or "").lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def word_similarity(query, text):
+    """
+    Return how well ``query`` matches some part of ``text``, from 0 to 1.
+
+    Pure-Python counterpart of pg_trgm's ``word_similarity()``: the share of
+    the query's trigrams that also occur in the text.
+
+    Args:
+        query: The search string
+        text: The string searched
+
+    Returns:
+        float: 1.0 when every trigram of the query occurs in the text
+    """
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return 0.0
+    return len(query_trigrams & trigrams(text)) / len(query_trigrams)
+
+
+def ensure_sqlite_fts(using="default", **kwargs):
+    """
+    Create the FTS5 table and the triggers that keep it in sync with
+    books_book on SQLite, and rebuild the index if any trigger was missing.
+
+    Runs after every ``migrate``: SQLite table rebuilds performed by schema
+    migrations drop the triggers, so they are recreated here rather than in
+    a migration.
+    """
+    # Migrations may have created the FTS table or the pg_trgm extension
+    _features.clear()
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    columns = "title, author, description"
+    statements = {
+        f"{FTS_TABLE}_ai": (
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) "
+            f"VALUES (new.id, new.title, new.author, new.description); END"
+        ),
+        f"{FTS_TABLE}_ad": (
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, old.title, old.author, old.description); "
+            f"END"
+        ),
+        f"{FTS_TABLE}_au": (
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, old.title, old.author, old.description); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) "
+            f"VALUES (new.id, new.title, new.author, new.description); END"
+        ),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('books_book', %s, %s, %s)",
+            list(statements),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if "books_book" not in existing:
+            return
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{columns}, content='books_book', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+        except Exception:
+            # SQLite was built without FTS5; searches fall back to LIKE.
+            return
+        missing = [name for name in statements if name not in existing]
+        for name in missing:
+            cursor.execute(statements[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            # Searches answered before the rebuild may have missed books.
+            bump_generation()
+
+
+def fuzzy_score(text):
+    """
+    Return the trigram word similarity of ``text`` to the closest of the
+    title and author, as a float.
+    """
+    return Cast(
+        Greatest(*(TrigramWordSimilarity(text, f) for f in FUZZY_SEARCH_FIELDS)),
+        FloatField(),
+    )
+
+
+class BookSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search for the ``?search=`` parameter.
+
+    - PostgreSQL matches the weighted ``tsvector`` over title, author and
+      description against ``websearch_to_tsquery``, served by a GIN index,
+      and ranks matches with ``ts_rank``.
+    - SQLite (the DEBUG database) queries an FTS5 mirror of the same
+      columns and ranks matches with ``bm25``.
+    - Anywhere else, or without FTS5, it behaves like DRF's SearchFilter.
+
+    With ``?search_mode=fuzzy`` the search instead tolerates typos in titles
+    and authors: see filter_fuzzy().
+
+    Terms that are valid ISBN-10s or ISBN-13s (hyphens allowed) never reach
+    the text search: they are normalised to ISBN-13 and looked up together
+    on the unique ``isbn`` index. Other searches made only of digits (and
+    hyphens), such as partial ISBNs, also match the books whose ISBN starts
+    with those digits, which the text search does not index.
+
+    Matches are annotated with ``search_rank``; BookOrderingFilter orders by
+    it unless the client asks for another ordering.
+    """
+
+    search_mode_param = "search_mode"
+
+    def get_search_mode(self, request):
+        """
+        Return the validated ?search_mode= of the request.
+
+        Raises:
+            ValidationError: If the mode is not one of SEARCH_MODES
+        """
+        mode = request.query_params.get(self.search_mode_param) or SEARCH_MODES[0]
+        if mode not in SEARCH_MODES:
+            raise ValidationError(
+                {self.search_mode_param: [f'"{mode}" is not a valid choice.']}
+            )
+        return mode
+
+    def get_search_terms(self, request):
+        """
+        Return the search terms of the request that are not ISBNs.
+        """
+        return split_isbns(super().get_search_terms(request))[1]
+
+    def get_isbn_terms(self, request):
+        """
+        Return the distinct ISBN-13s searched for in the request.
+        """
+        return split_isbns(super().get_search_terms(request))[0]
+
+    def get_isbn_prefix(self, terms):
+        """
+        Return the digits of the search terms if they hold nothing else
+        (separators aside), to match the start of ISBNs, or None.
+        """
+        prefix = ISBN_SEPARATORS.sub("", "".join(terms))
+        return prefix if prefix.isascii() and prefix.isdigit() else None
+
+    def filter_queryset(self, request, queryset, view):
+        isbns = self.get_isbn_terms(request)
+        if isbns:
+            queryset = queryset.filter(isbn__in=isbns)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if self.get_search_mode(request) == "fuzzy":
+            return self.filter_fuzzy(queryset, " ".join(terms))
+
+        connection = connections[queryset.db]
+        prefix = self.get_isbn_prefix(terms)
+        if connection.vendor == "postgresql":
+            return self.filter_postgresql(queryset, terms, prefix)
+        if connection.vendor == "sqlite" and sqlite_fts_available(connection):
+            return self.filter_sqlite(queryset, terms, prefix)
+        # search_fields include the ISBN
+        return super().filter_queryset(request, queryset, view)
+
+    def filter_postgresql(self, queryset, terms, isbn_prefix=None):
+        query = SearchQuery(
+            " ".join(terms), config=SEARCH_CONFIG, search_type="websearch"
+        )
+        vector = book_search_vector()
+        matches = Q(search_document=query)
+        if isbn_prefix:
+            matches |= Q(isbn__startswith=isbn_prefix)
+        return (
+            queryset.alias(search_document=vector)
+            .filter(matches)
+            .annotate(
+                # ts_rank returns float4; cast so ranks survive a round trip
+                # through keyset pagination cursors unchanged.
+                **{RANK_ANNOTATION: Cast(SearchRank(vector, query), FloatField())}
+            )
+        )
+
+    def filter_sqlite(self, queryset, terms, isbn_prefix=None):
+        # Quote every term so user input is never parsed as FTS5 syntax;
+        # quoted terms are ANDed together.
+        match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        table = queryset.model._meta.db_table
+        matches = Q(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        )
+        if isbn_prefix:
+            matches |= Q(isbn__startswith=isbn_prefix)
+        return queryset.filter(matches).annotate(
+            **{
+                RANK_ANNOTATION: RawSQL(
+                    # bm25 is lower for better matches; negate it and weight
+                    # title, author and description like the tsvector does.
+                    f"SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+                    [match],
+                    output_field=FloatField(),
+                )
+            }
+        )
+
+    def filter_fuzzy(self, queryset, text):
+        """
+        Return the books whose title or author resembles ``text``.
+
+        Matches need a trigram word similarity of at least
+        ``BOOKS_FUZZY_SEARCH_THRESHOLD`` and only the best
+        ``BOOKS_FUZZY_SEARCH_LIMIT`` are kept, so the result set stays small
+        however vague the query. With pg_trgm this is answered from the GIN
+        trigram indexes of migration 0006; otherwise (SQLite, or PostgreSQL
+        without the extension) the titles and authors are scored in Python.
+        """
+        threshold = getattr(settings, "BOOKS_FUZZY_SEARCH_THRESHOLD", 0.5)
+        limit = getattr(settings, "BOOKS_FUZZY_SEARCH_LIMIT", 100)
+
+        connection = connections[queryset.db]
+        if not trigram_available(connection):
+            return self.filter_fuzzy_python(queryset, text, threshold, limit)
+
+        # The %> operator is what the trigram indexes serve; it compares
+        # against this setting rather than taking the threshold as an operand.
+        # The setting only lasts for the transaction, so the best matches
+        # are read within it right away, rather than in a subquery that
+        # would run after it ends.
+        best = self.best_fuzzy_matches(queryset, text, limit)
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(threshold)],
+            )
+            pks = list(best)
+        return queryset.filter(pk__in=pks).annotate(
+            **{RANK_ANNOTATION: fuzzy_score(text)}
+        )
+
+    def best_fuzzy_matches(self, queryset, text, limit):
+        """
+        Return the query of the primary keys of the ``limit`` books whose
+        title or author is most similar to ``text``, among those above the
+        ``pg_trgm.word_similarity_threshold`` setting.
+        """
+        matches = Q()
+        for field in FUZZY_SEARCH_FIELDS:
+            matches |= Q(TrigramWordSimilar(F(field), Value(text)))
+        return (
+            queryset.filter(matches)
+            .annotate(fuzzy_score=fuzzy_score(text))
+            .order_by("-fuzzy_score", "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+
+    def filter_fuzzy_python(self, queryset, text, threshold, limit):
+        """
+        Score titles and authors in Python for filter_fuzzy().
+
+        Reads every candidate's title and author, so it is meant for the
+        SQLite development database rather than large catalogs.
+        """
+        scores = []
+        for pk, *values in queryset.values_list("pk", *FUZZY_SEARCH_FIELDS).iterator():
+            score = max(word_similarity(text, value) for value in values)
+            if score >= threshold:
+                scores.append((score, pk))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        scores = scores[:limit]
+        if not scores:
+            return queryset.none()
+        return queryset.filter(pk__in=[pk for _, pk in scores]).annotate(
+            **{
+                RANK_ANNOTATION: Case(
+                    *(When(pk=pk, then=Value(score)) for score, pk in scores),
+                    output_field=FloatField(),
+                )
+            }
+        )
+
+
+class BookOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that puts the best search matches first.
+
+    When a search annotated the queryset with ``search_rank`` and the client
+    did not ask for an ordering, results are ordered by rank, then by the
+    view's default ordering.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if (
+            RANK_ANNOTATION in queryset.query.annotations
+            and not request.query_params.get(self.ordering_param)
+        ):
+            return ["-" + RANK_ANNOTATION, *(ordering or [])]
+        return ordering
@@ -0,0 +1,156 @@
+from datetime import date, timedelta
+from random import Random
+
+from faker import Faker
+
+from books.isbn import isbn13_check_digit
+
+# Rows generated per work unit. Each unit has its own random stream, so the
+# rows generated for a seed do not depend on the number of workers.
+CHUNK_SIZE = 10_000
+
+# Distinct titles, authors and descriptions drawn by the generated rows.
+# Faker is slow per call, so values come from pools built once per run.
+# Other fields are drawn from pools of every possible value.
+TITLE_POOL_SIZE = 5000
+AUTHOR_POOL_SIZE = 2000
+DESCRIPTION_POOL_SIZE = 500
+
+# Publication dates are drawn from the twenty years after this date
+FIRST_PUBLISHED_DATE = date(2005, 1, 1)
+PUBLISHED_DATE_DAYS = 20 * 365
+
+# Generated ISBNs are valid ISBN-13s under this prefix. It is the real 978
+# book prefix, so a generated ISBN can equal a real book's; populate_books
+# replaces ISBNs already in the database (see its assign_isbns()). The
+# benchmark and loadtest commands create books under 979x prefixes.
+ISBN_PREFIX = "978"
+
+# Book columns of the generated rows, in order
+COLUMNS = (
+    "title",
+    "author",
+    "published_date",
+    "isbn",
+    "pages",
+    "cover_image",
+    "language",
+    "genre",
+    "description",
+    "price",
+    "rating",
+)
+
+# Value pools of the current worker, set by init_worker()
+_pools = None
+
+
+def build_pools(seed, genres, languages):
+    """
+    Build the value pools rows are drawn from.
+
+    Args:
+        seed: The dataset seed
+        genres: The genre values to choose from
+        languages: The language values to choose from
+
+    Returns:
+        dict: Lists of the values of each generated field
+    """
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {
+        "titles": [fake.catch_phrase() for _ in range(TITLE_POOL_SIZE)],
+        "authors": [fake.name() for _ in range(AUTHOR_POOL_SIZE)],
+        "descriptions": [
+            fake.paragraph(nb_sentences=5) for _ in range(DESCRIPTION_POOL_SIZE)
+        ],
+        "genres": list(genres),
+        "languages": list(languages),
+        "dates": [
+            (FIRST_PUBLISHED_DATE + timedelta(days=days)).isoformat()
+            for days in range(PUBLISHED_DATE_DAYS)
+        ],
+        "covers": [
+            f"https://picsum.photos/id/{photo}/200/300" for photo in range(1, 1001)
+        ],
+        "prices": [f"{cents / 100:.2f}" for cents in range(500, 5001)],
+        "ratings": [f"{tenths / 10:.1f}" for tenths in range(51)],
+    }
+
+
+def random_isbn(random):
+    """
+    Return a random valid ISBN-13 under ISBN_PREFIX.
+
+    Args:
+        random: A function returning floats in [0, 1), such as
+            ``Random.random``
+
+    Returns:
+        str: The thirteen-digit ISBN
+    """
+    body = f"{ISBN_PREFIX}{int(random() * 10**9):09d}"
+    return body + isbn13_check_digit(body)
+
+
+def init_worker(pools):
+    """
+    Make the value pools available to generate_chunk() in a worker process.
+    """
+    global _pools
+    _pools = pools
+
+
+def generate_chunk(task):
+    """
+    Generate the rows of one work unit.
+
+    Rows are tuples of COLUMNS values, with dates and decimals as strings
+    that every database backend, and ``COPY``, accepts as they are.
+    ISBNs are random, valid ISBN-13s that may collide with each other or
+    with existing books; the caller checks them.
+
+    Args:
+        task: ``(seed, chunk, count)``, where ``chunk`` numbers the unit
+
+    Returns:
+        list: The generated rows
+    """
+    seed, chunk, count = task
+    random = Random(seed * 1_000_003 + chunk).random
+    titles = _pools["titles"]
+    authors = _pools["authors"]
+    dates = _pools["dates"]
+    covers = _pools["covers"]
+    languages = _pools["languages"]
+    genres = _pools["genres"]
+    descriptions = _pools["descriptions"]
+    prices = _pools["prices"]
+    ratings = _pools["ratings"]
+    rows = []
+    # Indexing with int(random() * len) is several times faster than
+    # Random.choice() and randrange()
+    for _ in range(count):
+        # Each optional field is set half of the time
+        optional = int(random() * 16)
+        rows.append(
+            (
+                titles[int(random() * len(titles))],
+                authors[int(random() * len(authors))],
+                dates[int(random() * len(dates))],
+                random_isbn(random),
+                50 + int(random() * 951),
+                covers[int(random() * len(covers))] if optional & 1 else None,
+                languages[int(random() * len(languages))],
+                genres[int(random() * len(genres))],
+                (
+                    descriptions[int(random() * len(descriptions))]
+                    if optional & 2
+                    else None
+                ),
+                prices[int(random() * len(prices))] if optional & 4 else None,
+                ratings[int(random() * len(ratings))] if optional & 8 else None,
+            )
+        )
+    return rows
@@ -0,0 +1,170 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from books import autocomplete, caching, facets, hotlists
+from books.models import Book
+
+# Sent by the bulk write paths in books.bulk, which bypass post_save and
+# post_delete (and update the facet counters themselves). Arguments: ``pks``,
+# the primary keys of the books written, and ``deleted``, True if they were
+# deleted rather than created or updated.
+books_bulk_changed = Signal()
+
+# True while a bulk write path deletes books with QuerySet.delete(); the
+# per-row post_delete receivers then leave their work to the bulk write's
+# facet update and books_bulk_changed.
+bulk_deleting = ContextVar("bulk_deleting", default=False)
+
+
+@contextmanager
+def deleting_in_bulk():
+    """
+    Silence the per-row post_delete receivers for the duration of the block.
+    """
+    token = bulk_deleting.set(True)
+    try:
+        yield
+    finally:
+        bulk_deleting.reset(token)
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, **kwargs):
+    """
+    Refresh a saved book in the autocomplete index once committed.
+    """
+    transaction.on_commit(lambda: autocomplete.index.refresh([instance.pk]))
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    """
+    Remove a deleted book from the autocomplete index once committed.
+    """
+    if bulk_deleting.get():
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.index.delete(pk))
+
+
+@receiver(books_bulk_changed, sender=Book)
+def index_bulk_changed_books(sender, pks, deleted=False, **kwargs):
+    """
+    Apply a bulk write to the autocomplete index once committed.
+    """
+    pks = list(pks)
+    if deleted:
+        transaction.on_commit(lambda: autocomplete.index.delete(*pks))
+    else:
+        transaction.on_commit(lambda: autocomplete.index.refresh(pks))
+
+
+@receiver(post_init, sender=Book)
+def remember_facet_values(sender, instance, **kwargs):
+    """
+    Remember the facet values a book was loaded with, unless deferred.
+    """
+    # _state.adding is only set after post_init, so rely on the primary key.
+    deferred = any(field not in instance.__dict__ for field in facets.FACETS)
+    if instance.pk is None or deferred:
+        instance._facet_values = None
+    else:
+        instance._facet_values = facets.facet_values(instance)
+
+
+@receiver(pre_save, sender=Book)
+def load_facet_values(sender, instance, using, **kwargs):
+    """
+    Read the stored facet values of a book loaded with deferred facet fields.
+    """
+    if not instance._state.adding and instance._facet_values is None:
+        rows = Book.objects.using(using).filter(pk=instance.pk)
+        row = rows.values(*facets.FACETS).first()
+        instance._facet_values = facets.facet_values(row) if row else None
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, created, using, update_fields, **kwargs):
+    """
+    Move a saved book between facet counters, in its save transaction.
+    """
+    current = facets.facet_values(instance)
+    if created:
+        deltas = Counter(current)
+    else:
+        deltas = Counter()
+        for old, new in zip(instance._facet_values or [], current):
+            if old != new and (update_fields is None or new[0] in update_fields):
+                deltas[old] -= 1
+                deltas[new] += 1
+    facets.apply_deltas(deltas, using=using)
+    instance._previous_facet_values = instance._facet_values
+    instance._facet_values = current
+
+
+@receiver(post_delete, sender=Book)
+def count_deleted_book(sender, instance, using, **kwargs):
+    """
+    Remove a deleted book from its facet counters, in its delete transaction.
+    """
+    if bulk_deleting.get():
+        return
+    values = instance._facet_values or facets.facet_values(instance)
+    facets.apply_deltas(Counter({key: -1 for key in values}), using=using)
+
+
+@receiver(post_save, sender=Book)
+def refresh_hot_lists(sender, instance, **kwargs):
+    """
+    Move a saved book within the hot lists, now and again once committed.
+
+    As with the response cache, the lists are updated right away, so the
+    writing process reads its own writes, and again on commit, in case a
+    list was rebuilt by another request while the transaction was open.
+    """
+    previous = getattr(instance, "_previous_facet_values", None) or []
+    old_genre = dict(previous).get("genre")
+    hotlists.refresh_book(instance, old_genre)
+    transaction.on_commit(lambda: hotlists.refresh_book(instance, old_genre))
+
+
+@receiver(post_delete, sender=Book)
+def remove_from_hot_lists(sender, instance, **kwargs):
+    """
+    Remove a deleted book from the hot lists, now and again once committed.
+    """
+    if bulk_deleting.get():
+        return
+    values = instance._facet_values or facets.facet_values(instance)
+    pk, genre = instance.pk, dict(values)["genre"]
+    hotlists.remove_book(pk, genre)
+    transaction.on_commit(lambda: hotlists.remove_book(pk, genre))
+
+
+@receiver(books_bulk_changed, sender=Book)
+def invalidate_hot_lists(sender, **kwargs):
+    """
+    Drop the hot lists after a bulk write, now and again once committed.
+    """
+    hotlists.invalidate()
+    transaction.on_commit(hotlists.invalidate)
+
+
+@receiver([post_save, post_delete, books_bulk_changed], sender=Book)
+def invalidate_cached_responses(sender, signal, **kwargs):
+    """
+    Start a new catalog generation so no cached response outlives a write.
+
+    The generation is bumped right away, so the writing process reads its
+    own writes, and again on commit, so a response cached by another request
+    while the transaction was still open is dropped as well.
+    """
+    if signal is post_delete and bulk_deleting.get():
+        return
+    caching.bump_generation()
+    transaction.on_commit(caching.bump_generation)
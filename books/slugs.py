@@ -0,0 +1,127 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Slug of books whose title has no sluggable characters
+FALLBACK_SLUG = "book"
+
+# Number of base slugs looked up per query
+LOOKUP_BATCH_SIZE = 100
+
+# Numeric suffixes told apart from title words, such as "2" in "book-2"
+SUFFIX = re.compile(r"[1-9][0-9]*")
+
+# Room kept at the end of a base slug for a "-<n>" suffix
+SUFFIX_LENGTH = 11
+
+
+def base_slug(title, max_length):
+    """
+    Return the slug of a title, before any suffix is added.
+
+    Args:
+        title: The book title
+        max_length: The max_length of the slug field
+
+    Returns:
+        str: The slugified title, shortened to leave room for a suffix
+    """
+    slug = slugify(title)[: max_length - SUFFIX_LENGTH].rstrip("-")
+    return slug or FALLBACK_SLUG
+
+
+def suffixed_slugs(base, vendor):
+    """
+    Return a condition matching the slugs that start with ``base-``.
+
+    SQLite's LIKE ignores case, so it cannot use the slug index; there the
+    condition is the range of slugs after ``base-`` and before ``base.``,
+    the next character in SQLite's binary collation, which the index
+    answers.
+    """
+    if vendor == "sqlite":
+        return Q(slug__gt=f"{base}-", slug__lt=f"{base}.")
+    return Q(slug__startswith=f"{base}-")
+
+
+def highest_suffixes(manager, bases, taken=None):
+    """
+    Return the highest suffix in use for each base slug.
+
+    A plain ``base`` counts as suffix 1 and ``base-<n>`` as suffix ``n``.
+    Existing slugs are read with one ``slug = base OR slug LIKE 'base-%'``
+    query per ``LOOKUP_BATCH_SIZE`` bases (a range condition on SQLite),
+    which the unique slug index answers, instead of probing candidate slugs
+    one SELECT at a time.
+
+    Args:
+        manager: The Book manager (or a historical one, in migrations)
+        bases: The base slugs
+        taken: A set the slugs read are added to, if given
+
+    Returns:
+        dict: The highest suffix per base, 0 if the base is unused
+    """
+    bases = sorted(set(bases))
+    highest = dict.fromkeys(bases, 0)
+    vendor = connections[manager.db].vendor
+    for start in range(0, len(bases), LOOKUP_BATCH_SIZE):
+        batch = bases[start : start + LOOKUP_BATCH_SIZE]
+        condition = reduce(
+            or_, (Q(slug=base) | suffixed_slugs(base, vendor) for base in batch)
+        )
+        # Without the default ordering, which could make the planner prefer
+        # scanning the table in published_date order to the slug index
+        slugs = manager.filter(condition).order_by().values_list("slug", flat=True)
+        for slug in slugs.iterator():
+            if taken is not None:
+                taken.add(slug)
+            base, _, suffix = slug.rpartition("-")
+            if slug in highest:
+                highest[slug] = max(highest[slug], 1)
+            elif base in highest and SUFFIX.fullmatch(suffix):
+                highest[base] = max(highest[base], int(suffix))
+    return highest
+
+
+def assign_slugs(books, manager):
+    """
+    Give every book without a slug a unique one.
+
+    The slug is the slugified title, followed by ``-2``, ``-3``, ... when
+    the title's slug is already taken, either in the database or by an
+    earlier book in ``books``. Numbers are skipped while the slug is taken
+    under another title, as ``dune-2`` is by "Dune 2". The whole list costs
+    one query per ``LOOKUP_BATCH_SIZE`` distinct titles, so it serves bulk
+    inserts as well as ``Book.save()``.
+
+    A concurrent writer can still take a slug between the lookup and the
+    insert; the unique index then raises IntegrityError and the caller
+    retries.
+
+    Args:
+        books: The Book instances to give slugs to
+        manager: The Book manager to look existing slugs up with
+    """
+    pending = [book for book in books if not book.slug]
+    if not pending:
+        return
+    max_length = manager.model._meta.get_field("slug").max_length
+    bases = [base_slug(book.title, max_length) for book in pending]
+    # Every candidate slug is a base or a numbered base, so the lookup
+    # reads all the candidates already in the database
+    taken = {book.slug for book in books if book.slug}
+    highest = highest_suffixes(manager, bases, taken)
+    for book, base in zip(pending, bases):
+        suffix = highest[base] + 1
+        slug = base if suffix == 1 else f"{base}-{suffix}"
+        while slug in taken:
+            suffix += 1
+            slug = f"{base}-{suffix}"
+        book.slug = slug
+        taken.add(slug)
+        highest[base] = suffix
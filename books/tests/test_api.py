@@ -1,6 +1,11 @@
+import json
 from datetime import date
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -208,3 +213,202 @@ class TokenAuthenticationTests(APITestCase):
         self.assertEqual(
             Book.objects.get(title="New Token Book").author, "Token Author"
         )
+
+
+class SparseFieldsetTests(APITestCase):
+    """
+    Test cases for the ?fields= sparse fieldset parameter.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="fieldsuser", email="fields@example.com", password="password"
+        )
+        self.book = Book.objects.create(
+            title="Sparse Book",
+            author="Sparse Author",
+            published_date=date(2020, 1, 1),
+            isbn="1234567890123",
+            pages=200,
+            language="en",
+            genre="fiction",
+            description="A long description",
+            rating=4.5,
+        )
+        self.books_url = reverse("book-list")
+        self.book_url = reverse("book-detail", kwargs={"slug": self.book.slug})
+
+    def test_list_returns_requested_fields(self):
+        """
+        Test that list responses only contain the requested fields.
+        """
+        response = self.client.get(self.books_url, {"fields": "title,isbn,rating"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"][0],
+            {"title": "Sparse Book", "isbn": "1234567890123", "rating": 4.5},
+        )
+
+    def test_detail_returns_requested_fields(self):
+        """
+        Test that detail responses only contain the requested fields.
+        """
+        response = self.client.get(self.book_url, {"fields": "url,description"})
+        self.assertEqual(set(response.data), {"url", "description"})
+        self.assertEqual(response.data["description"], "A long description")
+
+    def test_unknown_fields_are_ignored(self):
+        """
+        Test that unknown field names are ignored.
+        """
+        response = self.client.get(self.book_url, {"fields": "title,nonexistent"})
+        self.assertEqual(set(response.data), {"title"})
+
+    def test_list_does_not_load_description(self):
+        """
+        Test that the default list query does not select the description.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.books_url)
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        self.assertFalse(any('"description"' in sql for sql in selects))
+
+    def test_sparse_list_prunes_columns(self):
+        """
+        Test that requesting a few fields only loads those columns.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.books_url, {"fields": "isbn"})
+        page_query = [q["sql"] for q in queries if "LIMIT" in q["sql"]][0]
+        self.assertIn('"isbn"', page_query)
+        self.assertNotIn('"author"', page_query)
+        self.assertNotIn('"pages"', page_query)
+
+    def test_fields_ignored_for_writes(self):
+        """
+        Test that writes return every field regardless of ?fields=.
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(
+            f"{self.book_url}?fields=title", {"pages": 250}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("description", response.data)
+        self.assertEqual(response.data["pages"], 250)
+
+
+@override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=0)
+class FastListSerializerAPITests(APITestCase):
+    """
+    Test that list endpoints return the same JSON with and without the
+    fast-path serializer.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(12):
+            Book.objects.create(
+                title=f"Fast Book {i}",
+                author=f"Fast Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{1234567890100 + i}",
+                pages=100 + i,
+                genre="fiction" if i % 2 else "mystery",
+                rating=None if i % 3 == 0 else 4.5,
+            )
+
+    def test_identical_output(self):
+        """
+        Test list, featured and by_genre output against the DRF serializer.
+        """
+        urls = [
+            reverse("book-list"),
+            reverse("book-list") + "?fields=url,rating&page=2",
+            reverse("book-list") + "?pagination=cursor&ordering=-rating",
+            reverse("book-featured"),
+            reverse("book-by-genre", kwargs={"genre_name": "fiction"}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with self.settings(BOOKS_FAST_LIST_SERIALIZER=False):
+                    expected = self.client.get(url).content
+                with self.settings(BOOKS_FAST_LIST_SERIALIZER=True):
+                    actual = self.client.get(url).content
+                self.assertEqual(actual, expected)
+
+
+class ExportTests(APITestCase):
+    """
+    Test cases for the streaming NDJSON export endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(7):
+            Book.objects.create(
+                title=f"Export Book {i}",
+                author="Whitfield" if i < 3 else f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{1234567890200 + i}",
+                pages=100 + i,
+                genre="fiction" if i % 2 else "history",
+                description=f"Description {i}",
+            )
+        self.export_url = reverse("book-export")
+
+    def read_lines(self, response):
+        """
+        Return the decoded NDJSON lines of a streaming response.
+        """
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(content.endswith("\n"))
+        return [json.loads(line) for line in content.splitlines()]
+
+    @override_settings(BOOKS_EXPORT_CHUNK_SIZE=3)
+    def test_export_streams_every_book(self):
+        """
+        Test that every book is exported, across several chunks.
+        """
+        rows = self.read_lines(self.client.get(self.export_url))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]["title"], "Export Book 6")
+        self.assertEqual(rows[0]["description"], "Description 6")
+        detail = self.client.get(
+            reverse("book-detail", kwargs={"slug": rows[0]["slug"]})
+        )
+        self.assertEqual(rows[0], json.loads(detail.content))
+
+    def test_export_honours_filters_search_and_ordering(self):
+        """
+        Test that the export applies the same filters as list.
+        """
+        rows = self.read_lines(
+            self.client.get(
+                self.export_url,
+                {"genre": "history", "search": "Whitfield", "ordering": "title"},
+            )
+        )
+        self.assertEqual(
+            [row["title"] for row in rows], ["Export Book 0", "Export Book 2"]
+        )
+
+    def test_export_honours_fields(self):
+        """
+        Test that the export returns only the requested fields.
+        """
+        rows = self.read_lines(self.client.get(self.export_url, {"fields": "isbn"}))
+        self.assertEqual(rows[-1], {"isbn": "1234567890200"})
@@ -0,0 +1,200 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books import autocomplete
+from books.models import Book
+
+
+class AutocompleteTests(APITestCase):
+    """
+    Test cases for the in-memory autocomplete endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        autocomplete.index.reset()
+        books = [
+            ("The Hobbit", "J.R.R. Tolkien", 4.7),
+            ("The Silmarillion", "J.R.R. Tolkien", 4.1),
+            ("Tolstoy Stories", "Leo Tolstoy", None),
+            ("Cien años de soledad", "Gabriel García Márquez", 4.5),
+            ("Tom Sawyer", "Mark Twain", 3.9),
+        ]
+        for i, (title, author, rating) in enumerate(books):
+            Book.objects.create(
+                title=title,
+                author=author,
+                rating=rating,
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000200 + i}",
+                pages=100 + i,
+            )
+        self.user = User.objects.create_user(
+            username="completer", email="completer@example.com", password="password"
+        )
+        self.autocomplete_url = reverse("book-autocomplete")
+
+    def suggest(self, query):
+        """
+        Return the titles suggested for a query.
+        """
+        response = self.client.get(self.autocomplete_url, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["query"], query)
+        return [book["title"] for book in response.data["results"]]
+
+    def test_prefix_of_any_word_ranked_by_rating(self):
+        """
+        Test that title and author words match, best rated first.
+        """
+        self.assertEqual(
+            self.suggest("to"),
+            ["The Hobbit", "The Silmarillion", "Tom Sawyer", "Tolstoy Stories"],
+        )
+        self.assertEqual(self.suggest("hob"), ["The Hobbit"])
+        self.assertEqual(self.suggest("mark tw"), ["Tom Sawyer"])
+
+    def test_case_and_accents_ignored(self):
+        """
+        Test that matching ignores case and accents.
+        """
+        self.assertEqual(self.suggest("GARCIA"), ["Cien años de soledad"])
+        self.assertEqual(self.suggest("anos"), ["Cien años de soledad"])
+
+    def test_empty_and_unknown_queries(self):
+        """
+        Test that blank and unmatched queries return no suggestions.
+        """
+        self.assertEqual(self.suggest(""), [])
+        self.assertEqual(self.suggest("zz"), [])
+
+    @override_settings(BOOKS_AUTOCOMPLETE_LIMIT=2)
+    def test_limit(self):
+        """
+        Test that at most BOOKS_AUTOCOMPLETE_LIMIT books are suggested.
+        """
+        self.assertEqual(self.suggest("t"), ["The Hobbit", "The Silmarillion"])
+
+    def test_no_database_queries_once_loaded(self):
+        """
+        Test that suggestions are served without querying the database.
+        """
+        self.suggest("t")
+        with self.assertNumQueries(0):
+            self.suggest("tol")
+
+    def test_reloads_after_writes_of_other_processes(self):
+        """
+        Test that a write this process was not told about, but that moved
+        the autocomplete version, is picked up by a reload.
+        """
+        self.suggest("t")
+        # As another process writes: no signals, just the version bump
+        Book.objects.filter(title="Tom Sawyer").update(title="Moby Dick")
+        self.assertEqual(self.suggest("moby"), [])
+        autocomplete.bump_version()
+        self.assertEqual(self.suggest("moby"), ["Moby Dick"])
+        self.assertEqual(self.suggest("sawyer"), [])
+        with self.assertNumQueries(0):
+            self.suggest("moby")
+
+    def test_local_writes_do_not_reload(self):
+        """
+        Test that writes applied in place leave the index loaded, while the
+        index of another process reloads.
+        """
+        other = autocomplete.PrefixIndex()
+        other.search("t", 10)
+        self.suggest("t")
+        book = Book.objects.get(title="Tom Sawyer")
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = "Huckleberry Finn"
+            book.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.get(title="Tolstoy Stories").delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("huck"), ["Huckleberry Finn"])
+        self.assertEqual(other.search("huck", 10)[0]["title"], "Huckleberry Finn")
+        self.assertEqual(other.search("tolstoy", 10), [])
+
+    def test_preload(self):
+        """
+        Test that a preloaded index answers the first request without a
+        query.
+        """
+        autocomplete.index.preload()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("hob"), ["The Hobbit"])
+
+    def test_follows_save_and_delete(self):
+        """
+        Test that saved and deleted books are reflected after commit.
+        """
+        self.suggest("t")
+        book = Book.objects.get(title="Tom Sawyer")
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = "Huckleberry Finn"
+            book.save()
+        self.assertEqual(self.suggest("huck"), ["Huckleberry Finn"])
+        self.assertNotIn("Tom Sawyer", self.suggest("tom"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertEqual(self.suggest("huck"), [])
+
+    def test_follows_bulk_writes(self):
+        """
+        Test that bulk create, update and delete refresh the index.
+        """
+        self.suggest("t")
+        self.client.force_authenticate(user=self.user)
+        bulk_url = reverse("book-bulk-create")
+        item = {
+            "title": "Bulk Odyssey",
+            "author": "Homer",
+            "published_date": "2022-01-01",
+            "isbn": "9781000000299",
+            "pages": 300,
+            "rating": 5.0,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(bulk_url, [item], format="json")
+        self.assertEqual(self.suggest("homer"), ["Bulk Odyssey"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse("book-upsert"), [{**item, "rating": 1.0}], format="json"
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                bulk_url + "?search=tolkien", {"rating": 2.0}, format="json"
+            )
+        self.assertEqual(
+            self.client.get(self.autocomplete_url, {"q": "homer"}).data["results"],
+            [
+                {
+                    "id": Book.objects.get(isbn="9781000000299").pk,
+                    "slug": "bulk-odyssey",
+                    "title": "Bulk Odyssey",
+                    "author": "Homer",
+                    "rating": 1.0,
+                }
+            ],
+        )
+        response = self.client.get(self.autocomplete_url, {"q": "tolk"})
+        self.assertEqual(
+            [book["rating"] for book in response.data["results"]], [2.0, 2.0]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(bulk_url + "?search=homer")
+        self.assertEqual(self.suggest("homer"), [])
@@ -0,0 +1,408 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+
+
+def book_payload(i, **overrides):
+    """
+    Return a valid book payload with a unique ISBN.
+    """
+    payload = {
+        "title": f"Bulk Book {i}",
+        "author": f"Bulk Author {i}",
+        "published_date": "2022-01-01",
+        "isbn": f"{9790000000000 + i}",
+        "pages": 100 + i,
+        "language": "en",
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+class BulkCreateTests(APITestCase):
+    """
+    Test cases for the bulk create endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        self.user = User.objects.create_user(
+            username="bulkuser", email="bulk@example.com", password="password"
+        )
+        self.existing = Book.objects.create(
+            title="Existing Book",
+            author="Existing Author",
+            published_date=date(2020, 1, 1),
+            isbn="9790000000999",
+            pages=200,
+        )
+        self.bulk_url = reverse("book-bulk-create")
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create(self):
+        """
+        Test that every valid item is created with a slug.
+        """
+        items = [book_payload(i) for i in range(5)]
+        response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 5)
+        self.assertEqual(response.data["errors"], [])
+        self.assertEqual(Book.objects.count(), 6)
+
+        result = response.data["results"][2]
+        book = Book.objects.get(pk=result["id"])
+        self.assertEqual(result["index"], 2)
+        self.assertEqual(book.isbn, "9790000000002")
+        self.assertEqual(book.slug, "bulk-book-2")
+        self.assertIsNotNone(book.created_at)
+
+    def test_duplicate_titles_get_unique_slugs(self):
+        """
+        Test that repeated titles in a batch get suffixed slugs.
+        """
+        items = [book_payload(i, title="Existing Book") for i in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Book.objects.values_list("slug", flat=True)),
+            ["existing-book", "existing-book-2", "existing-book-3", "existing-book-4"],
+        )
+        # The lookup of the title's slug and its suffixed ones
+        lookups = [q for q in queries if "\"slug\" = 'existing-book'" in q["sql"]]
+        self.assertEqual(len(lookups), 1)
+
+    def test_numbered_slug_taken_by_another_title(self):
+        """
+        Test that a title numbered into the slug of another title in the
+        batch does not collide with it.
+        """
+        items = [
+            book_payload(i, title=title)
+            for i, title in enumerate(["Dune", "Dune", "Dune 2"])
+        ]
+        response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(
+            sorted(
+                Book.objects.filter(title__startswith="Dune").values_list(
+                    "slug", flat=True
+                )
+            ),
+            ["dune", "dune-2", "dune-2-2"],
+        )
+
+    def test_per_item_errors(self):
+        """
+        Test that invalid, duplicate and existing items are reported without
+        aborting the batch.
+        """
+        items = [
+            book_payload(0),
+            book_payload(1, pages="many"),
+            book_payload(2, isbn="9790000000000"),
+            book_payload(3, isbn=self.existing.isbn),
+            book_payload(4),
+        ]
+        response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [1, 2, 3]
+        )
+        self.assertIn("pages", response.data["errors"][0]["errors"])
+        self.assertIn("isbn", response.data["errors"][1]["errors"])
+        self.assertIn("isbn", response.data["errors"][2]["errors"])
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_all_items_invalid(self):
+        """
+        Test that a batch without any valid item returns 400.
+        """
+        response = self.client.post(
+            self.bulk_url, [book_payload(0, title="")], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+
+    def test_payload_must_be_a_list(self):
+        """
+        Test that a non-list payload is rejected.
+        """
+        response = self.client.post(self.bulk_url, book_payload(0), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("error", response.data)
+
+    @override_settings(BOOKS_BULK_MAX_ITEMS=2)
+    def test_max_items(self):
+        """
+        Test that oversized batches are rejected.
+        """
+        items = [book_payload(i) for i in range(3)]
+        response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 1)
+
+    @override_settings(BOOKS_BULK_BATCH_SIZE=2)
+    def test_batched_inserts_and_single_uniqueness_query(self):
+        """
+        Test that ISBNs are checked with one query and rows are inserted in
+        batches.
+        """
+        items = [book_payload(i) for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.bulk_url, items, format="json")
+        sql = [q["sql"] for q in queries if "books_bookfacetcount" not in q["sql"]]
+        self.assertEqual(len([q for q in sql if q.startswith("INSERT")]), 3)
+        self.assertEqual(
+            len([q for q in sql if q.startswith("SELECT") and '"isbn" IN' in q]), 1
+        )
+
+    def test_unauthenticated(self):
+        """
+        Test that unauthenticated users cannot bulk create.
+        """
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.bulk_url, [book_payload(0)], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UpsertTests(APITestCase):
+    """
+    Test cases for the ISBN-keyed upsert endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        self.user = User.objects.create_user(
+            username="upsertuser", email="upsert@example.com", password="password"
+        )
+        self.book = Book.objects.create(
+            title="Bulk Book 0",
+            author="Bulk Author 0",
+            published_date=date(2022, 1, 1),
+            isbn="9790000000000",
+            pages=100,
+            language="en",
+            genre="fiction",
+            description="Keep me",
+            rating=4.1,
+        )
+        self.other = Book.objects.create(
+            title="Bulk Book 1",
+            author="Bulk Author 1",
+            published_date=date(2022, 1, 1),
+            isbn="9790000000001",
+            pages=101,
+            language="en",
+            genre="fiction",
+        )
+        self.upsert_url = reverse("book-upsert")
+        self.client.force_authenticate(user=self.user)
+
+    def test_upsert_counts(self):
+        """
+        Test that inserted, updated and unchanged rows are counted.
+        """
+        items = [
+            book_payload(0, rating=4.1),
+            book_payload(1, pages=999),
+            book_payload(2),
+        ]
+        response = self.client.put(self.upsert_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"inserted": 1, "updated": 1, "unchanged": 1, "errors": []},
+        )
+
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.pages, 999)
+        self.assertEqual(self.other.slug, "bulk-book-1")
+        new_book = Book.objects.get(isbn="9790000000002")
+        self.assertEqual(new_book.slug, "bulk-book-2")
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_missing_optional_fields_are_kept(self):
+        """
+        Test that an update keeps optional fields the item does not set.
+        """
+        original_created_at = self.book.created_at
+        response = self.client.put(
+            self.upsert_url, [book_payload(0, title="Renamed")], format="json"
+        )
+        self.assertEqual(response.data["updated"], 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "Renamed")
+        self.assertEqual(self.book.description, "Keep me")
+        self.assertEqual(float(self.book.rating), 4.1)
+        self.assertEqual(self.book.slug, "bulk-book-0")
+        self.assertEqual(self.book.created_at, original_created_at)
+
+    def test_single_write_statement(self):
+        """
+        Test that one read and one upsert statement serve the batch.
+        """
+        items = [book_payload(i, pages=500 + i) for i in range(4)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(self.upsert_url, items, format="json")
+        sql = [q["sql"] for q in queries if "books_bookfacetcount" not in q["sql"]]
+        writes = [q for q in sql if q.startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 1)
+        self.assertIn("ON CONFLICT", writes[0])
+
+    def test_invalid_items(self):
+        """
+        Test that invalid items are reported while valid ones are written.
+        """
+        items = [book_payload(2), book_payload(3, published_date="never")]
+        response = self.client.put(self.upsert_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["inserted"], 1)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+
+    def test_unauthenticated(self):
+        """
+        Test that unauthenticated users cannot upsert.
+        """
+        self.client.force_authenticate(user=None)
+        response = self.client.put(self.upsert_url, [book_payload(0)], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FilterScopedBulkWriteTests(APITestCase):
+    """
+    Test cases for the filter-scoped bulk update and delete endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        self.user = User.objects.create_user(
+            username="bulkwriter", email="writer@example.com", password="password"
+        )
+        for i in range(6):
+            Book.objects.create(
+                title=f"Scoped Book {i}",
+                author="Shared Author" if i < 2 else f"Author {i}",
+                published_date=date(2020, 1, 1),
+                isbn=f"{9790000000100 + i}",
+                pages=100,
+                language="en" if i % 2 else "fr",
+                genre="sci_fi" if i < 4 else "history",
+            )
+        self.bulk_url = reverse("book-bulk-create")
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_update_by_filter(self):
+        """
+        Test that only the matching books are updated, in one UPDATE.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f"{self.bulk_url}?genre=sci_fi&language=en",
+                {"genre": "fiction", "rating": 4.5},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 2})
+        self.assertEqual(Book.objects.filter(genre="fiction", rating=4.5).count(), 2)
+        self.assertEqual(Book.objects.filter(genre="sci_fi").count(), 2)
+        updates = [
+            q
+            for q in queries
+            if q["sql"].startswith("UPDATE") and "books_bookfacetcount" not in q["sql"]
+        ]
+        self.assertEqual(len(updates), 1)
+
+    def test_bulk_update_by_search(self):
+        """
+        Test that the search parameter scopes the update.
+        """
+        response = self.client.patch(
+            f"{self.bulk_url}?search=Shared", {"pages": 321}, format="json"
+        )
+        self.assertEqual(response.data, {"updated": 2})
+        self.assertEqual(Book.objects.filter(pages=321).count(), 2)
+
+    def test_bulk_update_rejects_unsupported_fields(self):
+        """
+        Test that identifying fields and invalid values are rejected.
+        """
+        for data in [{"isbn": "9790000000999"}, {"title": "Same"}, {}]:
+            with self.subTest(data=data):
+                response = self.client.patch(
+                    f"{self.bulk_url}?genre=sci_fi", data, format="json"
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            f"{self.bulk_url}?genre=sci_fi", {"genre": "poetry"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("genre", response.data)
+
+    def test_bulk_delete_by_filter(self):
+        """
+        Test that only the matching books are deleted, in one DELETE.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(f"{self.bulk_url}?genre=history")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(Book.objects.count(), 4)
+        book_queries = [q["sql"] for q in queries if '"books_book"' in q["sql"]]
+        deletes = [sql for sql in book_queries if sql.startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        # Locking the primary keys, counting their facets, collecting the
+        # books to delete and deleting them
+        self.assertEqual(len(book_queries), 4)
+
+    def test_filter_required(self):
+        """
+        Test that a bulk write without filters is rejected.
+        """
+        response = self.client.delete(self.bulk_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(self.bulk_url, {"pages": 1}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 6)
+        self.assertFalse(Book.objects.filter(pages=1).exists())
+
+    @override_settings(BOOKS_BULK_MAX_ROWS=3)
+    def test_row_cap(self):
+        """
+        Test that writes matching more rows than the cap change nothing.
+        """
+        response = self.client.delete(f"{self.bulk_url}?genre=sci_fi")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            f"{self.bulk_url}?genre=sci_fi", {"pages": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 6)
+        self.assertFalse(Book.objects.filter(pages=1).exists())
+
+    def test_unauthenticated(self):
+        """
+        Test that unauthenticated users cannot bulk update or delete.
+        """
+        self.client.force_authenticate(user=None)
+        response = self.client.delete(f"{self.bulk_url}?genre=history")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Book.objects.count(), 6)
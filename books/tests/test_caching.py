@@ -0,0 +1,167 @@
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books import caching
+from books.models import Book
+
+
+@override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTests(APITestCase):
+    """
+    Test cases for the generation-versioned response cache.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(3):
+            Book.objects.create(
+                title=f"Cached Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000400 + i}",
+                pages=100 + i,
+                genre="fiction",
+                language="en",
+                rating=4.5,
+            )
+        self.user = User.objects.create_user(
+            username="cacher", email="cacher@example.com", password="password"
+        )
+        self.books_url = reverse("book-list")
+
+    def get(self, url, data=None, **extra):
+        """
+        Return a GET response and the number of queries it ran.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_read_actions_served_from_cache(self):
+        """
+        Test that repeated reads of each cached action skip the database.
+        """
+        book = Book.objects.first()
+        urls = [
+            self.books_url,
+            reverse("book-featured"),
+            reverse("book-by-genre", kwargs={"genre_name": "fiction"}),
+            reverse("book-detail", kwargs={"slug": book.slug}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first, first_queries = self.get(url)
+                second, second_queries = self.get(url)
+                self.assertGreater(first_queries, 0)
+                self.assertEqual(second_queries, 0)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second["Content-Type"], "application/json")
+
+    def test_query_parameters_normalised(self):
+        """
+        Test that parameter order does not change the cache key.
+        """
+        self.get(self.books_url + "?genre=fiction&language=en")
+        _, queries = self.get(self.books_url + "?language=en&genre=fiction")
+        self.assertEqual(queries, 0)
+        _, queries = self.get(self.books_url + "?language=en&genre=mystery")
+        self.assertGreater(queries, 0)
+
+    def test_writes_invalidate(self):
+        """
+        Test that creating, updating and deleting books invalidate the cache.
+        """
+        self.client.force_authenticate(user=self.user)
+        self.get(self.books_url)
+        response = self.client.post(
+            self.books_url,
+            {
+                "title": "Fresh Book",
+                "author": "New Author",
+                "published_date": "2024-01-01",
+                "isbn": "9781000000499",
+                "pages": 120,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response, _ = self.get(self.books_url)
+        self.assertEqual(json.loads(response.content)["count"], 4)
+
+        book = Book.objects.get(isbn="9781000000499")
+        book.title = "Renamed Book"
+        book.save()
+        response, _ = self.get(self.books_url)
+        self.assertIn(b"Renamed Book", response.content)
+
+        self.client.delete(reverse("book-bulk-create") + "?genre=fiction")
+        response, _ = self.get(self.books_url)
+        self.assertEqual(json.loads(response.content)["count"], 0)
+
+    def test_generation_bumped_again_on_commit(self):
+        """
+        Test that a write schedules a second bump for after commit.
+        """
+        before = caching.get_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Book.objects.first().save()
+        self.assertTrue(callbacks)
+        self.assertEqual(caching.get_generation(), before + 2)
+
+    def test_lost_generation_restarts_higher(self):
+        """
+        Test that a generation evicted from the cache is never reused.
+        """
+        before = caching.get_generation()
+        cache.delete(caching.GENERATION_KEY)
+        caching.bump_generation()
+        self.assertGreater(caching.get_generation(), before)
+
+    def test_auth_state_in_key(self):
+        """
+        Test that anonymous and authenticated clients are cached separately.
+        """
+        self.get(self.books_url)
+        self.client.force_authenticate(user=self.user)
+        _, queries = self.get(self.books_url)
+        self.assertGreater(queries, 0)
+
+    def test_only_json_cached(self):
+        """
+        Test that the browsable API is never served from the cache.
+        """
+        self.get(self.books_url, {"format": "api"})
+        _, queries = self.get(self.books_url, {"format": "api"})
+        self.assertGreater(queries, 0)
+
+    def test_errors_not_cached(self):
+        """
+        Test that error responses are not cached.
+        """
+        url = reverse("book-detail", kwargs={"slug": "missing-book"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertGreater(len(queries), 0)
+
+    @override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        """
+        Test that a zero timeout disables the cache.
+        """
+        self.get(self.books_url)
+        _, queries = self.get(self.books_url)
+        self.assertGreater(queries, 0)
@@ -1,9 +1,22 @@
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
 from io import StringIO
+from unittest import mock
 
-from django.core.management import call_command
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.throttling import UserRateThrottle
 
-from books.models import Book
+from books import autocomplete, bulk
+from books.isbn import isbn13_check_digit, normalize_isbn
+from books.management.commands.benchmark import seed_book
+from books.models import Book, BookFacetCount
+from books.signals import books_bulk_changed
 
 
 class PopulateBooksCommandTests(TestCase):
@@ -54,8 +67,9 @@ class PopulateBooksCommandTests(TestCase):
             self.assertIsNotNone(book.language)
             self.assertIsNotNone(book.genre)
 
-            # Check that ISBN is 13 characters
+            # Check that ISBN is a valid ISBN-13
             self.assertEqual(len(book.isbn), 13)
+            self.assertEqual(normalize_isbn(book.isbn), book.isbn)
 
             # Check that pages is a positive integer
             self.assertGreater(book.pages, 0)
@@ -90,3 +104,431 @@ class PopulateBooksCommandTests(TestCase):
 
             # Check that the correct number of books was created
             self.assertEqual(Book.objects.count(), count)
+
+    def test_command_is_reproducible_with_seed(self):
+        """
+        Test that the same seed generates the same books, whatever the
+        number of workers.
+        """
+        call_command("populate_books", count=25, seed=7, workers=1, stdout=StringIO())
+        first = list(Book.objects.order_by("isbn").values_list("title", "isbn"))
+        Book.objects.all().delete()
+        call_command("populate_books", count=25, seed=7, workers=2, stdout=StringIO())
+        second = list(Book.objects.order_by("isbn").values_list("title", "isbn"))
+        self.assertEqual(first, second)
+
+    def test_command_numbers_slugs_after_existing_books(self):
+        """
+        Test that a second run with the same seed keeps slugs unique.
+        """
+        call_command("populate_books", count=20, seed=3, stdout=StringIO())
+        call_command("populate_books", count=20, seed=3, stdout=StringIO())
+        slugs = list(Book.objects.values_list("slug", flat=True))
+        self.assertEqual(len(slugs), 40)
+        self.assertEqual(len(slugs), len(set(slugs)))
+
+    def test_command_replaces_taken_isbns(self):
+        """
+        Test that a second run with the same seed, whose rows all draw ISBNs
+        the first run inserted, replaces them with fresh valid ones.
+        """
+        call_command("populate_books", count=20, seed=3, stdout=StringIO())
+        first = set(Book.objects.values_list("isbn", flat=True))
+        call_command(
+            "populate_books", count=20, seed=3, batch_size=7, stdout=StringIO()
+        )
+        isbns = list(Book.objects.values_list("isbn", flat=True))
+        self.assertEqual(len(isbns), len(set(isbns)))
+        self.assertEqual(len(set(isbns) - first), 20)
+        for isbn in isbns:
+            self.assertEqual(normalize_isbn(isbn), isbn)
+
+    def test_command_signals_created_books(self):
+        """
+        Test that the created books are announced with books_bulk_changed.
+        """
+        received = []
+
+        def receiver(sender, pks, **kwargs):
+            received.extend(pks)
+
+        books_bulk_changed.connect(receiver, sender=Book)
+        self.addCleanup(books_bulk_changed.disconnect, receiver, sender=Book)
+        call_command("populate_books", count=5, workers=1, stdout=StringIO())
+        self.assertEqual(
+            sorted(received), sorted(Book.objects.values_list("pk", flat=True))
+        )
+
+    def test_command_rejects_negative_count(self):
+        """
+        Test that a negative count is rejected.
+        """
+        with self.assertRaises(CommandError):
+            call_command("populate_books", count=-1, stdout=StringIO())
+
+
+class PopulateBooksDeferredIndexesTests(TransactionTestCase):
+    """
+    Test cases for populate_books loads that defer index maintenance, which
+    cannot run inside a test transaction.
+    """
+
+    def test_command_rebuilds_deferred_indexes(self):
+        """
+        Test that a load with deferred indexes leaves them, and search,
+        working.
+        """
+        with mock.patch(
+            "books.management.commands.populate_books.DEFER_INDEXES_MIN_ROWS", 1
+        ):
+            out = StringIO()
+            call_command("populate_books", count=30, seed=5, stdout=out)
+        self.assertIn("Rebuilding secondary indexes", out.getvalue())
+        book = Book.objects.first()
+        word = book.title.split()[0]
+        cache.clear()
+        response = self.client.get("/api/v1/books/", {"search": word})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()["count"], 0)
+
+
+class BenchmarkSerializersCommandTests(TestCase):
+    """
+    Test cases for the benchmark_serializers management command.
+    """
+
+    def test_command_output(self):
+        """
+        Test that the command reports both rates and the speedup.
+        """
+        out = StringIO()
+        call_command("benchmark_serializers", rows=50, repeat=1, stdout=out)
+        self.assertIn("BookListSerializer:", out.getvalue())
+        self.assertIn("FastListSerializer:", out.getvalue())
+        self.assertIn("Speedup:", out.getvalue())
+
+
+class BenchmarkCommandTests(TestCase):
+    """
+    Test cases for the benchmark management command.
+    """
+
+    def test_results(self):
+        """
+        Test that every scenario is timed and reported as JSON, and that the
+        books created by the benchmark are removed again.
+        """
+        out = StringIO()
+        call_command(
+            "benchmark",
+            sizes="30",
+            requests=3,
+            warmup=1,
+            in_place=True,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["environment"]["database"], connection.vendor)
+        results = report["results"]["30"]
+        self.assertEqual(
+            list(results),
+            [
+                "list",
+                "search",
+                "filter_order",
+                "retrieve",
+                "featured",
+                "by_genre",
+                "create",
+                "update",
+            ],
+        )
+        for stats in results.values():
+            self.assertEqual(stats["requests"], 3)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+        self.assertEqual(Book.objects.count(), 30)
+
+    def test_requests_are_not_throttled(self):
+        """
+        Test that a run sends more requests than the daily throttle allows.
+        """
+        limit = UserRateThrottle().num_requests
+        call_command(
+            "benchmark",
+            sizes="5",
+            scenarios="retrieve",
+            requests=limit + 1,
+            warmup=0,
+            in_place=True,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+        self.assertEqual(UserRateThrottle().num_requests, limit)
+
+    def test_in_place_refuses_other_books(self):
+        """
+        Test that --in-place leaves a database holding other books untouched.
+        """
+        book = Book.objects.create(
+            title="Real Book",
+            author="Real Author",
+            published_date=date(2020, 1, 1),
+            isbn=seed_book(0, 0).isbn,
+            pages=100,
+        )
+        with self.assertRaisesMessage(CommandError, "1 other books"):
+            call_command(
+                "benchmark",
+                sizes="5",
+                scenarios="create",
+                requests=1,
+                warmup=0,
+                in_place=True,
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+        self.assertEqual(list(Book.objects.all()), [book])
+
+    def test_seeding_is_deterministic(self):
+        """
+        Test that catalogs are seeded identically, whatever their size.
+        """
+        first, second = seed_book(7, 123), seed_book(7, 123)
+        self.assertEqual(first.title, second.title)
+        self.assertEqual(first.isbn, second.isbn)
+        self.assertNotEqual(first.slug, seed_book(7, 124).slug)
+        self.assertEqual(normalize_isbn(first.isbn), first.isbn)
+
+    def test_baseline_comparison(self):
+        """
+        Test that results are compared against a baseline run.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, "baseline.json")
+            output = os.path.join(directory, "results.json")
+            options = {
+                "sizes": "20",
+                "scenarios": "list",
+                "requests": 2,
+                "warmup": 0,
+                "in_place": True,
+                "stderr": StringIO(),
+            }
+            call_command("benchmark", output=baseline, stdout=StringIO(), **options)
+            out = StringIO()
+            call_command(
+                "benchmark", output=output, baseline=baseline, stdout=out, **options
+            )
+            with open(output) as f:
+                report = json.load(f)
+        self.assertEqual(
+            set(report["comparison"]["20"]["list"]), {"throughput", "p50_ms", "p99_ms"}
+        )
+        self.assertIn("vs baseline", out.getvalue())
+
+
+class ImportBooksCommandTests(TestCase):
+    """
+    Test cases for the import_books management command.
+    """
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.book = Book.objects.create(
+            title="The Hobbit",
+            author="J. R. R. Tolkien",
+            published_date=date(1937, 9, 21),
+            isbn="9780261103344",
+            pages=310,
+            genre="fantasy",
+            price=Decimal("12.50"),
+        )
+
+    def write_file(self, name, lines):
+        """
+        Write lines to a file in the test directory and return its path.
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def write_jsonl(self, name, items):
+        """
+        Write items to a JSONL file in the test directory and return its path.
+        """
+        return self.write_file(name, [json.dumps(item) for item in items])
+
+    def book_item(self, number, **fields):
+        """
+        Return the payload of a valid new book.
+        """
+        body = f"979400{number:06d}"
+        return {
+            "title": f"Imported {number}",
+            "author": "Feed Author",
+            "published_date": "2020-01-01",
+            "isbn": body + isbn13_check_digit(body),
+            "pages": 100 + number,
+            **fields,
+        }
+
+    def read_rejects(self, path):
+        """
+        Return the records of a rejects file.
+        """
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_imports_csv(self):
+        """
+        Test that CSV rows are inserted with slugs, that existing ISBNs are
+        updated, and that empty values keep the current ones.
+        """
+        path = self.write_file(
+            "feed.csv",
+            [
+                "title,author,published_date,isbn,pages,genre,price",
+                '"The Hobbit, or There and Back Again",J. R. R. Tolkien,'
+                "1937-09-21,9780261103344,320,fantasy,",
+                "The Hobbit,Someone Else,2001-01-01,9780306406157,100,fiction,9.99",
+            ],
+        )
+        out = StringIO()
+        call_command("import_books", path, stdout=out)
+        self.assertIn("1 inserted, 1 updated, 0 unchanged, 0 rejected", out.getvalue())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "The Hobbit, or There and Back Again")
+        self.assertEqual(self.book.pages, 320)
+        self.assertEqual(str(self.book.price), "12.50")
+        created = Book.objects.get(isbn="9780306406157")
+        self.assertEqual(created.slug, "the-hobbit-2")
+        self.assertEqual(str(created.price), "9.99")
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+        self.assertFalse(os.path.exists(path + ".rejects.jsonl"))
+
+    def test_imports_jsonl(self):
+        """
+        Test that JSONL items are upserted, unchanged books are counted, and
+        the facet counts include the new books.
+        """
+        items = [self.book_item(number, genre="mystery") for number in range(5)]
+        items.append(
+            {
+                "title": "The Hobbit",
+                "author": "J. R. R. Tolkien",
+                "published_date": "1937-09-21",
+                "isbn": "9780261103344",
+                "pages": 310,
+                "genre": "fantasy",
+            }
+        )
+        path = self.write_jsonl("feed.jsonl", items)
+        out = StringIO()
+        call_command("import_books", path, chunk_size=2, stdout=out)
+        self.assertIn("5 inserted, 0 updated, 1 unchanged", out.getvalue())
+        self.assertEqual(Book.objects.filter(genre="mystery").count(), 5)
+        facet = BookFacetCount.objects.get(facet="genre", value="mystery")
+        self.assertEqual(facet.count, 5)
+
+    def test_signals_written_books(self):
+        """
+        Test that the books written are announced with books_bulk_changed,
+        so the autocomplete index picks them up, and that the process-local
+        cache is warned about.
+        """
+        autocomplete.index.reset()
+        self.addCleanup(autocomplete.index.reset)
+        autocomplete.index.ensure_loaded()
+        items = [self.book_item(1, title="Zephyr Tales")]
+        path = self.write_jsonl("feed.jsonl", items)
+        err = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_books", path, stdout=StringIO(), stderr=err)
+        titles = [book["title"] for book in autocomplete.index.search("zeph", 10)]
+        self.assertEqual(titles, ["Zephyr Tales"])
+        self.assertIn("REDIS_URL", err.getvalue())
+
+    def test_writes_rejects(self):
+        """
+        Test that invalid rows are written to the rejects file with their
+        line number and errors, and the valid ones are imported.
+        """
+        path = self.write_file(
+            "feed.jsonl",
+            [
+                json.dumps(self.book_item(1)),
+                "{not json",
+                "",
+                json.dumps(self.book_item(2, pages="many")),
+                json.dumps(["a", "list"]),
+                json.dumps(self.book_item(1)),
+                json.dumps(self.book_item(3)),
+            ],
+        )
+        out = StringIO()
+        call_command("import_books", path, stdout=out)
+        self.assertIn("2 inserted, 0 updated, 0 unchanged, 4 rejected", out.getvalue())
+        rejects = self.read_rejects(path + ".rejects.jsonl")
+        self.assertEqual([reject["line"] for reject in rejects], [2, 4, 5, 6])
+        self.assertEqual(rejects[0]["record"], "{not json")
+        self.assertIn("pages", rejects[1]["errors"])
+        self.assertEqual(rejects[1]["record"]["pages"], "many")
+        self.assertIn("isbn", rejects[3]["errors"])
+
+    def test_resumes_from_checkpoint(self):
+        """
+        Test that an import that failed part way resumes after the last
+        chunk written, without writing its rejects twice.
+        """
+        items = [self.book_item(number) for number in range(6)]
+        items.insert(1, {"title": "No ISBN"})
+        path = self.write_jsonl("feed.jsonl", items)
+        prepare_upserts = bulk.prepare_upserts
+        calls = []
+
+        def fail_second_chunk(valid):
+            calls.append(valid)
+            if len(calls) == 2:
+                raise DatabaseError("connection lost")
+            return prepare_upserts(valid)
+
+        with mock.patch.object(bulk, "prepare_upserts", fail_second_chunk):
+            with self.assertRaises(DatabaseError):
+                call_command("import_books", path, chunk_size=3, stdout=StringIO())
+        self.assertEqual(Book.objects.filter(author="Feed Author").count(), 2)
+        with open(path + ".checkpoint") as f:
+            self.assertEqual(json.load(f)["line"], 3)
+
+        out = StringIO()
+        call_command("import_books", path, chunk_size=3, stdout=out)
+        self.assertIn("Resuming the import", out.getvalue())
+        self.assertIn("6 inserted, 0 updated, 0 unchanged, 1 rejected", out.getvalue())
+        self.assertEqual(Book.objects.filter(author="Feed Author").count(), 6)
+        self.assertEqual(len(self.read_rejects(path + ".rejects.jsonl")), 1)
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+    def test_refuses_changed_file(self):
+        """
+        Test that a checkpoint is not applied to a file that has changed.
+        """
+        path = self.write_jsonl("feed.jsonl", [self.book_item(1)])
+        with open(path + ".checkpoint", "w") as f:
+            json.dump({"source": {"size": 0, "mtime_ns": 0}, "line": 1}, f)
+        with self.assertRaises(CommandError):
+            call_command("import_books", path, stdout=StringIO())
+        call_command("import_books", path, restart=True, stdout=StringIO())
+        self.assertTrue(Book.objects.filter(author="Feed Author").exists())
+
+    def test_rejects_unknown_format(self):
+        """
+        Test that a file whose format cannot be told is refused.
+        """
+        path = self.write_file("feed.txt", ["title"])
+        with self.assertRaises(CommandError):
+            call_command("import_books", path, stdout=StringIO())
@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+
+
+@override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalListTests(APITestCase):
+    """
+    Test cases for the ETag and Last-Modified validators of list endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i, genre in enumerate(["fiction", "fiction", "mystery"]):
+            Book.objects.create(
+                title=f"Conditional Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000500 + i}",
+                pages=100 + i,
+                genre=genre,
+                rating=4.8,
+            )
+        self.user = User.objects.create_user(
+            username="conditional", email="cond@example.com", password="password"
+        )
+        self.books_url = reverse("book-list")
+
+    def test_list_actions_send_validators(self):
+        """
+        Test that list, featured and by_genre answer If-None-Match with 304.
+        """
+        urls = [
+            self.books_url,
+            reverse("book-featured"),
+            reverse("book-by-genre", kwargs={"genre_name": "fiction"}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(response["ETag"].startswith('W/"'))
+                self.assertIn("Last-Modified", response)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response.content, b"")
+                # Only the validators' queries; no rows are fetched
+                sql = [q["sql"].upper() for q in queries]
+                self.assertLessEqual(len(sql), 2)
+                self.assertTrue(any("MAX(" in q for q in sql))
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since is compared with the newest update.
+        """
+        response = self.client.get(self.books_url)
+        last_modified = response["Last-Modified"]
+        response = self.client.get(self.books_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Book.objects.filter(title="Conditional Book 0").update(
+            updated_at=Book.objects.get(title="Conditional Book 0").updated_at
+            + timedelta(minutes=5)
+        )
+        response = self.client.get(self.books_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_change_etag(self):
+        """
+        Test that updates and deletes in the collection change the ETag.
+        """
+        etag = self.client.get(self.books_url)["ETag"]
+        book = Book.objects.get(title="Conditional Book 1")
+        book.pages = 300
+        book.save()
+        response = self.client.get(self.books_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        self.client.force_authenticate(user=self.user)
+        Book.objects.get(title="Conditional Book 0").delete()
+        response = self.client.get(self.books_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_book_leaving_filter_changes_etag(self):
+        """
+        Test that a book moving out of a filtered collection changes its ETag,
+        though the newest book of the collection stays the same.
+        """
+        params = {"genre": "fiction"}
+        etag = self.client.get(self.books_url, params)["ETag"]
+        # The oldest fiction book moves out
+        book = Book.objects.get(title="Conditional Book 0")
+        book.genre = "mystery"
+        book.save()
+        response = self.client.get(self.books_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_filtered_validators_do_not_scan(self):
+        """
+        Test that the validators of a filtered list neither count nor
+        aggregate the filtered books.
+        """
+        params = {"genre": "fiction", "search": "conditional"}
+        etag = self.client.get(self.books_url, params)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.books_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        sql = [q["sql"].upper() for q in queries]
+        self.assertFalse(any("COUNT(" in q for q in sql))
+        self.assertFalse(any("WHERE" in q for q in sql if "MAX(" in q))
+
+    def test_request_shape_in_etag(self):
+        """
+        Test that filters, pages and orderings have their own ETags.
+        """
+        etags = {
+            self.client.get(self.books_url, params)["ETag"]
+            for params in [
+                {},
+                {"genre": "fiction"},
+                {"page": 1},
+                {"ordering": "title"},
+            ]
+        }
+        self.assertEqual(len(etags), 4)
+
+    def test_empty_collection(self):
+        """
+        Test that an empty collection has an ETag, and no Last-Modified once
+        the catalog is empty.
+        """
+        response = self.client.get(self.books_url, {"genre": "romance"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(
+            self.books_url, {"genre": "romance"}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for book in Book.objects.all():
+            book.delete()
+        response = self.client.get(self.books_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    @override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=300)
+    def test_not_modified_from_response_cache(self):
+        """
+        Test that a cached response answers conditional requests without a query.
+        """
+        response = self.client.get(self.books_url)
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(self.books_url)
+            not_modified = self.client.get(
+                self.books_url,
+                HTTP_IF_NONE_MATCH=response["ETag"],
+                HTTP_IF_MODIFIED_SINCE=http_date(0),
+            )
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached["ETag"], response["ETag"])
+        self.assertEqual(cached["Last-Modified"], response["Last-Modified"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
@@ -0,0 +1,188 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books import facets
+from books.models import Book
+
+
+class FacetTests(APITestCase):
+    """
+    Test cases for the genre and language facet counts.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        books = [
+            ("Dragon Lore", "fantasy", "en"),
+            ("Dragon Tales", "fantasy", "fr"),
+            ("Star Maps", "sci_fi", "en"),
+            ("Old Wars", "history", "de"),
+        ]
+        for i, (title, genre, language) in enumerate(books):
+            Book.objects.create(
+                title=title,
+                author=f"Author {i}",
+                genre=genre,
+                language=language,
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000300 + i}",
+                pages=100 + i,
+            )
+        self.user = User.objects.create_user(
+            username="facets", email="facets@example.com", password="password"
+        )
+        self.facets_url = reverse("book-facets")
+
+    def assertCountsConsistent(self):
+        """
+        Assert that the counter table matches a full recount.
+        """
+        self.assertEqual(
+            facets.catalog_counts(), facets.queryset_counts(Book.objects.all())
+        )
+
+    def test_catalog_counts_from_counter_table(self):
+        """
+        Test that unfiltered counts list every choice and skip the books table.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.facets_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["filtered"])
+        self.assertEqual(response.data["genre"]["fantasy"], 2)
+        self.assertEqual(response.data["genre"]["romance"], 0)
+        self.assertEqual(len(response.data["genre"]), len(facets.FACETS["genre"]))
+        self.assertEqual(response.data["language"]["en"], 2)
+        self.assertFalse(any('"books_book"' in q["sql"] for q in queries))
+
+    def test_filtered_counts_use_one_group_by(self):
+        """
+        Test that filtered counts come from a single GROUP BY query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.facets_url, {"search": "dragon"})
+        self.assertTrue(response.data["filtered"])
+        self.assertEqual(response.data["genre"]["fantasy"], 2)
+        self.assertEqual(response.data["genre"]["sci_fi"], 0)
+        self.assertEqual(response.data["language"]["fr"], 1)
+        grouped = [q["sql"] for q in queries if "GROUP BY" in q["sql"]]
+        self.assertEqual(len(grouped), 1)
+
+        response = self.client.get(self.facets_url, {"language": "en"})
+        self.assertEqual(response.data["genre"]["fantasy"], 1)
+        self.assertEqual(response.data["genre"]["sci_fi"], 1)
+
+    def test_updates_move_counts(self):
+        """
+        Test that changing a facet field moves the book between counters.
+        """
+        book = Book.objects.get(title="Star Maps")
+        book.genre = "fantasy"
+        book.save()
+        self.assertEqual(facets.catalog_counts()["genre"]["fantasy"], 3)
+        self.assertEqual(facets.catalog_counts()["genre"]["sci_fi"], 0)
+
+        book.genre = "history"
+        book.save(update_fields=["title"])
+        self.assertCountsConsistent()
+
+        deferred = Book.objects.only("title").get(pk=book.pk)
+        deferred.language = "ja"
+        deferred.save()
+        self.assertEqual(facets.catalog_counts()["language"]["ja"], 1)
+        self.assertCountsConsistent()
+
+    def test_unchanged_facets_write_nothing(self):
+        """
+        Test that saves not touching facet fields leave the counters alone.
+        """
+        book = Book.objects.get(title="Old Wars")
+        book.pages = 999
+        with CaptureQueriesContext(connection) as queries:
+            book.save()
+        self.assertFalse(any("books_bookfacetcount" in q["sql"] for q in queries))
+
+    def test_delete_through_api(self):
+        """
+        Test that deleting a book decrements its counters.
+        """
+        self.client.force_authenticate(user=self.user)
+        book = Book.objects.get(title="Dragon Tales")
+        response = self.client.delete(reverse("book-detail", args=[book.slug]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(facets.catalog_counts()["language"]["fr"], 0)
+        self.assertCountsConsistent()
+
+    def test_rolled_back_writes_are_not_counted(self):
+        """
+        Test that counters change in the same transaction as the books.
+        """
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Book.objects.create(
+                    title="Doomed",
+                    author="Nobody",
+                    genre="romance",
+                    published_date=date(2020, 1, 1),
+                    isbn="9781000000399",
+                    pages=100,
+                )
+                Book.objects.create(
+                    title="Duplicate",
+                    author="Nobody",
+                    published_date=date(2020, 1, 1),
+                    isbn="9781000000399",
+                    pages=100,
+                )
+        self.assertEqual(facets.catalog_counts()["genre"]["romance"], 0)
+
+    def test_bulk_writes_keep_counts(self):
+        """
+        Test that bulk create, update, upsert and delete keep counts right,
+        without recounting the whole catalog.
+        """
+        self.client.force_authenticate(user=self.user)
+        bulk_url = reverse("book-bulk-create")
+        items = [
+            {
+                "title": f"Bulk {i}",
+                "author": "Bulk Author",
+                "published_date": "2022-01-01",
+                "isbn": f"{9781000000310 + i}",
+                "pages": 100,
+                "genre": "romance",
+                "language": "es",
+            }
+            for i in range(3)
+        ]
+        self.client.post(bulk_url, items, format="json")
+        self.assertEqual(facets.catalog_counts()["genre"]["romance"], 3)
+
+        self.client.patch(
+            bulk_url + "?genre=fantasy", {"genre": "other"}, format="json"
+        )
+        self.assertEqual(facets.catalog_counts()["genre"]["other"], 2)
+        self.assertEqual(facets.catalog_counts()["genre"]["fantasy"], 0)
+
+        self.client.put(
+            reverse("book-upsert"), [{**items[0], "language": "it"}], format="json"
+        )
+        self.assertEqual(facets.catalog_counts()["language"]["it"], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(bulk_url + "?genre=romance")
+        self.assertEqual(facets.catalog_counts()["genre"]["romance"], 0)
+        self.assertCountsConsistent()
+        group_bys = [q["sql"] for q in queries if "GROUP BY" in q["sql"]]
+        self.assertEqual(len(group_bys), 1)
+        self.assertIn("WHERE", group_bys[0])
@@ -0,0 +1,220 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books import hotlists
+from books.models import Book
+
+
+@override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=0, BOOKS_HOT_LIST_SIZE=100)
+class HotListTests(APITestCase):
+    """
+    Test cases for the featured and per-genre hot lists.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(14):
+            Book.objects.create(
+                title=f"Hot Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000800 + i}",
+                pages=100 + i,
+                genre="fantasy" if i % 2 else "mystery",
+                rating=3.5 + (i % 4) * 0.5,
+            )
+        self.user = User.objects.create_user(
+            username="hotlists", email="hot@example.com", password="password"
+        )
+        self.featured_url = reverse("book-featured")
+        self.genre_url = reverse("book-by-genre", kwargs={"genre_name": "fantasy"})
+
+    def assertListsMatchDatabase(self):
+        """
+        Assert that every stored hot list is a prefix of its query.
+        """
+        queries = {
+            hotlists.FEATURED: hotlists.featured_books(Book.objects.all()),
+            "genre:fantasy": hotlists.genre_books(Book.objects.all(), "fantasy"),
+            "genre:mystery": hotlists.genre_books(Book.objects.all(), "mystery"),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name=name):
+                ids = hotlists.get_ids(name, queryset)
+                expected = list(queryset.values_list("id", flat=True)[: len(ids)])
+                self.assertEqual(ids, expected)
+
+    def test_first_page_from_hot_list(self):
+        """
+        Test that the first page is one primary key lookup, without a sort.
+        """
+        for url in [self.featured_url, self.genre_url]:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    second = self.client.get(url)
+                self.assertEqual(second.data, first.data)
+                page_queries = [
+                    q["sql"]
+                    for q in queries
+                    if '"books_book"' in q["sql"] and "MAX(" not in q["sql"]
+                ]
+                self.assertEqual(len(page_queries), 1)
+                self.assertIn(" IN (", page_queries[0])
+                self.assertNotIn("ORDER BY", page_queries[0])
+
+    def test_same_response_as_query(self):
+        """
+        Test that hot list pages match those of the regular query.
+        """
+        for url in [self.featured_url, self.genre_url]:
+            for params in [{}, {"page": 1}, {"fields": "title"}, {"count": "none"}]:
+                with self.subTest(url=url, params=params):
+                    hot = self.client.get(url, params)
+                    with override_settings(BOOKS_HOT_LIST_SIZE=0):
+                        direct = self.client.get(url, params)
+                    self.assertEqual(hot.status_code, status.HTTP_200_OK)
+                    self.assertEqual(hot.data, direct.data)
+
+        response = self.client.get(self.genre_url)
+        self.assertEqual(response.data["count"], 7)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertEqual(response.data["results"][0]["title"], "Hot Book 13")
+
+    def test_writes_update_lists_incrementally(self):
+        """
+        Test that saves and deletes move books within the stored lists.
+        """
+        self.assertListsMatchDatabase()
+
+        book = Book.objects.get(title="Hot Book 0")
+        book.rating = 5
+        book.genre = "fantasy"
+        book.published_date = date(2021, 1, 1)
+        book.save()
+        Book.objects.get(title="Hot Book 13").delete()
+        self.client.force_authenticate(user=self.user)
+        self.client.post(
+            reverse("book-list"),
+            {
+                "title": "Newest Mystery",
+                "author": "New Author",
+                "published_date": "2024-01-01",
+                "isbn": "9781000000899",
+                "pages": 100,
+                "genre": "mystery",
+                "rating": 4.0,
+            },
+            format="json",
+        )
+
+        # The lists were updated in place rather than rebuilt.
+        with CaptureQueriesContext(connection) as queries:
+            featured = hotlists.get_ids(
+                hotlists.FEATURED, hotlists.featured_books(Book.objects.all())
+            )
+            mystery = hotlists.get_ids(
+                "genre:mystery", hotlists.genre_books(Book.objects.all(), "mystery")
+            )
+        self.assertEqual(len(queries), 0)
+        self.assertIn(book.pk, featured)
+        self.assertEqual(mystery[0], Book.objects.get(title="Newest Mystery").pk)
+        self.assertNotIn(book.pk, mystery)
+        self.assertListsMatchDatabase()
+
+        response = self.client.get(self.genre_url)
+        self.assertEqual(response.data["results"][0]["title"], "Hot Book 0")
+        self.assertNotIn(
+            "Hot Book 13", [row["title"] for row in response.data["results"]]
+        )
+
+    @override_settings(BOOKS_HOT_LIST_SIZE=11)
+    def test_books_leaving_a_full_list(self):
+        """
+        Test that a list too short for a page after books leave is rebuilt.
+        """
+        for i in range(4):
+            Book.objects.create(
+                title=f"Extra Book {i}",
+                author="Extra Author",
+                published_date=date(2021, 1, 1),
+                isbn=f"{9781000000880 + i}",
+                pages=100,
+                rating=4.2,
+            )
+        queryset = hotlists.featured_books(Book.objects.all())
+        self.assertEqual(len(hotlists.get_ids(hotlists.FEATURED, queryset)), 11)
+        for book in Book.objects.filter(rating__gte=4.5)[:3]:
+            book.rating = 1
+            book.save()
+        self.assertListsMatchDatabase()
+        response = self.client.get(self.featured_url)
+        self.assertEqual(response.data["count"], queryset.count())
+
+    def test_bulk_writes_invalidate(self):
+        """
+        Test that bulk writes drop the lists.
+        """
+        self.client.get(self.genre_url)
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(
+            reverse("book-bulk-create") + "?genre=mystery",
+            {"genre": "fantasy"},
+            format="json",
+        )
+        response = self.client.get(self.genre_url)
+        self.assertEqual(response.data["count"], 14)
+        self.assertListsMatchDatabase()
+
+    def test_unknown_genre_has_no_hot_list(self):
+        """
+        Test that genres outside the choices are listed without caching a
+        hot list for them.
+        """
+        url = reverse("book-by-genre", kwargs={"genre_name": "no-such-genre"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+        self.assertIsNone(hotlists.genre_list("no-such-genre"))
+        self.assertIsNone(cache.get(hotlists.version_key("genre:no-such-genre")))
+
+    @override_settings(BOOKS_HOT_LIST_TIMEOUT=120)
+    def test_lists_expire(self):
+        """
+        Test that hot lists are cached with the configured timeout.
+        """
+        with mock.patch.object(
+            hotlists.cache, "set", wraps=hotlists.cache.set
+        ) as cache_set:
+            self.client.get(self.genre_url)
+        self.assertEqual(
+            cache_set.call_args_list[-1],
+            mock.call(hotlists.list_key("genre:fantasy"), mock.ANY, timeout=120),
+        )
+
+    def test_stale_list_falls_back_to_query(self):
+        """
+        Test that a list disagreeing with the database is not served.
+        """
+        self.client.get(self.featured_url)
+        # Change a rating behind the signals' back.
+        Book.objects.filter(title="Hot Book 3").update(rating=1)
+        response = self.client.get(self.featured_url)
+        self.assertNotIn(
+            "Hot Book 3", [row["title"] for row in response.data["results"]]
+        )
+        with override_settings(BOOKS_HOT_LIST_SIZE=0):
+            direct = self.client.get(self.featured_url)
+        self.assertEqual(response.data, direct.data)
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+
+from books.isbn import normalize_isbn, split_isbns
+
+
+class NormalizeIsbnTests(SimpleTestCase):
+    """
+    Test cases for ISBN normalisation.
+    """
+
+    def test_isbn13(self):
+        """
+        Test that valid ISBN-13s are returned without separators.
+        """
+        for value in ["9780306406157", "978-0-306-40615-7", " 978 0306 406157 "]:
+            with self.subTest(value=value):
+                self.assertEqual(normalize_isbn(value), "9780306406157")
+
+    def test_isbn10_converted(self):
+        """
+        Test that valid ISBN-10s are converted to ISBN-13.
+        """
+        self.assertEqual(normalize_isbn("0-306-40615-2"), "9780306406157")
+        self.assertEqual(normalize_isbn("080442957x"), "9780804429573")
+
+    def test_invalid(self):
+        """
+        Test that bad check digits and non-ISBN strings are rejected.
+        """
+        for value in [
+            "9780306406158",
+            "0306406153",
+            "1234567890123",
+            "97803064061",
+            "tolkien",
+            "",
+        ]:
+            with self.subTest(value=value):
+                self.assertIsNone(normalize_isbn(value))
+
+    def test_split_isbns(self):
+        """
+        Test that ISBNs are separated from other terms and de-duplicated.
+        """
+        self.assertEqual(
+            split_isbns(["0-306-40615-2", "dune", "9780306406157", "9790000000001"]),
+            (["9780306406157", "9790000000001"], ["dune"]),
+        )
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+from rest_framework.authtoken.models import Token
+
+from books import loadtest
+from books.models import Book
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    """
+    Test cases for the loadtest management command, against a live server.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(15):
+            Book.objects.create(
+                title=f"Loaded Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000001000 + i}",
+                pages=100 + i,
+                genre="fantasy",
+                rating=4.5,
+            )
+        user = User.objects.create_user(username="loadtester", password="secret")
+        self.token = Token.objects.create(user=user).key
+
+    def loadtest(self, **options):
+        """
+        Run the command against the live server and return its JSON report.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            call_command(
+                "loadtest",
+                url=self.live_server_url,
+                token=self.token,
+                clients=2,
+                output=output,
+                stdout=StringIO(),
+                **options,
+            )
+            with open(output) as f:
+                return json.load(f)
+
+    def test_closed_loop(self):
+        """
+        Test that every action of the mix is sent and reported.
+        """
+        report = self.loadtest(duration=1, mix="list=1,retrieve=1,by_genre=1,update=1")
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(report["error_rate"], 0)
+        self.assertEqual(set(report["status_codes"]), {"200"})
+        for action in ["list", "retrieve", "by_genre", "update"]:
+            with self.subTest(action=action):
+                stats = report["actions"][action]
+                self.assertGreater(stats["requests"], 0)
+                self.assertLessEqual(
+                    stats["latency_ms"]["p50"], stats["latency_ms"]["p99"]
+                )
+
+    def test_open_loop(self):
+        """
+        Test that an open-loop run sends about rate x duration requests.
+        """
+        report = self.loadtest(duration=1, rate=20, mix="featured=1,create=1")
+        self.assertGreater(report["requests"], 5)
+        self.assertLess(report["requests"], 50)
+        self.assertEqual(report["rate"], 20)
+        self.assertEqual(set(report["status_codes"]) - {"200", "201"}, set())
+
+    def test_writes_need_a_token(self):
+        """
+        Test that create and update are refused without a token.
+        """
+        with self.assertRaisesMessage(CommandError, "--token is required"):
+            call_command("loadtest", url=self.live_server_url, mix="create=1")
+
+
+class ParseMixTests(SimpleTestCase):
+    """
+    Test cases for parsing request mixes.
+    """
+
+    def test_weights(self):
+        """
+        Test that weights are parsed, defaulting to 1.
+        """
+        self.assertEqual(
+            loadtest.parse_mix("list=3, retrieve"), {"list": 3.0, "retrieve": 1.0}
+        )
+
+    def test_invalid(self):
+        """
+        Test that unknown actions and empty mixes are rejected.
+        """
+        for value in ["delete=1", "list=x", "list=0", ""]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    loadtest.parse_mix(value)
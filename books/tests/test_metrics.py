@@ -0,0 +1,149 @@
+import os
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APITestCase
+
+from books import metrics
+from books.models import Book
+
+
+def sample(name, **labels):
+    """
+    Return the current value of a metric sample, or 0 if it has none,
+    after writing the pending observations.
+    """
+    metrics.flush()
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(APITestCase):
+    """
+    Test cases for the Prometheus metrics.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(3):
+            Book.objects.create(
+                title=f"Measured Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000950 + i}",
+                pages=100 + i,
+                genre="fantasy",
+            )
+        self.books_url = reverse("book-list")
+
+    def test_requests_labelled_by_action(self):
+        """
+        Test that latency, query and size metrics are labelled by viewset
+        action and status code.
+        """
+        urls = {
+            "list": self.books_url,
+            "retrieve": reverse("book-detail", args=["measured-book-1"]),
+            "featured": reverse("book-featured"),
+            "by_genre": reverse("book-by-genre", kwargs={"genre_name": "fantasy"}),
+        }
+        for action, url in urls.items():
+            with self.subTest(action=action):
+                labels = {"action": action, "method": "GET", "status": "200"}
+                before = sample("books_request_duration_seconds_count", **labels)
+                queries = sample("books_request_db_queries_count", action=action)
+                size = sample(
+                    "books_response_size_bytes_sum", action=action, status="200"
+                )
+                response = self.client.get(url)
+                self.assertEqual(
+                    sample("books_request_duration_seconds_count", **labels),
+                    before + 1,
+                )
+                self.assertEqual(
+                    sample("books_request_db_queries_count", action=action),
+                    queries + 1,
+                )
+                self.assertEqual(
+                    sample(
+                        "books_response_size_bytes_sum", action=action, status="200"
+                    ),
+                    size + len(response.content),
+                )
+
+    def test_error_status(self):
+        """
+        Test that failed requests are labelled with their status code.
+        """
+        labels = {"action": "create", "method": "POST", "status": "401"}
+        before = sample("books_request_duration_seconds_count", **labels)
+        response = self.client.post(self.books_url, {}, format="json")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            sample("books_request_duration_seconds_count", **labels), before + 1
+        )
+
+    @override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=300)
+    def test_cache_hits_and_misses(self):
+        """
+        Test that response cache lookups are counted as hits and misses.
+        """
+        name = "books_response_cache_requests_total"
+        hits = sample(name, action="list", result="hit")
+        misses = sample(name, action="list", result="miss")
+        self.client.get(self.books_url)
+        self.client.get(self.books_url)
+        self.assertEqual(sample(name, action="list", result="miss"), misses + 1)
+        self.assertEqual(sample(name, action="list", result="hit"), hits + 1)
+
+    def test_metrics_endpoint(self):
+        """
+        Test that /metrics serves the Prometheus text format.
+        """
+        self.client.get(self.books_url)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn("books_request_duration_seconds_bucket{", content)
+        self.assertIn('action="list"', content)
+
+    @override_settings(BOOKS_METRICS_ALLOWED_IPS=["10.0.0.5"], BOOKS_METRICS_TOKEN="")
+    def test_metrics_endpoint_restricted_to_allowed_ips(self):
+        """
+        Test that /metrics refuses clients outside the allowed addresses.
+        """
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, REMOTE_ADDR="10.0.0.5")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BOOKS_METRICS_ALLOWED_IPS=[], BOOKS_METRICS_TOKEN="s3cret")
+    def test_metrics_endpoint_bearer_token(self):
+        """
+        Test that /metrics answers any client sending the bearer token.
+        """
+        url = reverse("metrics")
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_multiproc_dir_created(self):
+        """
+        Test that a missing PROMETHEUS_MULTIPROC_DIR is created, so recording
+        samples does not fail outside gunicorn.
+        """
+        with tempfile.TemporaryDirectory() as parent:
+            path = os.path.join(parent, "prometheus")
+            with mock.patch.dict(os.environ, {metrics.MULTIPROC_DIR_ENV: path}):
+                metrics.ensure_multiproc_dir()
+            self.assertTrue(os.path.isdir(path))
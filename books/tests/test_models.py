@@ -1,9 +1,14 @@
 from datetime import date
+from unittest import mock
 
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.text import slugify
 
+from books import slugs
 from books.models import Book
 
 
@@ -117,3 +122,135 @@ class BookModelTests(TestCase):
         books = Book.objects.all()
         self.assertEqual(books[0], book2)  # Newer book should come first
         self.assertEqual(books[1], self.book)
+
+
+class SlugTests(TestCase):
+    """
+    Test cases for unique slug generation.
+    """
+
+    def create(self, title, **fields):
+        """
+        Create a book with the given title and a fresh ISBN.
+        """
+        return Book.objects.create(
+            title=title,
+            author="Slug Author",
+            published_date=date(2020, 1, 1),
+            isbn=f"{9781000000600 + Book.objects.count()}",
+            pages=100,
+            **fields,
+        )
+
+    def test_duplicate_titles_get_suffixes(self):
+        """
+        Test that repeated titles get -2, -3, ... slugs from one lookup.
+        """
+        self.create("Same Title")
+        self.create("Same Title")
+        with CaptureQueriesContext(connection) as queries:
+            third = self.create("Same Title")
+        self.assertEqual(
+            list(Book.objects.order_by("pk").values_list("slug", flat=True)),
+            ["same-title", "same-title-2", "same-title-3"],
+        )
+        self.assertEqual(third.slug, "same-title-3")
+        # The lookup of the title's slug and its suffixed ones
+        lookups = [q for q in queries if "\"slug\" = 'same-title'" in q["sql"]]
+        self.assertEqual(len(lookups), 1)
+
+    def test_suffix_skips_taken_numbers(self):
+        """
+        Test that the suffix continues after the highest one in use.
+        """
+        self.create("Sequel", slug="sequel-7")
+        self.create("Sequel 2")
+        self.create("Sequel Extended", slug="sequel-extended")
+        self.assertEqual(self.create("Sequel").slug, "sequel-8")
+        self.assertEqual(self.create("Sequel 2").slug, "sequel-2-2")
+
+    def test_numbered_slug_taken_by_another_title(self):
+        """
+        Test that slugs numbered within a batch never repeat the slug of
+        another title in the batch, whichever comes first.
+        """
+        for titles, expected in [
+            (["Dune", "Dune", "Dune 2"], ["dune", "dune-2", "dune-2-2"]),
+            (["Dune 2", "Dune", "Dune"], ["dune-2", "dune", "dune-3"]),
+        ]:
+            books = [
+                Book(title=title, published_date=date(2020, 1, 1)) for title in titles
+            ]
+            slugs.assign_slugs(books, Book.objects)
+            self.assertEqual([book.slug for book in books], expected)
+
+    def test_unsluggable_title(self):
+        """
+        Test that a title without slug characters gets the fallback slug.
+        """
+        self.assertEqual(self.create("!!!").slug, slugs.FALLBACK_SLUG)
+        self.assertEqual(self.create("???").slug, f"{slugs.FALLBACK_SLUG}-2")
+
+    def test_slugs_are_unique(self):
+        """
+        Test that a custom slug cannot be used twice.
+        """
+        self.create("First", slug="taken")
+        with self.assertRaises(IntegrityError):
+            self.create("Second", slug="taken")
+
+    def test_concurrently_taken_slug_is_regenerated(self):
+        """
+        Test that a slug taken between lookup and insert is replaced.
+        """
+        self.create("Race")
+        highest_suffixes = slugs.highest_suffixes
+        calls = []
+
+        def stale_lookup(manager, bases, taken=None):
+            calls.append(bases)
+            if len(calls) == 1:
+                return dict.fromkeys(bases, 0)
+            return highest_suffixes(manager, bases, taken)
+
+        with mock.patch.object(slugs, "highest_suffixes", stale_lookup):
+            book = self.create("Race")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(book.slug, "race-2")
+
+
+class SlugMigrationTests(TransactionTestCase):
+    """
+    Test the migration that makes slugs unique.
+    """
+
+    def test_backfill_dedupes_slugs(self):
+        """
+        Test that missing and duplicated slugs are replaced before the unique
+        index is built.
+        """
+        executor = MigrationExecutor(connection)
+        executor.migrate([("books", "0008_book_updated_at_indexes")])
+        old_apps = executor.loader.project_state(
+            ("books", "0008_book_updated_at_indexes")
+        ).apps
+        OldBook = old_apps.get_model("books", "Book")
+        for i, (title, slug) in enumerate(
+            [("Twin", "twin"), ("Twin", "twin"), ("Twin", "twin"), ("Blank", "")]
+        ):
+            OldBook.objects.create(
+                title=title,
+                slug=slug,
+                author="Old Author",
+                published_date=date(2020, 1, 1),
+                isbn=f"{9781000000700 + i}",
+                pages=100,
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(
+            list(Book.objects.order_by("pk").values_list("slug", flat=True)),
+            ["twin", "twin-2", "twin-3", "blank"],
+        )
@@ -0,0 +1,282 @@
+from datetime import date, timedelta
+from unittest import skipIf, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from books.pagination import estimate_count, remember_count
+
+
+def count_queries(queries):
+    """
+    Return the SQL of the captured queries that count books, leaving out
+    the ETag validator query (see books.conditional).
+    """
+    return [
+        q["sql"]
+        for q in queries
+        if "COUNT(" in q["sql"].upper() and "MAX(" not in q["sql"].upper()
+    ]
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Test cases for the opt-in keyset (cursor) pagination mode.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+
+        Publication dates and ratings repeat, so the primary key tiebreaker
+        is exercised, and every third book has no rating.
+        """
+        cache.clear()
+        for i in range(25):
+            Book.objects.create(
+                title=f"Book {i:02d}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1) + timedelta(days=i // 3),
+                isbn=f"{9780000000000 + i}",
+                pages=100 + i,
+                genre="fiction" if i % 2 else "mystery",
+                rating=None if i % 3 == 0 else 4.0 + (i % 2) / 2,
+            )
+
+        self.books_url = reverse("book-list")
+        self.featured_url = reverse("book-featured")
+        self.genre_url = reverse("book-by-genre", kwargs={"genre_name": "fiction"})
+
+    def walk(self, url, params=None):
+        """
+        Follow the next links from the first page and return every row seen.
+        """
+        params = dict(params or {}, pagination="cursor")
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["previous"])
+        self.assertNotIn("count", response.data)
+        rows = list(response.data["results"])
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows.extend(response.data["results"])
+        return rows
+
+    def test_list_walks_default_ordering(self):
+        """
+        Test that the cursor pages cover the list exactly once, in order.
+        """
+        rows = self.walk(self.books_url)
+        expected = list(
+            Book.objects.order_by("-published_date", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual([row["id"] for row in rows], expected)
+
+    def test_list_walks_every_ordering_field(self):
+        """
+        Test cursor pagination for each of the supported ordering fields,
+        including the nullable rating field.
+        """
+        for ordering in ["title", "-title", "rating", "-rating", "published_date"]:
+            with self.subTest(ordering=ordering):
+                rows = self.walk(self.books_url, {"ordering": ordering})
+                direction = "-" if ordering.startswith("-") else ""
+                expected = list(
+                    Book.objects.order_by(ordering, f"{direction}id").values_list(
+                        "id", flat=True
+                    )
+                )
+                self.assertEqual([row["id"] for row in rows], expected)
+
+    def test_featured_and_by_genre(self):
+        """
+        Test that the featured and by_genre actions also page by cursor.
+        """
+        featured = self.walk(self.featured_url)
+        self.assertEqual(len(featured), Book.objects.filter(rating__gte=4.0).count())
+
+        by_genre = self.walk(self.genre_url)
+        self.assertEqual(len(by_genre), Book.objects.filter(genre="fiction").count())
+        self.assertTrue(all(row["genre"] == "fiction" for row in by_genre))
+
+    def test_previous_link(self):
+        """
+        Test that the previous link returns the page before the current one.
+        """
+        first = self.client.get(self.books_url, {"pagination": "cursor"})
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["id"] for row in back.data["results"]],
+            [row["id"] for row in first.data["results"]],
+        )
+        self.assertIsNotNone(back.data["next"])
+
+    def test_deep_page_runs_no_count_or_offset(self):
+        """
+        Test that a page is fetched with a single query and no OFFSET.
+        """
+        first = self.client.get(self.books_url, {"pagination": "cursor"})
+        second = self.client.get(first.data["next"])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(second.data["next"])
+        # Leave out the ETag validator queries (see books.conditional)
+        book_queries = [
+            q["sql"]
+            for q in queries
+            if '"books_book"' in q["sql"] and "MAX(" not in q["sql"].upper()
+        ]
+        self.assertEqual(len(book_queries), 1)
+        self.assertFalse(any("COUNT(" in sql.upper() for sql in book_queries))
+        self.assertNotIn("OFFSET", book_queries[0].upper())
+
+    def test_invalid_cursor(self):
+        """
+        Test that a malformed cursor returns 404.
+        """
+        response = self.client.get(self.books_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_rejected_for_different_ordering(self):
+        """
+        Test that a cursor cannot be reused with a different ordering.
+        """
+        first = self.client.get(self.books_url, {"pagination": "cursor"})
+        response = self.client.get(first.data["next"] + "&ordering=title")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_default(self):
+        """
+        Test that page-number pagination is unchanged without the opt-in.
+        """
+        response = self.client.get(self.books_url)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 10)
+
+
+class EstimatedCountPaginationTests(APITestCase):
+    """
+    Test cases for page-number pagination with exact or estimated counts.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(25):
+            Book.objects.create(
+                title=f"Book {i:02d}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1) + timedelta(days=i),
+                isbn=f"{9780000000000 + i}",
+                pages=100 + i,
+                genre="fiction",
+            )
+        self.books_url = reverse("book-list")
+
+    def test_exact_count_below_threshold(self):
+        """
+        Test that small result sets report an exact count.
+        """
+        response = self.client.get(self.books_url)
+        self.assertEqual(response.data["count"], 25)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertIsNone(response.data["previous"])
+        self.assertIn("page=2", response.data["next"])
+
+    def test_last_page_counts_without_count_query(self):
+        """
+        Test that a partial last page yields the exact count without COUNT(*).
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.books_url, {"page": 3})
+        self.assertEqual(response.data["count"], 25)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(count_queries(queries), [])
+
+    def test_skip_count(self):
+        """
+        Test that ?count=none skips the count entirely.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.books_url, {"count": "none"})
+        self.assertIsNone(response.data["count"])
+        self.assertFalse(response.data["count_is_exact"])
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(count_queries(queries), [])
+
+    @skipIf(connection.vendor == "postgresql", "PostgreSQL uses planner estimates")
+    @override_settings(BOOKS_EXACT_COUNT_THRESHOLD=10)
+    def test_estimated_count_above_threshold(self):
+        """
+        Test that large result sets report a cached estimate once known.
+        """
+        first = self.client.get(self.books_url)
+        self.assertEqual(first.data["count"], 25)
+        self.assertTrue(first.data["count_is_exact"])
+
+        Book.objects.create(
+            title="Late Book",
+            author="Late Author",
+            published_date=date(2019, 1, 1),
+            isbn="9780000000999",
+            pages=100,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.books_url)
+        self.assertEqual(second.data["count"], 25)
+        self.assertFalse(second.data["count_is_exact"])
+        self.assertEqual(count_queries(queries), [])
+
+    @skipIf(connection.vendor == "postgresql", "PostgreSQL uses planner estimates")
+    def test_filtered_counts_are_cached_separately(self):
+        """
+        Test that counts are cached per filtered query.
+        """
+        queryset = Book.objects.filter(pages__gte=120)
+        remember_count(queryset, 5)
+        self.assertEqual(estimate_count(queryset), 5)
+        self.assertIsNone(estimate_count(Book.objects.filter(pages__lt=120)))
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    @override_settings(BOOKS_EXACT_COUNT_THRESHOLD=10)
+    def test_planner_estimates(self):
+        """
+        Test that PostgreSQL counts come from pg_class and EXPLAIN.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE books_book")
+        self.assertEqual(estimate_count(Book.objects.all()), 25)
+        self.assertIsInstance(estimate_count(Book.objects.filter(pages__gte=120)), int)
+
+        response = self.client.get(self.books_url)
+        self.assertEqual(response.data["count"], 25)
+        self.assertFalse(response.data["count_is_exact"])
+
+    def test_invalid_and_empty_pages(self):
+        """
+        Test that invalid or empty pages return 404.
+        """
+        for page in ["0", "abc", "4"]:
+            with self.subTest(page=page):
+                response = self.client.get(self.books_url, {"page": page})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_last_page(self):
+        """
+        Test that page=last resolves while the count is exact.
+        """
+        response = self.client.get(self.books_url, {"page": "last"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 5)
@@ -0,0 +1,154 @@
+import json
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from books.models import GENRE_CHOICES, LANGUAGE_CHOICES, Book
+
+# Books in the test catalog
+CATALOG_SIZE = 4000
+
+# A full scan of the books table fails a test once the table holds more rows
+# than this
+SEQ_SCAN_ROW_THRESHOLD = 1000
+
+
+def seq_scans(plan):
+    """
+    Yield the sequential scans of the books table in a PostgreSQL JSON plan.
+    """
+    if (
+        plan.get("Node Type") == "Seq Scan"
+        and plan.get("Relation Name") == Book._meta.db_table
+    ):
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+@override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=0, BOOKS_HOT_LIST_SIZE=0)
+class QueryPlanTests(APITestCase):
+    """
+    Test that every list filter and ordering combination is served by an
+    index rather than a full scan of the books table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Set up test data.
+        """
+        genres = [value for value, _ in GENRE_CHOICES]
+        languages = [value for value, _ in LANGUAGE_CHOICES]
+        Book.objects.bulk_create(
+            Book(
+                title=f"Plan Book {i:05d}",
+                slug=f"plan-book-{i}",
+                author=f"Author {i % 300}",
+                published_date=date(1950, 1, 1) + timedelta(days=i * 7),
+                isbn=f"{9782000000000 + i}",
+                pages=100 + i % 400,
+                genre=genres[i % len(genres)],
+                language=languages[i % len(languages)],
+                rating=(i % 51) / 10,
+            )
+            for i in range(CATALOG_SIZE)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Book._meta.db_table}")
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        self.books_url = reverse("book-list")
+
+    def combinations(self):
+        """
+        Yield the query parameters of every filter and ordering combination.
+        """
+        published_date = (date(1950, 1, 1) + timedelta(days=700)).isoformat()
+        filters = [
+            {},
+            {"genre": "fantasy"},
+            {"language": "fr"},
+            {"published_date": published_date},
+            {"genre": "fantasy", "published_date": published_date},
+        ]
+        orderings = [None, "title", "-title", "published_date", "rating", "-rating"]
+        for filter_params in filters:
+            for ordering in orderings:
+                params = {**filter_params, "count": "none"}
+                if ordering:
+                    params["ordering"] = ordering
+                yield params
+                yield {**params, "pagination": "cursor"}
+
+    def book_queries(self, params, url=None):
+        """
+        Return the SQL of the book queries run to list a page of books.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url or self.books_url, params)
+        self.assertEqual(response.status_code, 200)
+        table = connection.ops.quote_name(Book._meta.db_table)
+        return [
+            q["sql"]
+            for q in queries
+            if table in q["sql"] and q["sql"].startswith("SELECT")
+        ]
+
+    def assertNoLargeScan(self, sql):
+        """
+        Assert that a query does not scan the whole books table, if the
+        table holds more than SEQ_SCAN_ROW_THRESHOLD rows.
+        """
+        if Book.objects.count() <= SEQ_SCAN_ROW_THRESHOLD:
+            return
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = list(seq_scans(plan[0]["Plan"]))
+            else:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+                scans = [
+                    detail
+                    for detail in plan
+                    if detail.split()[:2] == ["SCAN", Book._meta.db_table]
+                    and "INDEX" not in detail
+                ]
+        self.assertFalse(scans, f"Full table scan in the plan of: {sql}\n{plan}")
+
+    def test_filter_and_ordering_combinations_use_indexes(self):
+        """
+        Test that no supported combination scans the whole books table.
+        """
+        for params in self.combinations():
+            with self.subTest(params=params):
+                queries = self.book_queries(params)
+                self.assertTrue(queries)
+                for sql in queries:
+                    self.assertNoLargeScan(sql)
+
+    def test_featured_and_by_genre_use_indexes(self):
+        """
+        Test that the featured and by_genre lists are read through indexes.
+        """
+        urls = [
+            reverse("book-featured"),
+            reverse("book-by-genre", kwargs={"genre_name": "history"}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                for sql in self.book_queries({"count": "none"}, url):
+                    self.assertNoLargeScan(sql)
@@ -0,0 +1,424 @@
+from datetime import date
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from books.pagination import KeysetPagination
+from books.search import (
+    FTS_TABLE,
+    BookSearchFilter,
+    ensure_sqlite_fts,
+    trigram_available,
+    word_similarity,
+)
+
+
+class SearchTests(APITestCase):
+    """
+    Test cases for the ranked full-text ?search= parameter.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        books = [
+            ("Ocean Tides", "Mara Quill", "A study of coastal weather."),
+            ("Coastal Weather", "Ocean Brooks", "Storms and tides."),
+            ("Mountain Paths", "Ida Stone", "Walking the ocean ridge."),
+            ("Desert Songs", "Ida Stone", "Poems about dunes."),
+        ]
+        for i, (title, author, description) in enumerate(books):
+            Book.objects.create(
+                title=title,
+                author=author,
+                description=description,
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000000 + i}",
+                pages=100 + i,
+            )
+        self.books_url = reverse("book-list")
+
+    def search(self, **params):
+        """
+        Return the titles returned by a list request.
+        """
+        response = self.client.get(self.books_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["title"] for row in response.data["results"]]
+
+    def test_results_ranked_by_field_weight(self):
+        """
+        Test that title matches rank above author and description matches.
+        """
+        self.assertEqual(
+            self.search(search="ocean"),
+            ["Ocean Tides", "Coastal Weather", "Mountain Paths"],
+        )
+
+    def test_terms_must_all_match(self):
+        """
+        Test that every search term has to match.
+        """
+        self.assertEqual(self.search(search="ida dunes"), ["Desert Songs"])
+
+    def test_explicit_ordering_wins_over_rank(self):
+        """
+        Test that ?ordering= replaces the relevance ordering.
+        """
+        self.assertEqual(
+            self.search(search="ocean", ordering="title"),
+            ["Coastal Weather", "Mountain Paths", "Ocean Tides"],
+        )
+
+    def test_query_syntax_is_not_interpreted(self):
+        """
+        Test that quotes and operators in the search are handled safely.
+        """
+        for term in ['"ocean', "ocean OR desert", "NEAR(ocean", "-", "*"]:
+            with self.subTest(term=term):
+                response = self.client.get(self.books_url, {"search": term})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_index_follows_writes(self):
+        """
+        Test that created, updated and deleted books are reflected in searches.
+        """
+        book = Book.objects.get(title="Desert Songs")
+        book.description = "Poems about glaciers."
+        book.save()
+        self.assertEqual(self.search(search="glaciers"), ["Desert Songs"])
+        self.assertEqual(self.search(search="dunes"), [])
+
+        book.delete()
+        self.assertEqual(self.search(search="glaciers"), [])
+
+    def test_cursor_pagination_by_rank(self):
+        """
+        Test that ranked results can be walked with cursor pagination.
+        """
+        with mock.patch.object(KeysetPagination, "page_size", 1):
+            response = self.client.get(
+                self.books_url, {"search": "ocean", "pagination": "cursor"}
+            )
+            titles = [row["title"] for row in response.data["results"]]
+            while response.data["next"]:
+                response = self.client.get(response.data["next"])
+                titles.extend(row["title"] for row in response.data["results"])
+        self.assertEqual(titles, ["Ocean Tides", "Coastal Weather", "Mountain Paths"])
+
+    @skipUnless(connection.vendor == "sqlite", "Requires SQLite")
+    def test_sqlite_triggers_recreated(self):
+        """
+        Test that missing FTS triggers are recreated and the index rebuilt.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_ai")
+        Book.objects.create(
+            title="Lost Atlas",
+            author="Noor Vale",
+            published_date=date(2021, 1, 1),
+            isbn="9781000000099",
+            pages=100,
+        )
+        self.assertEqual(self.search(search="atlas"), [])
+
+        ensure_sqlite_fts()
+        self.assertEqual(self.search(search="atlas"), ["Lost Atlas"])
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_postgresql_uses_gin_index(self):
+        """
+        Test that searches can be answered from the GIN index.
+        """
+        queryset = BookSearchFilter().filter_postgresql(Book.objects.all(), ["ocean"])
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                plan = queryset.explain()
+            finally:
+                cursor.execute("RESET enable_seqscan")
+        self.assertIn("books_book_search_idx", plan)
+
+
+class FuzzySearchTests(APITestCase):
+    """
+    Test cases for the typo-tolerant ?search_mode=fuzzy search.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        books = [
+            ("The Hobbit", "J.R.R. Tolkien", "fantasy"),
+            ("The Silmarillion", "J.R.R. Tolkien", "fantasy"),
+            ("Dune", "Frank Herbert", "sci_fi"),
+            ("Dune Messiah", "Frank Herbert", "sci_fi"),
+            ("Emma", "Jane Austen", "romance"),
+        ]
+        for i, (title, author, genre) in enumerate(books):
+            Book.objects.create(
+                title=title,
+                author=author,
+                genre=genre,
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000100 + i}",
+                pages=100 + i,
+            )
+        self.books_url = reverse("book-list")
+
+    def search(self, **params):
+        """
+        Return the titles returned by a fuzzy list request.
+        """
+        response = self.client.get(self.books_url, {"search_mode": "fuzzy", **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["title"] for row in response.data["results"]]
+
+    def test_misspelled_author(self):
+        """
+        Test that a misspelled author still finds their books.
+        """
+        self.assertEqual(
+            sorted(self.search(search="tolkein")), ["The Hobbit", "The Silmarillion"]
+        )
+
+    def test_misspelled_title_ranked_first(self):
+        """
+        Test that the closest match is listed first.
+        """
+        self.assertEqual(self.search(search="dune mesiah")[0], "Dune Messiah")
+
+    def test_unrelated_text_matches_nothing(self):
+        """
+        Test that results below the similarity threshold are dropped.
+        """
+        self.assertEqual(self.search(search="xylophone"), [])
+
+    @override_settings(BOOKS_FUZZY_SEARCH_LIMIT=1)
+    def test_result_limit(self):
+        """
+        Test that at most BOOKS_FUZZY_SEARCH_LIMIT books are returned.
+        """
+        self.assertEqual(self.search(search="herbert"), ["Dune"])
+
+    def test_combined_with_filters(self):
+        """
+        Test that fuzzy search honours the field filters.
+        """
+        self.assertEqual(self.search(search="tolkein", genre="sci_fi"), [])
+
+    def test_invalid_mode(self):
+        """
+        Test that an unknown search mode returns 400.
+        """
+        response = self.client.get(
+            self.books_url, {"search": "dune", "search_mode": "magic"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("search_mode", response.data)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_postgresql_uses_trigram_indexes(self):
+        """
+        Test that fuzzy matches can be answered from the trigram indexes.
+        """
+        if not trigram_available(connection):
+            self.skipTest("Requires pg_trgm")
+        queryset = BookSearchFilter().best_fuzzy_matches(
+            Book.objects.all(), "tolkein", 100
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                plan = queryset.explain()
+            finally:
+                cursor.execute("RESET enable_seqscan")
+        self.assertIn("_trgm_idx", plan)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    @override_settings(BOOKS_FUZZY_SEARCH_THRESHOLD=0.2)
+    def test_threshold_not_kept_on_connection(self):
+        """
+        Test that the similarity threshold only applies to the search itself.
+        """
+        if not trigram_available(connection):
+            self.skipTest("Requires pg_trgm")
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW pg_trgm.word_similarity_threshold")
+            default = cursor.fetchone()[0]
+        self.search(search="tolkein")
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW pg_trgm.word_similarity_threshold")
+            self.assertEqual(cursor.fetchone()[0], default)
+
+    def test_availability_checked_once(self):
+        """
+        Test that repeated searches do not query the catalog again.
+        """
+        self.search(search="tolkein")
+        self.client.get(self.books_url, {"search": "tolkien"})
+        with CaptureQueriesContext(connection) as queries:
+            self.search(search="tolkein")
+            self.client.get(self.books_url, {"search": "tolkien"})
+        catalog = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "sqlite_master" in query["sql"] or "pg_extension" in query["sql"]
+        ]
+        self.assertEqual(catalog, [])
+
+
+class IsbnSearchTests(APITestCase):
+    """
+    Test cases for ISBN terms in ?search=.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i, isbn in enumerate(["9780306406157", "9790000000001", "9780804429573"]):
+            Book.objects.create(
+                title=f"Numbers {i}",
+                author="Ada Count",
+                published_date=date(2020, 1, 1 + i),
+                isbn=isbn,
+                pages=100 + i,
+            )
+        self.books_url = reverse("book-list")
+
+    def search(self, term):
+        """
+        Return the ISBNs returned by a search, and the SQL of the book queries.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.books_url, {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Leave out the ETag validator queries (see books.conditional)
+        book_queries = [
+            q["sql"]
+            for q in queries
+            if '"books_book"' in q["sql"] and "MAX(" not in q["sql"].upper()
+        ]
+        return [row["isbn"] for row in response.data["results"]], book_queries
+
+    def test_isbn_uses_exact_lookup(self):
+        """
+        Test that a hyphenated ISBN-13 is answered by one exact lookup.
+        """
+        isbns, book_queries = self.search("978-0-306-40615-7")
+        self.assertEqual(isbns, ["9780306406157"])
+        self.assertEqual(len(book_queries), 1)
+        self.assertNotIn("LIKE", book_queries[0].upper())
+        self.assertNotIn(FTS_TABLE, book_queries[0])
+
+    def test_isbn10(self):
+        """
+        Test that an ISBN-10 finds the book stored under its ISBN-13.
+        """
+        self.assertEqual(self.search("0-306-40615-2")[0], ["9780306406157"])
+
+    def test_batch_of_isbns(self):
+        """
+        Test that several ISBNs return every matching book.
+        """
+        isbns, _ = self.search("9780306406157, 9790000000001 080442957X")
+        self.assertEqual(
+            sorted(isbns), ["9780306406157", "9780804429573", "9790000000001"]
+        )
+
+    def test_isbn_and_text(self):
+        """
+        Test that remaining terms still filter the ISBN matches.
+        """
+        self.assertEqual(self.search("9780306406157 numbers")[0], ["9780306406157"])
+        self.assertEqual(self.search("9780306406157 dune")[0], [])
+
+    def test_invalid_checksum_is_text(self):
+        """
+        Test that ISBN-shaped input with a bad check digit is not looked up.
+        """
+        self.assertEqual(self.search("9780306406158")[0], [])
+
+    def test_partial_isbn(self):
+        """
+        Test that digits that are not a whole ISBN match the start of ISBNs.
+        """
+        self.assertEqual(self.search("978-0-306")[0], ["9780306406157"])
+        self.assertEqual(
+            sorted(self.search("9780")[0]), ["9780306406157", "9780804429573"]
+        )
+
+    def test_isbn_without_valid_checksum(self):
+        """
+        Test that a stored ISBN with a wrong check digit is still found.
+        """
+        Book.objects.create(
+            title="Legacy Record",
+            author="Ada Count",
+            published_date=date(2020, 2, 1),
+            isbn="1234567890123",
+            pages=100,
+        )
+        self.assertEqual(self.search("1234567890123")[0], ["1234567890123"])
+
+    def test_numeric_title(self):
+        """
+        Test that digits still match titles through the text search.
+        """
+        Book.objects.create(
+            title="1984",
+            author="George Orwell",
+            published_date=date(2020, 2, 1),
+            isbn="9780451524935",
+            pages=328,
+        )
+        self.assertEqual(self.search("1984")[0], ["9780451524935"])
+
+
+class TrigramTests(SimpleTestCase):
+    """
+    Test cases for the pure-Python trigram similarity.
+    """
+
+    def test_word_similarity(self):
+        """
+        Test the share of query trigrams found in the text.
+        """
+        self.assertEqual(word_similarity("word", "two words"), 0.8)
+        self.assertEqual(word_similarity("Tolkien", "J.R.R. Tolkien"), 1.0)
+        self.assertEqual(word_similarity("", "anything"), 0.0)
+        self.assertEqual(word_similarity("abc", None), 0.0)
+
+
+class SearchMigrationTests(APITestCase):
+    """
+    Test that the search index survives schema changes.
+    """
+
+    @skipUnless(connection.vendor == "sqlite", "Requires SQLite")
+    def test_post_migrate_is_idempotent(self):
+        """
+        Test that running migrate again keeps a single, working FTS index.
+        """
+        call_command("migrate", verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                "AND name LIKE %s",
+                [f"{FTS_TABLE}%"],
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
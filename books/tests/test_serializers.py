@@ -2,10 +2,11 @@ from datetime import date
 
 from django.test import TestCase
 from django.urls import reverse
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
 from books.models import Book
-from books.serializers import BookListSerializer, BookSerializer
+from books.serializers import BookListSerializer, BookSerializer, FastListSerializer
 
 
 class BookSerializerTests(TestCase):
@@ -194,3 +195,79 @@ class BookListSerializerTests(TestCase):
         self.assertEqual(data["isbn"], "1234567890123")
         self.assertEqual(data["genre"], "fiction")
         self.assertEqual(float(data["rating"]), 4.5)
+
+
+class FastListSerializerTests(TestCase):
+    """
+    Test cases for the FastListSerializer.
+    """
+
+    def setUp(self):
+        """
+        Set up test data, including a book without rating or price.
+        """
+        self.factory = APIRequestFactory()
+        Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            published_date=date(2020, 1, 1),
+            isbn="1234567890123",
+            pages=200,
+            genre="fiction",
+            rating=4.5,
+            price=19.9,
+        )
+        Book.objects.create(
+            title="Unrated Book",
+            author="Other Author",
+            published_date=date(2021, 6, 1),
+            isbn="1234567890124",
+            pages=300,
+            genre="mystery",
+        )
+
+    def assertSameOutput(self, serializer_class, request):
+        """
+        Assert that the fast serializer matches the DRF serializer.
+        """
+        context = {"request": request}
+        books = Book.objects.order_by("id")
+        expected = serializer_class(books, many=True, context=context).data
+
+        fast = FastListSerializer(serializer_class(context=context))
+        rows = list(books.values(*fast.get_columns()))
+        self.assertEqual(fast.serialize(rows), [dict(row) for row in expected])
+
+    def test_matches_list_serializer(self):
+        """
+        Test that the output matches BookListSerializer.
+        """
+        self.assertSameOutput(
+            BookListSerializer, Request(self.factory.get(reverse("book-list")))
+        )
+
+    def test_matches_full_serializer(self):
+        """
+        Test that the output matches BookSerializer, including decimals and
+        datetimes.
+        """
+        self.assertSameOutput(
+            BookSerializer, Request(self.factory.get(reverse("book-list")))
+        )
+
+    def test_matches_sparse_fieldset(self):
+        """
+        Test that the output matches a trimmed serializer.
+        """
+        request = Request(
+            self.factory.get(reverse("book-list"), {"fields": "url,rating"})
+        )
+        self.assertSameOutput(BookListSerializer, request)
+
+    def test_no_fields(self):
+        """
+        Test that rows are kept when no known field was requested.
+        """
+        request = Request(self.factory.get(reverse("book-list"), {"fields": "x"}))
+        fast = FastListSerializer(BookListSerializer(context={"request": request}))
+        self.assertEqual(fast.serialize([{}, {}]), [{}, {}])
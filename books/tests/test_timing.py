@@ -0,0 +1,168 @@
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from books import timing
+from books.models import Book
+
+
+def parse_server_timing(value):
+    """
+    Return ``{name: (duration, description)}`` from a Server-Timing header.
+    """
+    metrics = {}
+    for metric in value.split(", "):
+        name, *params = metric.split(";")
+        params = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(params["dur"]), params.get("desc", "").strip('"'))
+    return metrics
+
+
+@override_settings(BOOKS_SERVER_TIMING_SAMPLE_RATE=1.0, BOOKS_SERVER_TIMING_PUBLIC=True)
+class ServerTimingTests(APITestCase):
+    """
+    Test cases for the Server-Timing middleware.
+    """
+
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        for i in range(3):
+            Book.objects.create(
+                title=f"Timed Book {i}",
+                author=f"Author {i}",
+                published_date=date(2020, 1, 1 + i),
+                isbn=f"{9781000000900 + i}",
+                pages=100 + i,
+            )
+        self.books_url = reverse("book-list")
+
+    def test_list_phases(self):
+        """
+        Test that a list response reports its queries, serializer and
+        renderer time.
+        """
+        for fast in [True, False]:
+            with self.subTest(fast=fast), override_settings(
+                BOOKS_FAST_LIST_SERIALIZER=fast, BOOKS_RESPONSE_CACHE_TIMEOUT=0
+            ):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(self.books_url)
+                metrics = parse_server_timing(response["Server-Timing"])
+                self.assertEqual(list(metrics), ["db", "serialize", "render", "total"])
+                self.assertEqual(metrics["db"][1], f"{len(queries)} queries")
+                self.assertGreater(metrics["total"][0], 0)
+                self.assertGreaterEqual(
+                    metrics["total"][0],
+                    metrics["db"][0] + metrics["render"][0],
+                )
+
+    @override_settings(BOOKS_RESPONSE_CACHE_TIMEOUT=300)
+    def test_cached_response(self):
+        """
+        Test that a response served from the cache reports no queries.
+        """
+        self.client.get(self.books_url)
+        metrics = parse_server_timing(self.client.get(self.books_url)["Server-Timing"])
+        self.assertEqual(metrics["db"], (0.0, "0 queries"))
+        self.assertNotIn("serialize", metrics)
+
+    def test_log_line(self):
+        """
+        Test that every timed request is logged as one JSON line.
+        """
+        detail_url = reverse("book-detail", args=["timed-book-1"])
+        with self.assertLogs("books.timing", level="INFO") as logs:
+            response = self.client.get(detail_url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["path"], detail_url)
+        self.assertEqual(record["view"], "book-detail")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertIn("Server-Timing", response)
+        self.assertEqual(
+            set(record),
+            {
+                "method",
+                "path",
+                "view",
+                "status",
+                "queries",
+                "db_ms",
+                "serialize_ms",
+                "render_ms",
+                "total_ms",
+            },
+        )
+
+    @override_settings(BOOKS_SERVER_TIMING_PUBLIC=False)
+    def test_header_only_for_staff(self):
+        """
+        Test that only staff users get the header unless it is public, while
+        every timed request is logged.
+        """
+        with self.assertLogs("books.timing", level="INFO"):
+            response = self.client.get(self.books_url)
+        self.assertNotIn("Server-Timing", response)
+
+        self.client.force_login(
+            User.objects.create_user(username="reader", password="password")
+        )
+        self.assertNotIn("Server-Timing", self.client.get(self.books_url))
+        self.client.force_login(
+            User.objects.create_user(
+                username="staff", password="password", is_staff=True
+            )
+        )
+        self.assertIn("Server-Timing", self.client.get(self.books_url))
+
+    @override_settings(BOOKS_SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled(self):
+        """
+        Test that requests outside the sample are not timed.
+        """
+        with self.assertNoLogs("books.timing"):
+            response = self.client.get(self.books_url)
+        self.assertNotIn("Server-Timing", response)
+
+
+class SpanTests(SimpleTestCase):
+    """
+    Test cases for timing spans.
+    """
+
+    def test_nested_spans_counted_once(self):
+        """
+        Test that a span inside a span of the same phase is not added twice.
+        """
+        timings = timing.RequestTimings()
+        token = timing.current.set(timings)
+        try:
+            with timing.span("serialize"):
+                with timing.span("serialize"):
+                    pass
+                with timing.span("render"):
+                    pass
+        finally:
+            timing.current.reset(token)
+        self.assertEqual(set(timings.phases), {"serialize", "render"})
+        self.assertLess(timings.phases["render"], timings.phases["serialize"])
+
+    def test_untimed_request(self):
+        """
+        Test that spans outside a timed request do nothing.
+        """
+        with timing.span("serialize"):
+            pass
+        self.assertIsNone(timing.current.get())
+        self.assertEqual(timing.timed("render")(str.upper)("ok"), "OK")
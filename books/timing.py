@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Timings of the current request, or None if it is not being timed
+current = ContextVar("books_request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Time spent by one request in the database and in each timed phase.
+
+    Durations are in seconds, as returned by ``time.perf_counter()``.
+    """
+
+    __slots__ = ("start", "queries", "sql", "phases", "running")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.phases = {}
+        self.running = set()
+
+    def add(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """
+        Time a database query; see ``connection.execute_wrapper()``.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def span(name):
+    """
+    Add the time spent in the block to phase ``name`` of the current request.
+
+    Nested spans of the same phase, such as a serializer rendering its
+    child serializers, are only counted once. Does nothing if the request
+    is not being timed.
+    """
+    timings = current.get()
+    if timings is None or name in timings.running:
+        yield
+        return
+    timings.running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+        timings.running.discard(name)
+
+
+def timed(name):
+    """
+    Decorate a function so that calls to it are timed as phase ``name``.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if current.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -14,5 +14,6 @@ router.register(r"books", views.BookViewSet, basename="book")
 # The API URLs are now determined automatically by the router
 urlpatterns = [
     path("home/", views.home, name="home"),
+    path("metrics", views.prometheus_metrics, name="metrics"),
     # No longer needed as we'll use the main urls.py for API routing
 ]
@@ -1,14 +1,33 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
+    SAFE_METHODS,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from books import autocomplete, bulk, facets, hotlists, metrics
+from books.caching import cache_response
+from books.conditional import (
+    collection_validators,
+    not_modified_response,
+    set_validators,
+)
 from books.models import Book
-from books.serializers import BookListSerializer, BookSerializer
+from books.pagination import EstimatedCountPagination, KeysetPagination
+from books.renderers import NDJSONRenderer, dumps_line
+from books.search import BookOrderingFilter, BookSearchFilter
+from books.serializers import (
+    BookListSerializer,
+    BookSerializer,
+    FastListSerializer,
+)
 
 
 # Create your views here.
@@ -28,6 +47,27 @@ def home(request):
     return render(request, "home.html", {"books": books})
 
 
+def prometheus_metrics(request):
+    """
+    View function exposing the API's Prometheus metrics.
+
+    In multiprocess mode (``PROMETHEUS_MULTIPROC_DIR`` set), the metrics of
+    every gunicorn worker are aggregated, whichever worker answers. Only
+    the addresses and bearer token of the ``BOOKS_METRICS_*`` settings may
+    read them.
+
+    Args:
+        request: The HTTP request object
+
+    Returns:
+        The metrics in the Prometheus text format, or a 403 response
+    """
+    if not metrics.is_scrape_allowed(request):
+        return HttpResponseForbidden()
+    content, content_type = metrics.render_metrics()
+    return HttpResponse(content, content_type=content_type)
+
+
 # Author and Publisher ViewSets will be added back later
 
 
@@ -39,11 +79,17 @@ class BookViewSet(viewsets.ModelViewSet):
         Return a list of all books.
 
         Query parameters:
-        - search: Search by title, author, or ISBN
+        - search: Full-text search over title, author and description,
+          ranked by relevance unless an ordering is given
+        - search_mode: 'fuzzy' to match titles and authors despite typos
         - language: Filter by language code (e.g., 'en', 'fr')
         - genre: Filter by genre (e.g., 'fiction', 'sci_fi')
         - published_date: Filter by publication date
         - ordering: Order results by specified field (e.g., 'title', '-rating')
+        - fields: Comma-separated fields to return (e.g., 'title,isbn,rating')
+        - count: Set to 'none' to skip counting the matching books
+        - pagination: Set to 'cursor' to page with opaque keyset cursors
+          instead of page numbers (also applies to featured and by_genre)
 
     create:
         Create a new book.
@@ -51,6 +97,9 @@ class BookViewSet(viewsets.ModelViewSet):
     retrieve:
         Return the details of a specific book.
 
+        Query parameters:
+        - fields: Comma-separated fields to return (e.g., 'title,isbn,rating')
+
     update:
         Update all fields of a specific book.
 
@@ -60,30 +109,129 @@ class BookViewSet(viewsets.ModelViewSet):
     destroy:
         Delete a specific book.
 
+    bulk_create:
+        Create many books from a JSON array in one request.
+
+        Each item is validated like create; invalid items are reported by
+        index without aborting the rest of the batch.
+
+    bulk_update:
+        Update every book matching the list filters in one request.
+
+    bulk_delete:
+        Delete every book matching the list filters in one request.
+
+    upsert:
+        Insert or update many books keyed by ISBN in one request.
+
     featured:
         Return a list of featured books (those with high ratings).
 
     by_genre:
         Return a list of books filtered by the specified genre.
 
+    export:
+        Stream every matching book as newline-delimited JSON.
+
+        Accepts the same search, filter, ordering and fields parameters as
+        list, without pagination.
+
+    facets:
+        Return the number of books per genre and per language, optionally
+        for the books matching the list filters.
+
+    autocomplete:
+        Suggest the best rated books whose title or author has a word
+        starting with ``q``, from an in-memory index.
+
     Examples:
         GET /api/v1/books/?search=django
         GET /api/v1/books/?language=en&genre=fiction
         GET /api/v1/books/?ordering=-rating
+        GET /api/v1/books/?pagination=cursor&ordering=title
+        GET /api/v1/books/?fields=title,isbn,rating
+        GET /api/v1/books/export/?genre=fiction&fields=isbn,title
+        GET /api/v1/books/autocomplete/?q=tolk
+        GET /api/v1/books/facets/?search=dragons
+        PATCH /api/v1/books/bulk/?genre=sci_fi {"genre": "fiction"}
+        DELETE /api/v1/books/bulk/?genre=other&language=ru
     """
 
     queryset = Book.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Field filters run before the search so fuzzy result limits apply to
+    # the filtered books
     filter_backends = [
-        filters.SearchFilter,
         DjangoFilterBackend,
-        filters.OrderingFilter,
+        BookSearchFilter,
+        BookOrderingFilter,
     ]
     search_fields = ["title", "author", "isbn"]
     filterset_fields = ["language", "genre", "published_date"]
     ordering_fields = ["title", "published_date", "rating"]
     ordering = ["-published_date"]
     lookup_field = "slug"
+    pagination_class = EstimatedCountPagination
+    keyset_pagination_class = KeysetPagination
+    fast_list_serializer_class = FastListSerializer
+    pagination_query_param = "pagination"
+
+    @property
+    def paginator(self):
+        """
+        Return the paginator instance for this request.
+
+        Clients opt in to keyset pagination with ``?pagination=cursor``; the
+        ``next``/``previous`` links it returns carry a ``cursor`` parameter,
+        which selects it as well. Every other request gets page-number
+        pagination with an exact or estimated count.
+
+        Returns:
+            The paginator instance, or None if pagination is disabled
+        """
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if request is not None and self.uses_keyset_pagination(request):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+    def uses_keyset_pagination(self, request):
+        """
+        Return True if the request asks for keyset (cursor) pagination.
+        """
+        params = request.query_params
+        return (
+            params.get(self.pagination_query_param) == "cursor"
+            or self.keyset_pagination_class.cursor_query_param in params
+        )
+
+    def get_queryset(self):
+        """
+        Return the books for this request.
+
+        Read requests only load the columns their serializer renders, plus
+        the ordering columns needed for pagination, so unused columns such
+        as ``description`` are never fetched for list views.
+
+        Returns:
+            QuerySet: The books for this request
+        """
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            queryset = queryset.only(*self.get_required_columns())
+        return queryset
+
+    def get_required_columns(self):
+        """
+        Return the model columns needed to serve a read request.
+
+        Returns:
+            list: Column names rendered by the serializer and ordering columns
+        """
+        columns = self.get_serializer().get_source_columns()
+        return columns + [f for f in self.ordering_fields if f not in columns]
 
     def get_serializer_class(self):
         """
@@ -93,13 +241,122 @@ class BookViewSet(viewsets.ModelViewSet):
         For all other actions, return the full serializer.
 
         Returns:
-            Serializer class: BookListSerializer for list action,
-             BookSerializer otherwise
+            Serializer class: BookListSerializer for list, featured and
+             by_genre actions, BookSerializer otherwise
         """
-        if self.action == "list":
+        if self.action in ("list", "featured", "by_genre"):
             return BookListSerializer
         return BookSerializer
 
+    def use_fast_list_serializer(self):
+        """
+        Return True if list responses should use the fast-path serializer.
+
+        Controlled by the ``BOOKS_FAST_LIST_SERIALIZER`` setting.
+        """
+        return getattr(settings, "BOOKS_FAST_LIST_SERIALIZER", True)
+
+    def get_list_response(self, queryset):
+        """
+        Paginate and serialize a queryset of books for a list endpoint.
+
+        With the fast path enabled, rows are read with ``.values()`` and
+        rendered by FastListSerializer; the output is identical to that of
+        the regular list serializer.
+
+        The response carries ETag and Last-Modified validators of the
+        catalog and the request (see ``books.conditional``); a request whose
+        If-None-Match or If-Modified-Since header still matches them is
+        answered with 304 Not Modified before any row is fetched.
+
+        Args:
+            queryset: The filtered and ordered books to list
+
+        Returns:
+            Response: 200 OK with the (paginated) list of books, or 304 Not
+             Modified
+        """
+        etag, last_modified = collection_validators(self.request, queryset)
+        not_modified = not_modified_response(self.request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = self.get_page_response(queryset)
+        return set_validators(response, etag, last_modified)
+
+    def paginate_queryset(self, queryset):
+        """
+        Return a single page of results, or None if pagination is disabled.
+
+        The first page of the featured and by_genre lists is read from their
+        hot list (see ``books.hotlists``): one primary key ``IN`` query
+        instead of sorting the matching books. The fetched rows are checked
+        against the list, and the regular query is used if they disagree.
+        """
+        hot_list = getattr(self, "hot_list", None)
+        paginator = self.paginator
+        if (
+            hot_list is None
+            or not hotlists.get_size()
+            or not isinstance(paginator, EstimatedCountPagination)
+            or not paginator.is_first_page(self.request)
+        ):
+            return super().paginate_queryset(queryset)
+
+        ids = hotlists.get_ids(hot_list, queryset)
+        ids = ids[: paginator.get_page_size(self.request) + 1]
+        rows = sorted(
+            queryset.order_by().filter(pk__in=ids),
+            key=lambda row: hotlists.position(hot_list, row),
+        )
+        if [hotlists.read(row, "id") for row in rows] != ids:
+            # A write the list has not seen yet; drop it and query directly.
+            hotlists.bump_version(hot_list)
+            return super().paginate_queryset(queryset)
+        return paginator.paginate_first_page(
+            queryset, rows, self.request, hotlists.exact_count(hot_list)
+        )
+
+    def get_page_response(self, queryset):
+        """
+        Return the 200 response of get_list_response().
+        """
+        if not self.use_fast_list_serializer():
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        serializer = self.fast_list_serializer_class(self.get_serializer())
+        # Pagination also reads the ordering columns and the primary key.
+        columns = dict.fromkeys(["id", *self.get_required_columns()])
+        queryset = queryset.values(*columns, *queryset.query.annotation_select)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(list(queryset)), status=status.HTTP_200_OK)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """
+        Return a list of books with proper status code.
+
+        Returns:
+            Response: 200 OK with the (paginated) list of books
+        """
+        return self.get_list_response(self.filter_queryset(self.get_queryset()))
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Return a single book by slug.
+
+        Returns:
+            Response: 200 OK with the book data
+        """
+        return super().retrieve(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         """
         Create a new book with proper status code.
@@ -141,6 +398,43 @@ class BookViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        Suggest books whose title or author has a word starting with ``?q=``.
+
+        Suggestions come from this process's prefix index (see
+        ``books.autocomplete``), not the database, best rated first and at
+        most ``BOOKS_AUTOCOMPLETE_LIMIT`` of them.
+
+        Returns:
+            Response: 200 OK with the query and the matching books
+        """
+        query = request.query_params.get("q", "")
+        results = autocomplete.index.search(query, autocomplete.get_limit())
+        return Response({"query": query, "results": results})
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Return the number of books per genre and per language.
+
+        Without filters the counts come from the counter table maintained
+        on every write (see ``books.facets``). With the list filters or a
+        search, the matching books are counted with a single ``GROUP BY``.
+
+        Returns:
+            Response: 200 OK with ``{"genre": {...}, "language": {...},
+             "filtered": bool}``
+        """
+        filtered = self.has_filter_params(request)
+        if filtered:
+            counts = facets.queryset_counts(self.filter_queryset(self.get_queryset()))
+        else:
+            counts = facets.catalog_counts()
+        return Response({**counts, "filtered": filtered})
+
+    @action(detail=False, methods=["get"])
+    @cache_response
     def featured(self, request):
         """
         Return a list of featured books (those with high ratings).
@@ -148,19 +442,206 @@ class BookViewSet(viewsets.ModelViewSet):
         Returns:
             Response: 200 OK with a list of featured books
         """
-        featured_books = Book.objects.filter(rating__gte=4.0).order_by("-rating")
-        page = self.paginate_queryset(featured_books)
-        if page is not None:
-            serializer = BookListSerializer(
-                page, many=True, context={"request": request}
+        self.hot_list = hotlists.FEATURED
+        return self.get_list_response(hotlists.featured_books(self.get_queryset()))
+
+    def get_bulk_items(self, request):
+        """
+        Return the list of books in the body of a bulk request.
+
+        Raises:
+            ValidationError: If the body is not a list, or holds more than
+             ``BOOKS_BULK_MAX_ITEMS`` items
+        """
+        items = request.data
+        max_items = getattr(settings, "BOOKS_BULK_MAX_ITEMS", 5000)
+        if not isinstance(items, list):
+            raise ValidationError({"error": "Expected a list of books."})
+        if len(items) > max_items:
+            raise ValidationError(
+                {"error": f"At most {max_items} books can be written at once."}
             )
-            return self.get_paginated_response(serializer.data)
-        serializer = BookListSerializer(
-            featured_books, many=True, context={"request": request}
+        return items
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """
+        Create many books from a JSON array in one request.
+
+        All items are validated in one pass, ISBN uniqueness is checked with
+        a single query, and rows are inserted with ``bulk_create`` in batches
+        of ``BOOKS_BULK_BATCH_SIZE``. At most ``BOOKS_BULK_MAX_ITEMS`` items
+        are accepted per request.
+
+        Returns:
+            Response: 201 Created if every item was created, 207 Multi-Status
+             if only some were, 400 Bad Request if none were
+        """
+        items = self.get_bulk_items(request)
+
+        created, errors = bulk.create_books(items, self.get_serializer_context())
+        if not created and errors:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        results = [
+            {"index": index, "id": book.id, "slug": book.slug, "isbn": book.isbn}
+            for index, book in created
+        ]
+        return Response(
+            {"created": len(created), "results": results, "errors": errors},
+            status=response_status,
+        )
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """
+        Update every book matching the list filters with one ``UPDATE``.
+
+        Takes the same filter parameters as list (genre, language,
+        published_date, search); at least one is required. The body sets
+        the new values and may only contain the fields in
+        ``bulk.BULK_UPDATE_FIELDS``.
+
+        Returns:
+            Response: 200 OK with the number of updated books, 400 Bad Request
+             if the filters match more than ``BOOKS_BULK_MAX_ROWS`` books
+        """
+        queryset = self.get_bulk_filter_queryset(request)
+        data = request.data
+        if (
+            not isinstance(data, dict)
+            or not data
+            or not set(data) <= set(bulk.BULK_UPDATE_FIELDS)
+        ):
+            raise ValidationError(
+                {
+                    "error": "Provide one or more of these fields: "
+                    + ", ".join(bulk.BULK_UPDATE_FIELDS)
+                }
+            )
+        serializer = self.get_serializer(data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            updated = bulk.update_matching_books(
+                queryset, serializer.validated_data, bulk.get_max_rows()
+            )
+        except bulk.BulkLimitExceeded as exc:
+            raise ValidationError({"error": str(exc)})
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
+
+    @bulk_create.mapping.delete
+    def bulk_delete(self, request):
+        """
+        Delete every book matching the list filters in one transaction.
+
+        Takes the same filter parameters as list (genre, language,
+        published_date, search); at least one is required.
+
+        Returns:
+            Response: 200 OK with the number of deleted books, 400 Bad Request
+             if the filters match more than ``BOOKS_BULK_MAX_ROWS`` books
+        """
+        queryset = self.get_bulk_filter_queryset(request)
+        try:
+            deleted = bulk.delete_matching_books(queryset, bulk.get_max_rows())
+        except bulk.BulkLimitExceeded as exc:
+            raise ValidationError({"error": str(exc)})
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+    def get_filter_params(self):
+        """
+        Return the query parameters that narrow down the list of books.
+        """
+        return [*self.filterset_fields, BookSearchFilter.search_param]
+
+    def has_filter_params(self, request):
+        """
+        Return True if the request narrows down the list of books.
+        """
+        return any(request.query_params.get(p) for p in self.get_filter_params())
+
+    def get_bulk_filter_queryset(self, request):
+        """
+        Return the books matched by the list filters of a bulk write.
+
+        Raises:
+            ValidationError: If the request has no filter parameter, so a
+             missing query string can never touch the whole catalog
+        """
+        if not self.has_filter_params(request):
+            raise ValidationError(
+                {
+                    "error": "At least one filter is required: "
+                    + ", ".join(self.get_filter_params())
+                }
+            )
+        return self.filter_queryset(self.get_queryset())
+
+    @action(detail=False, methods=["put"])
+    def upsert(self, request):
+        """
+        Insert or update many books keyed by ISBN in one request.
+
+        Items are validated like bulk_create and written with a single
+        ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` per batch. Optional
+        fields missing from an item keep their current value.
+
+        Returns:
+            Response: 200 OK with inserted/updated/unchanged counts, 207
+             Multi-Status if some items were invalid, 400 Bad Request if all
+             were
+        """
+        items = self.get_bulk_items(request)
+
+        counts, errors = bulk.upsert_books(items, self.get_serializer_context())
+        if errors and len(errors) == len(items):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({**counts, "errors": errors}, status=response_status)
+
+    @action(
+        detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, JSONRenderer]
+    )
+    def export(self, request):
+        """
+        Stream every matching book as newline-delimited JSON.
+
+        Rows are read through a server-side cursor in chunks of
+        ``BOOKS_EXPORT_CHUNK_SIZE``, so memory use stays constant however
+        large the catalog is.
+
+        Returns:
+            StreamingHttpResponse: 200 OK with one JSON book per line
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.fast_list_serializer_class(self.get_serializer())
+        chunk_size = getattr(settings, "BOOKS_EXPORT_CHUNK_SIZE", 2000)
+        rows = queryset.values(*serializer.get_columns()).iterator(
+            chunk_size=chunk_size
+        )
+
+        def stream():
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield b"".join(map(dumps_line, serializer.serialize(chunk)))
+                    chunk = []
+            if chunk:
+                yield b"".join(map(dumps_line, serializer.serialize(chunk)))
+
+        return StreamingHttpResponse(
+            stream(), content_type=NDJSONRenderer.media_type, status=status.HTTP_200_OK
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path="genre/(?P<genre_name>[^/.]+)")
+    @cache_response
     def by_genre(self, request, genre_name=None):
         """
         Return a list of books filtered by the specified genre.
@@ -171,15 +652,11 @@ class BookViewSet(viewsets.ModelViewSet):
         Returns:
             Response: 200 OK with a list of books in the specified genre
         """
-        books = Book.objects.filter(genre=genre_name).order_by("-published_date")
-        page = self.paginate_queryset(books)
-        if page is not None:
-            serializer = BookListSerializer(
-                page, many=True, context={"request": request}
-            )
-            return self.get_paginated_response(serializer.data)
-        serializer = BookListSerializer(books, many=True, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # None for genres outside the choices, which are read without one
+        self.hot_list = hotlists.genre_list(genre_name)
+        return self.get_list_response(
+            hotlists.genre_books(self.get_queryset(), genre_name)
+        )
 
 
 # Review ViewSet will be added back later
@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for BookApi.
+
+Gunicorn reads this file from the working directory. Every worker writes
+its Prometheus metrics to memory-mapped files in ``PROMETHEUS_MULTIPROC_DIR``
+(``/tmp/prometheus`` unless set) and /metrics aggregates them. The variable
+is only set here, so single-process servers such as ``runserver`` keep
+their metrics in memory.
+"""
+
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def on_starting(server):
+    """
+    Start from an empty metrics directory, dropping files of a previous run.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """
+    Drop the live gauges of a worker that exited.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)